@@ -16,20 +16,67 @@ def create_app():
     # --- Config ---
     app.config["API_KEY"] = os.getenv("API_KEY", "").strip()
     app.config["TESTING"] = app.config.get("TESTING", False)
+    app.config["ENABLE_DB"] = os.getenv("ENABLE_DB", "false").lower() == "true"
+
+    # --- ETags / 304s and compression; registered first so it runs after every
+    # other after_request hook (the response log records the plain body) ---
+    from .core.compression import finalize
+    app.after_request(finalize)
+
+    # --- Tracing (TRACE_EXPORTER); first hook, so the request span covers everything ---
+    from .core import tracing
+    if tracing.enabled():
+        tracing.init_tracing(app)
+
+    # --- Auth for /api/* ---
+    # Tenant keys (TENANTS_FILE) map to their tenant; the legacy global API_KEY
+    # (or no auth at all when neither is configured, or TESTING) maps to "default".
+    from .core import admission, tenants
 
-    # --- Auth for /api/* (skips when TESTING or no API_KEY set) ---
     @app.before_request
     def _auth():
+        registry = tenants.get_registry()
+        g.tenant = registry.default
+        if not request.path.startswith("/api/"):
+            return
+        key = request.headers.get("X-API-Key")
+        tenant = registry.lookup(key)
+        if tenant is not None:
+            g.tenant = tenant
+            return
         if app.config.get("TESTING"):
             return
-        if not app.config.get("API_KEY"):
+        if not app.config.get("API_KEY") and not registry.configured:
             # Auth disabled if no key configured
             return
-        if request.path.startswith("/api/"):
-            if request.headers.get("X-API-Key") != app.config["API_KEY"]:
-                return jsonify({
-                    "error": {"code": "UNAUTHORIZED", "message": "Missing/invalid API key"}
-                }), 401
+        if not key or key != app.config.get("API_KEY"):
+            return jsonify({
+                "error": {"code": "UNAUTHORIZED", "message": "Missing/invalid API key"}
+            }), 401
+
+    # --- Admission lane for this request's LLM calls (X-Priority, capped by the tenant's lane) ---
+    @app.before_request
+    def _lane():
+        # set on every request: worker threads are reused and keep their contextvars
+        admission.set_lane(admission.lane_for_request(request.headers.get("X-Priority"), g.tenant))
+
+    # --- Body size caps (before the logging middleware reads the body) ---
+    from .core.limits import enforce_body_limit, too_large
+    from werkzeug.exceptions import RequestEntityTooLarge
+
+    app.before_request(enforce_body_limit)
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def _too_large(_e):
+        return too_large(request.max_content_length)
+
+    # --- Prompt templates: read + compiled once per process ---
+    from .core import prompts
+    prompts.get_registry()
+
+    # --- Reference-architecture catalogue: loaded + BM25-indexed once per process ---
+    from .core import knowledge
+    knowledge.get_catalogue()
 
     # --- Health probe ---
     @app.get("/health")
@@ -37,12 +84,26 @@ def create_app():
         return {"status": "ok"}
 
     # --- Optional: DB init & request/response logging middleware ---
-    if os.getenv("ENABLE_DB", "false").lower() == "true":
+    if app.config["ENABLE_DB"]:
         from app.db import init_db
         from app.middleware import register_request_response_logging
         init_db()
         register_request_response_logging(app)
 
+        # serve popular pre-computed analyses (python -m app.prewarm) from memory
+        warm = int(os.getenv("PREWARM_CACHE_ENTRIES", "0"))
+        if warm > 0:
+            from .core.analyses import warm_cache
+            try:
+                loaded = warm_cache(tenants.get_registry().default, warm)
+                app.logger.info("Warmed response cache with %d stored analyses", loaded)
+            except Exception as e:
+                app.logger.warning(f"Cache warm-up skipped: {e}")
+
+    # --- Idempotency-Key on /api/v1 POSTs; after logging so short-circuited replays are logged ---
+    from .core import idempotency
+    idempotency.init_app(app)
+
     # Even if DB logging is off, propagate any trace id set by handlers/middleware
     @app.after_request
     def _propagate_trace(resp):
@@ -52,13 +113,18 @@ def create_app():
         return resp
 
     # --- Blueprints (import inside factory to avoid circulars) ---
+    # Blueprint modules only import Flask + schemas; LLM, DB and docs
+    # dependencies are imported lazily by the handlers that need them.
     from .apis.tradeoff import bp as tradeoff_bp
     from .apis.review import bp as review_bp
     from .apis.risk import bp as risk_bp
     from .apis.testcases import bp as tc_bp
     from .apis.admin import bp as admin_bp
-    from .apis.design import bp as design_bp 
+    from .apis.design import bp as design_bp
     from .apis.techstack import bp as techstack_bp
+    from .apis.projects import bp as projects_bp
+    from .apis.search import bp as search_bp
+    from .apis.sessions import bp as sessions_bp
 
 
     app.register_blueprint(tradeoff_bp, url_prefix="/api/v1/tradeoff")
@@ -68,13 +134,16 @@ def create_app():
     app.register_blueprint(admin_bp,    url_prefix="/api/v1/admin")
     app.register_blueprint(design_bp,   url_prefix="/api/v1/design")
     app.register_blueprint(techstack_bp, url_prefix="/api/v1/techstack")
+    app.register_blueprint(projects_bp, url_prefix="/api/v1/projects")
+    app.register_blueprint(search_bp,   url_prefix="/api/v1/search")
+    app.register_blueprint(sessions_bp, url_prefix="/api/v1/sessions")
 
 
-    # --- Optional API docs (Spectree) ---
+    # --- Optional API docs (Spectree; imported only when enabled) ---
     if os.getenv("ENABLE_DOCS", "0") == "1" and not app.config.get("TESTING"):
         try:
-            from .core.docs import api as docs
-            docs.register(app)
+            from .core.docs import init_docs
+            init_docs(app)
         except Exception as e:
             app.logger.warning(f"Docs disabled: {e}")
 
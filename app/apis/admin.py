@@ -1,24 +1,205 @@
 # app/apis/admin.py
-from flask import Blueprint, jsonify
-from app.db import SessionLocal
-from app.models import RequestLog, ResponseLog, ErrorLog
+import hmac
+import os
+import uuid
+from functools import wraps
+from flask import Blueprint, Response, g, jsonify, request
 
 bp = Blueprint("admin", __name__)
 
+# Admin routes expose other tenants' traffic, limits and usage; they need
+# X-Admin-Key (ADMIN_API_KEY), not just a tenant API key.
+
+def admin_authorized() -> bool:
+    key = os.getenv("ADMIN_API_KEY", "")
+    given = request.headers.get("X-Admin-Key", "")
+    return bool(key) and hmac.compare_digest(given.encode(), key.encode())
+
+
+def _admin_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not admin_authorized():
+            return jsonify({
+                "error": {"code": "FORBIDDEN", "message": "Requires X-Admin-Key (ADMIN_API_KEY)"}
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
 @bp.get("/trace/<trace_id>")
+@_admin_only
 def get_trace(trace_id: str):
+    from app.core import logstore
+    if logstore.enabled():
+        out = logstore.get_store().trace(trace_id)
+        spans = _spans(trace_id)
+        if spans is not None:
+            out["spans"] = spans
+        return jsonify(out)
+
+    # SQLAlchemy is only needed when someone actually reads traces
+    from app.db import SessionLocal
+    from app.models import RequestLog, ResponseLog, ErrorLog
+
     db = SessionLocal()
     try:
         reqs = db.query(RequestLog).filter(RequestLog.trace_id == trace_id).all()
         resps = db.query(ResponseLog).filter(ResponseLog.trace_id == trace_id).all()
         errs = db.query(ErrorLog).filter(ErrorLog.trace_id == trace_id).all()
-        return jsonify({
+        out = {
             "requests": [ _row(r) for r in reqs ],
             "responses": [ _row(r) for r in resps ],
             "errors": [ _row(e) for e in errs ],
-        })
+        }
+        spans = _spans(trace_id)
+        if spans is not None:
+            out["spans"] = spans
+        return jsonify(out)
     finally:
         db.close()
 
+@bp.get("/logs")
+@_admin_only
+def get_logs():
+    """Newest rows of the segment log store: ?since=&until= (epoch ms), &table=request|response|error, &limit=."""
+    from app.core import logstore
+    if not logstore.enabled():
+        return jsonify({"error": {"code": "NOT_FOUND", "message": "Requires LOG_BACKEND=segments"}}), 404
+    store = logstore.get_store()
+    rows = store.scan(
+        since=request.args.get("since", type=int),
+        until=request.args.get("until", type=int),
+        table=request.args.get("table"),
+        limit=min(request.args.get("limit", 200, type=int), 5000),
+    )
+    return jsonify({"rows": rows, "store": store.stats()})
+
+def _spans(trace_id: str):
+    """Spans still held by the in-memory exporter (TRACE_EXPORTER=memory), else None."""
+    from app.core import tracing
+    if os.getenv("TRACE_EXPORTER", "none").lower() != "memory":
+        return None
+    spans = tracing.memory_spans(tracing.trace_id_for(trace_id))
+    return [tracing.span_to_otlp(s) for s in sorted(spans, key=lambda s: s.start_ns)]
+
 def _row(obj):
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+
+
+@bp.get("/prompts")
+@_admin_only
+def prompt_stats():
+    """Per prompt-version latency / token / validation-failure stats for A/B comparison."""
+    from app.core import prompts
+    return jsonify(prompts.get_registry().snapshot())
+
+
+@bp.get("/tenants")
+@_admin_only
+def tenant_stats():
+    """Per-tenant cache hit rates, throttling and in-flight LLM calls."""
+    from app.core import tenants
+    return jsonify({t.name: t.stats() for t in tenants.get_registry().all()})
+
+
+@bp.get("/lanes")
+@_admin_only
+def lane_stats():
+    """Admission lanes in this worker: queued / in service, shed counts, queue-time percentiles."""
+    from app.core import admission
+    adm = admission.get_admission()
+    if adm is None:
+        return jsonify({"capacity": 0, "lanes": {}})
+    return jsonify(adm.stats())
+
+
+@bp.get("/sessions")
+@_admin_only
+def session_stats():
+    """Live stateful sessions in this worker, retained bytes and evictions by reason."""
+    from app.core import sessions
+    return jsonify(sessions.get_store().stats())
+
+
+@bp.get("/idempotency")
+@_admin_only
+def idempotency_stats():
+    """Idempotency keys held by this worker: in flight, stored responses, replays."""
+    from app.core import idempotency
+    return jsonify(idempotency.get_store().stats())
+
+
+# --- profiling ---
+
+@bp.get("/profile/sample")
+@_admin_only
+def sample_profile():
+    """
+    Sample every thread of this worker for ?seconds= (default 10, max 60) and
+    return collapsed stacks, e.g.
+    curl -H 'X-Admin-Key: ...' '.../admin/profile/sample?seconds=15' | flamegraph.pl > w.svg
+    """
+    from app.core import profiler
+
+    seconds = request.args.get("seconds", 10.0, type=float)
+    interval = request.args.get("interval_ms", 10.0, type=float) / 1000
+    try:
+        stacks = profiler.sample(seconds, max(interval, 0.001))
+    except profiler.ProfilerBusy as e:
+        return jsonify({"error": {"code": "CONFLICT", "message": str(e)}}), 409
+    resp = Response(profiler.collapsed(stacks), mimetype="text/plain")
+    resp.headers["X-Profile-Samples"] = str(sum(stacks.values()))
+    resp.headers["X-Profile-Pid"] = str(os.getpid())
+    return resp
+
+
+@bp.get("/profile/<trace_id>")
+@_admin_only
+def get_request_profile(trace_id: str):
+    """cProfile of a request sent with X-Profile: 1; ?format=text (default) or pstats."""
+    from app.core import profiler
+
+    entry = profiler.stored_profile(trace_id)
+    if entry is None:
+        return jsonify({"error": {"code": "NOT_FOUND", "message": f"No profile for {trace_id}"}}), 404
+    if request.args.get("format") == "pstats":
+        return Response(
+            profiler.profile_pstats(entry), mimetype="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{trace_id}.pstats"'},
+        )
+    sort = request.args.get("sort", "cumulative")
+    if sort not in ("cumulative", "tottime", "calls", "ncalls"):
+        sort = "cumulative"
+    return Response(profiler.profile_text(entry, sort), mimetype="text/plain")
+
+
+@bp.before_app_request
+def _start_request_profile():
+    if request.headers.get("X-Profile") != "1" or not admin_authorized():
+        return
+    from app.core import profiler
+    g._profile = profiler.start_request_profile()
+
+
+@bp.after_app_request
+def _finish_request_profile(resp):
+    prof = g.pop("_profile", None)
+    if prof is None:
+        if request.headers.get("X-Profile") == "1" and admin_authorized():
+            resp.headers["X-Profile"] = "busy"
+        return resp
+    from app.core import profiler
+    trace_id = g.get("trace_id") or str(uuid.uuid4())
+    profiler.finish_request_profile(prof, trace_id, f"{request.method} {request.path} -> {resp.status_code}")
+    resp.headers["X-Profile-Id"] = trace_id
+    return resp
+
+
+@bp.teardown_app_request
+def _discard_request_profile(_exc):
+    # an after_request hook raised before ours ran: don't leave the profiler hooked on this thread
+    prof = g.pop("_profile", None)
+    if prof is not None:
+        from app.core import profiler
+        profiler.discard_request_profile(prof)
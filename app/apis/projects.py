@@ -0,0 +1,227 @@
+# app/apis/projects.py
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
+
+bp = Blueprint("projects", __name__)
+
+MAX_PER_PAGE = 100
+
+
+def _error(code, message, status):
+    return jsonify({"error": {"code": code, "message": message}}), status
+
+
+@bp.before_request
+def _require_db():
+    if not current_app.config.get("ENABLE_DB"):
+        return _error("DB_DISABLED", "Project history requires ENABLE_DB=true", 503)
+
+
+@bp.before_request
+def _tenant_scope():
+    # a tenant bound to a project only sees that project; with TENANTS_FILE set,
+    # an unbound tenant (e.g. the legacy API_KEY) needs the admin key to see any
+    project_id = (request.view_args or {}).get("project_id")
+    tenant = g.get("tenant")
+    if project_id is None or tenant is None:
+        return
+    from app.core.tenants import get_registry, project_id_for
+    if not tenant.project:
+        from app.apis.admin import admin_authorized
+        if get_registry().configured and not admin_authorized():
+            return _error("FORBIDDEN", "Cross-tenant project access requires X-Admin-Key (ADMIN_API_KEY)", 403)
+        return
+    from app.db import SessionLocal
+
+    with SessionLocal.session_factory() as db:
+        if project_id != project_id_for(tenant, db):
+            return _error("FORBIDDEN", f"Project {project_id} belongs to another tenant", 403)
+
+
+def _project_dict(p):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "created_at": p.created_at.isoformat() if p.created_at else None,
+    }
+
+
+def _analysis_dict(a, include_result=False):
+    out = {
+        "id": a.id,
+        "project_id": a.project_id,
+        "analysis_type": a.analysis_type,
+        "input_hash": a.input_hash,
+        "trace_id": a.trace_id,
+        "created_at": a.created_at.isoformat() if a.created_at else None,
+    }
+    if include_result:
+        out["input"] = a.input_json
+        out["result"] = a.result_json
+    return out
+
+
+@bp.post("/")
+def create_project():
+    from app.db import SessionLocal
+    from app.models import Project
+
+    name = ((request.get_json(silent=True) or {}).get("name") or "").strip()
+    if not name:
+        return _error("BAD_REQUEST", "name is required", 400)
+    with SessionLocal.session_factory() as db:
+        if db.query(Project).filter(Project.name == name).one_or_none() is not None:
+            return _error("CONFLICT", f"Project {name!r} already exists", 409)
+        project = Project(name=name)
+        db.add(project)
+        db.commit()
+        return jsonify(_project_dict(project)), 201
+
+
+@bp.get("/<int:project_id>/analyses")
+def list_analyses(project_id: int):
+    from app.db import SessionLocal
+    from app.models import Analysis, Project
+
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), MAX_PER_PAGE)
+    kind = request.args.get("type")
+    include_result = request.args.get("include") == "result"
+
+    with SessionLocal.session_factory() as db:
+        if db.get(Project, project_id) is None:
+            return _error("NOT_FOUND", f"Unknown project {project_id}", 404)
+        q = db.query(Analysis).filter(Analysis.project_id == project_id)
+        if kind:
+            q = q.filter(Analysis.analysis_type == kind)
+        total = q.count()
+        rows = q.order_by(Analysis.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        return jsonify({
+            "project_id": project_id,
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "items": [_analysis_dict(a, include_result) for a in rows],
+        })
+
+
+@bp.get("/<int:project_id>/analyses/<int:analysis_id>")
+def get_analysis(project_id: int, analysis_id: int):
+    from app.db import SessionLocal
+    from app.models import Analysis
+
+    with SessionLocal.session_factory() as db:
+        a = db.get(Analysis, analysis_id)
+        if a is None or a.project_id != project_id:
+            return _error("NOT_FOUND", f"Unknown analysis {analysis_id}", 404)
+        from app.core.analyses import wants_markdown
+        if wants_markdown():
+            from app.core import markdown
+            return Response(markdown.render(a.analysis_type, a.result_json or {}), mimetype="text/markdown")
+        return jsonify(_analysis_dict(a, include_result=True))
+
+
+@bp.get("/<int:project_id>/risks")
+def project_risks(project_id: int):
+    """Portfolio-wide risk ranking across all stored risk analyses (no LLM call)."""
+    from app.core import risk_analytics as ra
+    from app.db import SessionLocal
+    from app.models import Project
+
+    top = min(max(request.args.get("top", 50, type=int), 1), 1000)
+    threshold = request.args.get("threshold", 0.8, type=float)
+    with SessionLocal.session_factory() as db:
+        if db.get(Project, project_id) is None:
+            return _error("NOT_FOUND", f"Unknown project {project_id}", 404)
+        table = ra.project_table(db, project_id)
+
+    total = len(table)
+    if request.args.get("dedupe", "1") != "0":
+        table = ra.deduped(table, threshold=threshold)
+    ranked = table.take(ra.rank(table)[:top])
+    return jsonify({
+        "project_id": project_id,
+        "total": total,
+        "unique": len(table),
+        "risks": ranked.to_rows(),
+    })
+
+
+@bp.get("/<int:project_id>/risks/heatmap")
+def project_risk_heatmap(project_id: int):
+    from app.core import risk_analytics as ra
+    from app.db import SessionLocal
+    from app.models import Project
+
+    with SessionLocal.session_factory() as db:
+        if db.get(Project, project_id) is None:
+            return _error("NOT_FOUND", f"Unknown project {project_id}", 404)
+        table = ra.project_table(db, project_id)
+
+    if request.args.get("dedupe") == "1":
+        table = ra.deduped(table, threshold=request.args.get("threshold", 0.8, type=float))
+    grid = ra.heatmap(table)
+    return jsonify({
+        "project_id": project_id,
+        "likelihood": list(range(1, ra.LIKELIHOOD_LEVELS + 1)),
+        "impact": list(range(1, ra.IMPACT_LEVELS + 1)),
+        "counts": grid.tolist(),   # counts[likelihood-1][impact-1]
+        "total": int(grid.sum()),
+    })
+
+
+def _stored_results(project_id: int, kind: str, analysis_id=None):
+    """Yield (analysis id, result) pairs in batches; the session lives as long as the stream."""
+    from app.db import SessionLocal
+    from app.models import Analysis
+
+    with SessionLocal.session_factory() as db:
+        q = db.query(Analysis.id, Analysis.result_json).filter(
+            Analysis.project_id == project_id, Analysis.analysis_type == kind
+        )
+        if analysis_id is not None:
+            q = q.filter(Analysis.id == analysis_id)
+        for aid, result in q.order_by(Analysis.id).yield_per(200):
+            yield aid, result or {}
+
+
+def _export(kind: str, fmt: str, results, filename: str):
+    from app.core.export import FORMATS, get_exporter
+
+    exporter = get_exporter(kind, fmt)
+    if exporter is None:
+        supported = ", ".join(sorted(FORMATS.get(kind, {}))) or "none"
+        return _error("BAD_REQUEST", f"format {fmt!r} not supported for {kind} (supported: {supported})", 400)
+    gen, mimetype, ext = exporter
+    return Response(
+        stream_with_context(gen(results)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{ext}"'},
+    )
+
+
+@bp.get("/<int:project_id>/export/<kind>")
+def export_project(project_id: int, kind: str):
+    """Stream every stored analysis of one type, e.g. /export/testcases?format=feature."""
+    from app.db import SessionLocal
+    from app.models import Project
+
+    with SessionLocal.session_factory() as db:
+        if db.get(Project, project_id) is None:
+            return _error("NOT_FOUND", f"Unknown project {project_id}", 404)
+    fmt = request.args.get("format", "csv")
+    return _export(kind, fmt, _stored_results(project_id, kind), f"project-{project_id}-{kind}")
+
+
+@bp.get("/<int:project_id>/analyses/<int:analysis_id>/export")
+def export_analysis(project_id: int, analysis_id: int):
+    from app.db import SessionLocal
+    from app.models import Analysis
+
+    with SessionLocal.session_factory() as db:
+        a = db.get(Analysis, analysis_id)
+        if a is None or a.project_id != project_id:
+            return _error("NOT_FOUND", f"Unknown analysis {analysis_id}", 404)
+        kind = a.analysis_type
+    fmt = request.args.get("format", "csv")
+    results = _stored_results(project_id, kind, analysis_id)
+    return _export(kind, fmt, results, f"analysis-{analysis_id}")
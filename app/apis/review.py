@@ -1,22 +1,31 @@
-import os
-from flask import Blueprint, request, jsonify
+# app/apis/review.py
+from flask import Blueprint, jsonify, request
+from app.core.analyses import analysis_response, parse_body, review_upload_response
 from app.core.schemas import ReviewRequest
-from app.core.llm import run_review
 
 bp = Blueprint("review", __name__)
 
-USE_DOCS = os.getenv("ENABLE_DOCS", "0") == "1"
-if USE_DOCS:
-    from app.core.docs import api as docs
 
 @bp.post("/")
 def handle_review():
-    body = ReviewRequest.model_validate_json(request.data)
-    resp = run_review(body)
-    return jsonify(resp.model_dump()), 200
+    body = parse_body(ReviewRequest)
+    return analysis_response("review", body)
 
-if USE_DOCS:
-    handle_review = docs.validate(
-        json=ReviewRequest,
-        tags=["Review"]
-    )(handle_review)
+
+def _list_arg(name: str) -> list[str]:
+    """?name=a&name=b or ?name=a,b"""
+    return [v.strip() for raw in request.args.getlist(name) for v in raw.split(",") if v.strip()]
+
+
+@bp.post("/upload")
+def handle_review_upload():
+    """
+    Review a large document sent as the raw request body (text/plain, UTF-8),
+    e.g. `curl --data-binary @design.md '.../review/upload?quality_goals=Security'`.
+    """
+    quality_goals = _list_arg("quality_goals")
+    if not quality_goals:
+        return jsonify({
+            "error": {"code": "BAD_REQUEST", "message": "quality_goals query parameter is required"}
+        }), 400
+    return review_upload_response(quality_goals, _list_arg("checklists"))
@@ -0,0 +1,74 @@
+# app/apis/search.py
+from flask import Blueprint, current_app, g, jsonify, request
+
+bp = Blueprint("search", __name__)
+
+MAX_PER_PAGE = 100
+
+
+def _error(code, message, status):
+    return jsonify({"error": {"code": code, "message": message}}), status
+
+
+@bp.get("", strict_slashes=False)
+def search_analyses():
+    """
+    Ranked full-text search over stored analyses:
+    /api/v1/search?q=kafka+ordering&type=review&project_id=3&page=1&per_page=20
+    """
+    if not current_app.config.get("ENABLE_DB"):
+        return _error("DB_DISABLED", "Search requires ENABLE_DB=true", 503)
+    from app.core import search
+    from app.core.tenants import get_registry, project_id_for
+    from app.db import SessionLocal
+    from app.models import Analysis
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return _error("BAD_REQUEST", "q is required", 400)
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), MAX_PER_PAGE)
+    project_id = request.args.get("project_id", type=int)
+    kind = request.args.get("type")
+
+    with SessionLocal.session_factory() as db:
+        tenant = g.get("tenant")
+        if tenant is not None and tenant.project:
+            # a tenant bound to a project only searches that project
+            own = project_id_for(tenant, db)
+            if project_id is not None and project_id != own:
+                return _error("FORBIDDEN", f"Project {project_id} belongs to another tenant", 403)
+            project_id = own
+        elif get_registry().configured:
+            # unbound tenants (e.g. the legacy API_KEY) search across tenants only with the admin key
+            from app.apis.admin import admin_authorized
+            if not admin_authorized():
+                return _error("FORBIDDEN", "Cross-tenant search requires X-Admin-Key (ADMIN_API_KEY)", 403)
+        try:
+            total, hits = search.search(db, q, project_id=project_id, kind=kind, page=page, per_page=per_page)
+        except search.SearchUnavailable as e:
+            return _error("SEARCH_UNAVAILABLE", str(e), 501)
+        rows = {
+            a.id: a for a in db.query(Analysis).filter(Analysis.id.in_([h["id"] for h in hits]))
+        }
+        items = []
+        for h in hits:
+            a = rows.get(h["id"])
+            if a is None:
+                continue
+            items.append({
+                "id": a.id,
+                "project_id": a.project_id,
+                "analysis_type": a.analysis_type,
+                "trace_id": a.trace_id,
+                "created_at": a.created_at.isoformat() if a.created_at else None,
+                "score": round(float(h["score"]), 4),
+                "snippet": h["snippet"],
+            })
+    return jsonify({
+        "q": q,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "items": items,
+    })
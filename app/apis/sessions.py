@@ -0,0 +1,95 @@
+# app/apis/sessions.py
+from flask import Blueprint, g, jsonify, request
+
+bp = Blueprint("sessions", __name__)
+
+
+def _error(code, message, status):
+    return jsonify({"error": {"code": code, "message": message}}), status
+
+
+def _tenant_name():
+    tenant = g.get("tenant")
+    return tenant.name if tenant is not None else ""
+
+
+def _turn(session, kind, delta):
+    from pydantic import ValidationError
+
+    from app.core.analyses import ANALYSES, current_tenant
+    from app.core.sessions import SessionBusy, run_turn
+    from app.core.tenants import TenantLimited
+
+    if kind not in ANALYSES:
+        return _error("BAD_REQUEST", f"kind must be one of: {', '.join(sorted(ANALYSES))}", 400)
+    if not isinstance(delta, dict):
+        return _error("BAD_REQUEST", "input/delta must be an object", 400)
+    try:
+        model, usage = run_turn(session, kind, delta, request.content_length or 0, current_tenant())
+    except ValidationError as e:
+        return _error("BAD_REQUEST", f"Invalid input for this turn: {e}", 400)
+    except SessionBusy:
+        return _error("SESSION_BUSY", "A turn is already running in this session", 409)
+    except TenantLimited as e:
+        resp = jsonify({"error": {"code": "RATE_LIMITED", "message": str(e)}})
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp, 429
+    return jsonify({
+        "session_id": session.id,
+        "turn": session.turns,
+        "kind": kind,
+        "result": model.model_dump(mode="json"),
+        "usage": usage,
+        "totals": session.totals,
+    })
+
+
+@bp.post("/")
+def create_session():
+    """Start a session with a first full input: {"kind": "design", "input": {...}}."""
+    from app.core.sessions import get_store
+
+    body = request.get_json(silent=True) or {}
+    store = get_store()
+    session = store.create(_tenant_name())
+    resp = _turn(session, body.get("kind"), body.get("input"))
+    if isinstance(resp, tuple):  # nothing to keep from a failed first turn
+        store.delete(session.id, session.tenant)
+        return resp
+    return resp, 201
+
+
+@bp.post("/<session_id>/turns")
+def add_turn(session_id: str):
+    """Follow-up with only what changed: {"kind": "risk", "delta": {"constraints": [...]}}."""
+    from app.core.sessions import SessionNotFound, get_store
+
+    body = request.get_json(silent=True) or {}
+    try:
+        session = get_store().get(session_id, _tenant_name())
+    except SessionNotFound:
+        return _error("NOT_FOUND", f"Unknown or expired session {session_id}", 404)
+    kind = body.get("kind") or next(reversed(session.inputs), None)
+    return _turn(session, kind, body.get("delta") or {})
+
+
+@bp.get("/<session_id>")
+def get_session(session_id: str):
+    from app.core.sessions import SessionNotFound, get_store
+
+    try:
+        session = get_store().get(session_id, _tenant_name())
+    except SessionNotFound:
+        return _error("NOT_FOUND", f"Unknown or expired session {session_id}", 404)
+    return jsonify(session.info())
+
+
+@bp.delete("/<session_id>")
+def delete_session(session_id: str):
+    from app.core.sessions import SessionNotFound, get_store
+
+    try:
+        get_store().delete(session_id, _tenant_name())
+    except SessionNotFound:
+        return _error("NOT_FOUND", f"Unknown or expired session {session_id}", 404)
+    return "", 204
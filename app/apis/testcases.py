@@ -1,22 +1,12 @@
-import os
-from flask import Blueprint, request, jsonify
+# app/apis/testcases.py
+from flask import Blueprint
+from app.core.analyses import analysis_response, parse_body
 from app.core.schemas import TestCaseRequest
-from app.core.llm import run_testcases
 
 bp = Blueprint("testcases", __name__)
 
-USE_DOCS = os.getenv("ENABLE_DOCS", "0") == "1"
-if USE_DOCS:
-    from app.core.docs import api as docs
 
 @bp.post("/")
 def handle_testcases():
-    body = TestCaseRequest.model_validate_json(request.data)
-    resp = run_testcases(body)
-    return jsonify(resp.model_dump()), 200
-
-if USE_DOCS:
-    handle_testcases = docs.validate(
-        json=TestCaseRequest,
-        tags=["TestCases"]
-    )(handle_testcases)
+    body = parse_body(TestCaseRequest)
+    return analysis_response("testcases", body)
@@ -1,26 +1,19 @@
 # app/apis/tradeoff.py
-import os
-from flask import Blueprint, request, jsonify
-from app.core.schemas import TradeoffRequest
-from app.core.llm import run_tradeoff
+from flask import Blueprint
+from app.core.analyses import analysis_response, parse_body
+from app.core.schemas import NwayTradeoffRequest, TradeoffRequest
 
 bp = Blueprint("tradeoff", __name__)
 
-# Only import Spectree if explicitly enabled
-USE_DOCS = os.getenv("ENABLE_DOCS", "0") == "1"
-if USE_DOCS:
-    from app.core.docs import api as docs  # <- imported only when enabled
 
 @bp.post("/")
 def handle_tradeoff():
-    body = TradeoffRequest.model_validate_json(request.data)
-    resp = run_tradeoff(body)
-    return jsonify(resp.model_dump()), 200
+    body = parse_body(TradeoffRequest)
+    return analysis_response("tradeoff", body)
 
-# If docs are enabled, apply the Spectree decorator dynamically
-if USE_DOCS:
-    handle_tradeoff = docs.validate(
-        json=TradeoffRequest,
-        # avoid Response(...) to keep it simple/compatible
-        tags=["Tradeoff"]
-    )(handle_tradeoff)
+
+@bp.post("/nway")
+def handle_tradeoff_nway():
+    """Compare 2-16 options at once; scored in parallel, ranked locally."""
+    body = parse_body(NwayTradeoffRequest)
+    return analysis_response("tradeoff_nway", body)
@@ -0,0 +1,235 @@
+# app/core/admission.py
+"""
+Admission control in front of the LLM: request lanes with weighted-fair scheduling.
+
+Every _gemini call takes one of LLM_CONCURRENCY slots in this process. When
+none is free, the call waits in its lane's bounded queue, and freed slots go to
+the waiting lanes in proportion to their weights (stride scheduling: the lane
+with the lowest virtual time goes next and advances by 1/weight). A lane that
+was idle rejoins at the current virtual time, so it can't bank credit.
+
+    ADMISSION_LANES=interactive=4:64,batch=1:32     # name=weight:max queued calls
+
+Load is shed with Overloaded (a TenantLimited, so handlers answer 429 +
+Retry-After), lowest weight first:
+
+    priority     a lane with a higher weight has calls waiting, so new
+                 lower-weight work is not queued at all
+    queue_full   the lane already has its maximum number of calls waiting
+    timeout      no slot within ADMISSION_WAIT_S
+
+The lane comes from the X-Priority header, else the tenant's "lane" (tenants
+file), else the first lane. A header can't pick a lane with a higher weight
+than the tenant's own. The lane is a contextvar, so pool threads started with
+tracing.bind (test-case shards, review chunks, n-way scoring) inherit it.
+Per-lane counters and queue-time percentiles are at /api/v1/admin/lanes.
+
+LLM_CONCURRENCY=0 turns admission control off.
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from app.core.tenants import TenantLimited
+
+DEFAULT_LANES = "interactive=4:64,batch=1:32"
+QUEUE_SAMPLES = 1024  # recent queue times kept per lane for percentiles
+
+_lane = contextvars.ContextVar("admission_lane", default=None)
+
+
+class Overloaded(TenantLimited):
+    """No LLM slot for this lane; `reason` is queue_full, priority or timeout."""
+
+    def __init__(self, message: str, retry_after: int, reason: str):
+        super().__init__(message, retry_after)
+        self.reason = reason
+
+
+class Lane:
+    __slots__ = ("name", "weight", "max_queue", "waiters", "vtime",
+                 "admitted", "shed", "in_service", "waits", "wait_total_s", "wait_max_s")
+
+    def __init__(self, name: str, weight: float, max_queue: int):
+        self.name = name
+        self.weight = weight
+        self.max_queue = max_queue
+        self.waiters = deque()
+        self.vtime = 0.0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "priority": 0, "timeout": 0}
+        self.in_service = 0
+        self.waits = deque(maxlen=QUEUE_SAMPLES)
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def stats(self) -> dict:
+        waits = sorted(self.waits)
+
+        def pct(p):
+            return round(waits[min(int(p * len(waits)), len(waits) - 1)] * 1000, 2) if waits else 0.0
+
+        return {
+            "weight": self.weight,
+            "max_queue": self.max_queue,
+            "queued": len(self.waiters),
+            "in_service": self.in_service,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "queue_ms": {
+                "mean": round(self.wait_total_s / self.admitted * 1000, 2) if self.admitted else 0.0,
+                "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                "max": round(self.wait_max_s * 1000, 2),
+            },
+        }
+
+
+class _Waiter:
+    __slots__ = ("lane", "event", "granted")
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.event = threading.Event()
+        self.granted = False
+
+
+def parse_lanes(spec: str) -> dict:
+    lanes = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rest = item.partition("=")
+        weight, _, queue = rest.partition(":")
+        lanes[name.strip()] = Lane(name.strip(), float(weight or 1), int(queue or 64))
+    return lanes
+
+
+class Admission:
+    def __init__(self, capacity: int, lanes: dict, wait_s: float = 30.0):
+        self.capacity = capacity
+        self.free = capacity
+        self.lanes = lanes
+        self.default = next(iter(lanes))
+        self.wait_s = wait_s
+        self.vclock = 0.0
+        self.service_s = 1.0  # EWMA of slot hold time, for Retry-After hints
+        self._lock = threading.Lock()
+
+    def lane_for(self, name):
+        return self.lanes.get(name) or self.lanes[self.default]
+
+    def _retry_after(self, ahead: int) -> int:
+        return max(1, math.ceil((ahead + 1) * self.service_s / max(self.capacity, 1)))
+
+    def acquire(self, lane: Lane) -> float:
+        """Take a slot for `lane`; returns seconds spent queued or raises Overloaded."""
+        with self._lock:
+            if self.free > 0:  # freed slots go straight to waiters, so nobody is queued
+                self.free -= 1
+                self._admitted(lane, 0.0)
+                return 0.0
+            queued = sum(len(l.waiters) for l in self.lanes.values())
+            if any(l.waiters for l in self.lanes.values() if l.weight > lane.weight):
+                lane.shed["priority"] += 1
+                raise Overloaded(f"Shedding {lane.name} work under load", self._retry_after(queued), "priority")
+            if len(lane.waiters) >= lane.max_queue:
+                lane.shed["queue_full"] += 1
+                raise Overloaded(f"{lane.name} queue is full", self._retry_after(queued), "queue_full")
+            if not lane.waiters:
+                lane.vtime = max(lane.vtime, self.vclock)  # no credit for idle time
+            w = _Waiter(lane)
+            lane.waiters.append(w)
+        t0 = time.monotonic()
+        w.event.wait(self.wait_s)
+        waited = time.monotonic() - t0
+        with self._lock:
+            if not w.granted:
+                lane.waiters.remove(w)
+                lane.shed["timeout"] += 1
+                raise Overloaded(f"No LLM slot within {self.wait_s:g}s", self._retry_after(queued), "timeout")
+            self._admitted(lane, waited)
+        return waited
+
+    def _admitted(self, lane: Lane, waited: float):
+        lane.admitted += 1
+        lane.in_service += 1
+        lane.waits.append(waited)
+        lane.wait_total_s += waited
+        lane.wait_max_s = max(lane.wait_max_s, waited)
+
+    def release(self, lane: Lane, held_s: float):
+        with self._lock:
+            lane.in_service -= 1
+            self.service_s += 0.2 * (held_s - self.service_s)
+            ready = [l for l in self.lanes.values() if l.waiters]
+            if not ready:
+                self.free += 1
+                return
+            nxt = min(ready, key=lambda l: (l.vtime, -l.weight))
+            self.vclock = nxt.vtime
+            nxt.vtime += 1.0 / nxt.weight
+            w = nxt.waiters.popleft()
+            w.granted = True  # the slot passes straight to the waiter
+            w.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "free": self.free,
+                "lanes": {name: l.stats() for name, l in self.lanes.items()},
+            }
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    """The process-wide Admission, or None when LLM_CONCURRENCY=0."""
+    global _admission
+    if _admission is None:
+        with _admission_lock:
+            if _admission is None:
+                _admission = Admission(
+                    int(os.getenv("LLM_CONCURRENCY", "16")),
+                    parse_lanes(os.getenv("ADMISSION_LANES", DEFAULT_LANES)),
+                    float(os.getenv("ADMISSION_WAIT_S", "30")),
+                )
+    return _admission if _admission.capacity > 0 else None
+
+
+def set_lane(name):
+    """Bind the current context (request, CLI run) to a lane; returns a token for reset."""
+    return _lane.set(name)
+
+
+def lane_for_request(header: str | None, tenant) -> str | None:
+    """X-Priority, capped at the tenant's own lane weight."""
+    adm = get_admission()
+    if adm is None:
+        return None
+    own = getattr(tenant, "lane", None)
+    if header not in adm.lanes:
+        return own
+    if own in adm.lanes and adm.lanes[header].weight > adm.lanes[own].weight:
+        return own
+    return header
+
+
+@contextmanager
+def slot():
+    """Hold one LLM slot for the current lane; yields (lane name, seconds queued)."""
+    adm = get_admission()
+    if adm is None:
+        yield None, 0.0
+        return
+    lane = adm.lane_for(_lane.get())
+    waited = adm.acquire(lane)
+    t0 = time.monotonic()
+    try:
+        yield lane.name, waited
+    finally:
+        adm.release(lane, time.monotonic() - t0)
@@ -0,0 +1,369 @@
+# app/core/analyses.py
+"""
+Dispatch for the /api/v1 analysis endpoints.
+
+Every run_* result is stored as an Analysis row (when ENABLE_DB=true), keyed by
+project, analysis type and a hash of the validated input. Repeat requests for
+the same input are answered from the tenant's in-memory cache or from that
+history without calling Gemini; send `Cache-Control: no-cache` (or
+`?refresh=1`) to force a fresh run.
+"""
+import hashlib
+import json
+import os
+import sys
+
+from flask import Response, current_app, g, has_request_context, jsonify, request
+
+from app.core import preprocess, tracing
+from app.core.cache import CompactResult
+from app.core.tenants import TenantLimited
+from app.core.schemas import (
+    TradeoffRequest, NwayTradeoffRequest, ReviewRequest, RiskRequest,
+    TestCaseRequest, DesignSuggestRequest, TechStackRequest,
+    TradeoffResponse, NwayTradeoffResponse, ReviewResponse, RiskResponse,
+    TestCaseResponse, DesignSuggestResponse, TechStackResponse,
+)
+
+# analysis_type -> (run_* function name in app.core.llm, response model)
+ANALYSES = {
+    "tradeoff": ("run_tradeoff", TradeoffResponse),
+    "tradeoff_nway": ("run_tradeoff_nway", NwayTradeoffResponse),
+    "review": ("run_review", ReviewResponse),
+    "risk": ("run_risk", RiskResponse),
+    "testcases": ("run_testcases", TestCaseResponse),
+    "design": ("run_design_suggest", DesignSuggestResponse),
+    "techstack": ("run_techstack", TechStackResponse),
+}
+
+# analysis_type -> request model (served at POST /api/v1/<kind>/; tradeoff_nway at /tradeoff/nway)
+REQUESTS = {
+    "tradeoff": TradeoffRequest,
+    "tradeoff_nway": NwayTradeoffRequest,
+    "review": ReviewRequest,
+    "risk": RiskRequest,
+    "testcases": TestCaseRequest,
+    "design": DesignSuggestRequest,
+    "techstack": TechStackRequest,
+}
+
+DEFAULT_PROJECT = "default"
+
+
+class ProjectNotFound(Exception):
+    pass
+
+
+def canonical_input(req) -> dict:
+    return req.model_dump(mode="json")
+
+
+def input_hash(kind: str, req) -> str:
+    """Stable hash of the validated request (field order and whitespace don't matter)."""
+    blob = json.dumps(canonical_input(req), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{kind}\n{blob}".encode("utf-8")).hexdigest()
+
+
+def parse_body(model):
+    """Validate the JSON request body against `model` (traced as its own span)."""
+    with tracing.span("validate.request", **{"schema": model.__name__, "body_bytes": len(request.data)}):
+        return model.model_validate_json(request.data)
+
+
+def _persist_enabled() -> bool:
+    return bool(current_app.config.get("ENABLE_DB"))
+
+
+def _wants_refresh() -> bool:
+    if not has_request_context():
+        return False
+    cc = request.headers.get("Cache-Control", "")
+    return "no-cache" in cc or request.args.get("refresh") == "1"
+
+
+def current_tenant():
+    from app.core import tenants
+
+    tenant = g.get("tenant") if has_request_context() else None
+    return tenant or tenants.get_registry().default
+
+
+def _requested_project_id():
+    raw = request.headers.get("X-Project-Id") if has_request_context() else None
+    return int(raw) if raw and raw.isdigit() else None
+
+
+def resolve_project_id(db, project_id=None, tenant=None) -> int:
+    """
+    A tenant bound to a project always writes there. Otherwise an explicit id
+    (X-Project-Id) must exist, and the shared default project is the fallback.
+    """
+    from app.core.tenants import project_id_for
+    from app.models import Project
+
+    bound = project_id_for(tenant, db)
+    if bound is not None:
+        return bound
+    if project_id is None:
+        project_id = _requested_project_id()
+    if project_id is not None:
+        if db.get(Project, project_id) is None:
+            raise ProjectNotFound(project_id)
+        return project_id
+
+    project = db.query(Project).filter(Project.name == DEFAULT_PROJECT).one_or_none()
+    if project is None:
+        project = Project(name=DEFAULT_PROJECT)
+        db.add(project)
+        db.commit()
+    return project.id
+
+
+def lookup(db, project_id: int, kind: str, digest: str):
+    from app.models import Analysis
+
+    return (
+        db.query(Analysis)
+        .filter(
+            Analysis.project_id == project_id,
+            Analysis.analysis_type == kind,
+            Analysis.input_hash == digest,
+        )
+        .order_by(Analysis.id.desc())
+        .first()
+    )
+
+
+def record(db, project_id: int, kind: str, digest: str, req, payload: dict):
+    from app.core import search  # SQLAlchemy is only loaded when the DB is on
+    from app.models import Analysis
+
+    with tracing.span("db.insert", **{"db.sql.table": "analyses", "analysis.type": kind}):
+        row = Analysis(
+            project_id=project_id,
+            analysis_type=kind,
+            input_hash=digest,
+            input_json=canonical_input(req),
+            result_json=payload,
+            trace_id=payload.get("trace_id"),
+        )
+        db.add(row)
+        db.flush()  # assigns row.id for the search index; both land in one commit
+        search.index(db, row)
+        db.commit()
+        return row
+
+
+def warm_cache(tenant, limit: int) -> int:
+    """
+    Load the newest stored analyses of the default project into `tenant`'s
+    response cache (e.g. after `python -m app.prewarm`). Returns rows loaded.
+    """
+    from app.db import SessionLocal
+    from app.models import Analysis, Project
+
+    entries, seen = [], set()
+    with SessionLocal.session_factory() as db:
+        project = db.query(Project).filter(Project.name == DEFAULT_PROJECT).one_or_none()
+        if project is None:
+            return 0
+        q = (
+            db.query(Analysis.id, Analysis.analysis_type, Analysis.input_hash, Analysis.result_json)
+            .filter(Analysis.project_id == project.id)
+            .order_by(Analysis.id.desc())
+        )
+        for aid, kind, digest, result in q.yield_per(200):
+            if len(entries) >= limit:
+                break
+            if (kind, digest) in seen:
+                continue  # an older run of the same input
+            seen.add((kind, digest))
+            entries.append((_key(kind, digest, None, ""), CompactResult.from_payload(result, aid)))
+    # oldest first, so the newest end up most-recently-used
+    for key, value in reversed(entries):
+        tenant.cache.set(key, value)
+    return len(entries)
+
+
+def _key(kind: str, digest: str, project, pinned: str) -> tuple:
+    # interned kind/version strings and the raw 32-byte digest keep cache keys small
+    return sys.intern(kind), bytes.fromhex(digest), project, sys.intern(pinned)
+
+
+def _cache_key(kind: str, digest: str, tenant, project_id) -> tuple:
+    # scoped by project (tenants without a bound project can switch via X-Project-Id)
+    # and by a pinned prompt version, which changes the answer
+    project = tenant.project or project_id or _requested_project_id()
+    pinned = request.headers.get("X-Prompt-Version", "") if has_request_context() else ""
+    return _key(kind, digest, project, pinned)
+
+
+def _report_preprocess(pipe):
+    stats = pipe.stats()
+    span = tracing.current()
+    if span is not None:
+        span.attributes.update({f"preprocess.{k}": v for k, v in stats.items() if k != "chars_saved_by_step"})
+    if has_request_context():
+        g.preprocess = stats
+
+
+def _preprocess(kind: str, req):
+    """Shrink pasted documents before the prompt is built (see app.core.preprocess)."""
+    if kind not in preprocess.FIELDS:
+        return req
+    with tracing.span("preprocess", **{"analysis.type": kind}):
+        req, pipe = preprocess.apply(kind, req)
+        if pipe is not None:
+            _report_preprocess(pipe)
+    return req
+
+
+def _preprocess_headers(resp):
+    stats = g.pop("preprocess", None) if has_request_context() else None
+    if stats:
+        resp.headers["X-Input-Tokens"] = str(stats["tokens_after"])
+        resp.headers["X-Input-Tokens-Saved"] = str(stats["tokens_saved"])
+    return resp
+
+
+def _call_llm(kind: str, req, tenant):
+    """Run the analysis under the tenant's quota and concurrency limits; returns the response model."""
+    from app.core import llm
+
+    runner = getattr(llm, ANALYSES[kind][0])
+    req = _preprocess(kind, req)
+    tenant.check_quota()
+    tenant.acquire(timeout=float(os.getenv("TENANT_SLOT_TIMEOUT_S", "30")))
+    try:
+        return runner(req)
+    finally:
+        tenant.release()
+
+
+def run_analysis(kind: str, req, project_id=None, refresh=None, tenant=None):
+    """
+    Run one analysis, answering from the tenant's in-memory cache, then stored
+    history, before calling the LLM. Returns (CompactResult, meta dict); meta
+    carries the stored analysis id and where the result came from.
+    """
+    tenant = tenant or current_tenant()
+    refresh = _wants_refresh() if refresh is None else refresh
+    digest = input_hash(kind, req)
+    key = _cache_key(kind, digest, tenant, project_id)
+
+    if not refresh:
+        cached = tenant.cache.get(key)
+        if cached is not None:
+            return cached, {"source": "cache", "analysis_id": cached.analysis_id}
+
+    if not _persist_enabled():
+        result = CompactResult.from_model(_call_llm(kind, req, tenant))
+        tenant.cache.set(key, result)
+        return result, {"source": "llm", "analysis_id": None}
+
+    from app.db import SessionLocal
+
+    # short sessions on either side of the LLM call; no connection is held while waiting on Gemini
+    with SessionLocal.session_factory() as db:
+        pid = resolve_project_id(db, project_id, tenant)
+        hit = None if refresh else lookup(db, pid, kind, digest)
+        if hit is not None:
+            result = CompactResult.from_payload(hit.result_json, hit.id)
+            tenant.cache.set(key, result)
+            return result, {"source": "history", "analysis_id": hit.id}
+
+    model = _call_llm(kind, req, tenant)
+    result = CompactResult.from_model(model)
+    with SessionLocal.session_factory() as db:
+        try:
+            result.analysis_id = record(db, pid, kind, digest, req, model.model_dump(mode="json")).id
+        except Exception:
+            # storing history must never fail the request itself
+            db.rollback()
+            current_app.logger.exception("failed to store %s analysis", kind)
+    tenant.cache.set(key, result)
+    return result, {"source": "llm", "analysis_id": result.analysis_id}
+
+
+def wants_markdown() -> bool:
+    best = request.accept_mimetypes.best_match(["application/json", "text/markdown"])
+    return best == "text/markdown"
+
+
+def result_response(kind: str, result: CompactResult) -> Response:
+    """The result as JSON, or as a locally rendered Markdown report for Accept: text/markdown."""
+    if wants_markdown():
+        from app.core import markdown
+        resp = Response(markdown.render(kind, result.payload()), mimetype="text/markdown")
+    else:
+        # the cached bytes are the response body; nothing is re-serialised on a hit
+        resp = Response(result.body, mimetype="application/json")
+        g.compact_result = result  # compression.finalize reuses its ETag and compressed bodies
+    resp.vary.add("Accept")
+    return resp
+
+
+def analysis_response(kind: str, req):
+    """Flask response for a POST analysis endpoint."""
+    try:
+        result, meta = run_analysis(kind, req)
+    except ProjectNotFound as e:
+        return jsonify({
+            "error": {"code": "NOT_FOUND", "message": f"Unknown project {e.args[0]}"}
+        }), 404
+    except TenantLimited as e:
+        resp = jsonify({"error": {"code": "RATE_LIMITED", "message": str(e)}})
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp, 429
+
+    resp = _preprocess_headers(result_response(kind, result))
+    resp.headers["X-Analysis-Source"] = meta["source"]
+    if meta["analysis_id"] is not None:
+        resp.headers["X-Analysis-Id"] = str(meta["analysis_id"])
+    g.analysis_id = meta["analysis_id"]
+    return resp, 200
+
+
+def review_upload_response(quality_goals, checklists):
+    """
+    Flask response for a raw-text review upload. The body is streamed to a temp
+    file and fed to the chunked review path a read at a time, so the document is
+    never held in memory whole. Uploads are not stored as history rows.
+    """
+    import io
+
+    from app.core import llm
+    from app.core.limits import DocumentTooLarge, spool_body
+    from app.core.schemas import ReviewRequest
+
+    tenant = current_tenant()
+    req = ReviewRequest(document="", quality_goals=quality_goals, checklists=checklists)
+    f, size, digest = spool_body(request.stream, request.max_content_length)
+    try:
+        text = io.TextIOWrapper(f, encoding="utf-8", errors="replace")
+        parts = iter(lambda: text.read(llm.REVIEW_CHUNK_CHARS), "")
+        pipe = preprocess.Pipeline()
+        if pipe:
+            parts = pipe.stream(parts)
+        tenant.check_quota()
+        tenant.acquire(timeout=float(os.getenv("TENANT_SLOT_TIMEOUT_S", "30")))
+        try:
+            result = CompactResult.from_model(llm.run_review(req, parts=parts))
+        finally:
+            tenant.release()
+        if pipe:
+            _report_preprocess(pipe)
+    except TenantLimited as e:
+        resp = jsonify({"error": {"code": "RATE_LIMITED", "message": str(e)}})
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp, 429
+    except DocumentTooLarge as e:
+        return jsonify({"error": {"code": "PAYLOAD_TOO_LARGE", "message": str(e)}}), 413
+    finally:
+        f.close()
+
+    resp = _preprocess_headers(result_response("review", result))
+    resp.headers["X-Analysis-Source"] = "llm"
+    resp.headers["X-Document-Bytes"] = str(size)
+    resp.headers["X-Document-Sha256"] = digest
+    return resp, 200
@@ -0,0 +1,103 @@
+# app/core/cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe LRU cache with a per-entry TTL. One instance per tenant."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CompactResult:
+    """
+    Cached analysis in its canonical wire form: compact UTF-8 JSON bytes.
+
+    A cache hit is written straight to the response, with no model_dump or
+    json.dumps, and bytes take a fraction of the memory of the equivalent
+    pydantic model or nested dicts (see benchmarks/bench_cache_memory.py).
+    """
+
+    __slots__ = ("body", "analysis_id", "_etag", "_encoded")
+
+    def __init__(self, body: bytes, analysis_id=None):
+        self.body = body
+        self.analysis_id = analysis_id
+        self._etag = None
+        self._encoded = None  # encoding -> compressed body, filled on first use
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            from app.core.compression import content_etag
+            self._etag = content_etag(self.body)
+        return self._etag
+
+    def encoded(self, encoding: str) -> bytes:
+        """The body compressed with `encoding`; compressed once per cached result."""
+        data = self._encoded.get(encoding) if self._encoded else None
+        if data is None:
+            from app.core.compression import compress
+            data = compress(self.body, encoding)
+            # a new dict each time: concurrent readers never see one mid-update
+            self._encoded = {**(self._encoded or {}), encoding: data}
+        return data
+
+    @classmethod
+    def from_payload(cls, payload: dict, analysis_id=None) -> "CompactResult":
+        return cls(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), analysis_id)
+
+    @classmethod
+    def from_model(cls, model, analysis_id=None) -> "CompactResult":
+        return cls(model.model_dump_json().encode("utf-8"), analysis_id)
+
+    def payload(self) -> dict:
+        return json.loads(self.body)
@@ -0,0 +1,88 @@
+# app/core/compression.py
+"""
+Response compression and conditional GETs.
+
+finalize() runs as the app's last after_request hook, after the response log
+has recorded the plain body, and:
+
+- gives GET responses a strong ETag from a sha256 of the body and answers
+  If-None-Match with 304 (stored analyses, traces, listings). Analysis
+  results carry their ETag on the cached CompactResult, so a cache hit
+  doesn't re-hash;
+- compresses JSON / text bodies of at least COMPRESS_MIN_BYTES with the best
+  encoding the client accepts: br when the optional `brotli` package is
+  installed, else gzip. For analysis results, each encoding is compressed
+  once and kept on the cached CompactResult, so later hits send stored bytes.
+
+Each encoding is its own representation, so the ETag gets an encoding suffix
+("<hash>-gzip") and the response varies on Accept-Encoding.
+COMPRESS_MIN_BYTES=0 disables compression; ETags are always sent.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import g, request
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE = {"application/json", "text/markdown", "text/plain", "text/csv", "text/x-gherkin"}
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def content_etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate() -> str | None:
+    """Best encoding the client accepts (q-values honoured), or None for identity."""
+    if not COMPRESS_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def finalize(resp):
+    """after_request: ETag / 304 for GETs, then negotiated compression."""
+    if resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed \
+            or "Content-Encoding" in resp.headers:
+        return resp
+    result = g.pop("compact_result", None)  # set by analyses.result_response for JSON results
+    body = resp.get_data()
+    conditional = request.method in ("GET", "HEAD")
+    if not conditional and result is None:
+        etag = None
+    else:
+        etag = result.etag if result is not None else content_etag(body)
+
+    encoding = None
+    if resp.mimetype in COMPRESSIBLE and COMPRESS_MIN_BYTES and len(body) >= COMPRESS_MIN_BYTES:
+        resp.vary.add("Accept-Encoding")
+        encoding = negotiate()
+
+    if etag is not None:
+        tag = f"{etag}-{encoding}" if encoding else etag
+        resp.set_etag(tag)
+        if conditional and request.if_none_match.contains_weak(tag):
+            resp.status_code = 304
+            resp.set_data(b"")
+            resp.headers.pop("Content-Type", None)
+            return resp
+
+    if encoding:
+        resp.set_data(result.encoded(encoding) if result is not None else compress(body, encoding))
+        resp.headers["Content-Encoding"] = encoding
+    return resp
@@ -0,0 +1,173 @@
+# app/core/export.py
+"""
+Streaming exporters for stored analyses.
+
+Each exporter takes an iterable of (analysis_id, result dict) pairs and yields
+text chunks, one small chunk per row, so a project with 10k stored test cases
+is exported with constant memory when fed from a `yield_per` query and sent
+with Flask's stream_with_context.
+"""
+import csv
+import io
+
+# analysis_type -> {format: (exporter name, mimetype, file extension)}
+FORMATS = {
+    "tradeoff": {
+        "csv": ("tradeoff_csv", "text/csv", "csv"),
+        "md": ("tradeoff_markdown", "text/markdown", "md"),
+    },
+    "testcases": {
+        "csv": ("testcases_csv", "text/csv", "csv"),
+        "md": ("testcases_markdown", "text/markdown", "md"),
+        "feature": ("testcases_feature", "text/x-gherkin", "feature"),
+    },
+    "risk": {
+        "csv": ("risks_csv", "text/csv", "csv"),
+        "md": ("risks_markdown", "text/markdown", "md"),
+    },
+    "design": {
+        "mermaid": ("design_mermaid", "text/markdown", "md"),
+    },
+}
+
+
+def get_exporter(kind: str, fmt: str):
+    """(generator function, mimetype, extension) or None if the pair isn't supported."""
+    entry = FORMATS.get(kind, {}).get(fmt)
+    if entry is None:
+        return None
+    name, mimetype, ext = entry
+    return globals()[name], mimetype, ext
+
+
+# --- helpers ---
+
+class _CsvRow:
+    """Format one CSV row at a time through a reused buffer."""
+
+    def __init__(self):
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf)
+
+    def __call__(self, row) -> str:
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._writer.writerow(row)
+        return self._buf.getvalue()
+
+
+def _md(value) -> str:
+    """Escape a value for a Markdown table cell."""
+    text = "" if value is None else str(value)
+    return text.replace("|", "\\|").replace("\r", "").replace("\n", "<br>")
+
+
+def _md_row(cells) -> str:
+    return "| " + " | ".join(_md(c) for c in cells) + " |\n"
+
+
+def _md_header(cells) -> str:
+    return _md_row(cells) + "|" + "---|" * len(cells) + "\n"
+
+
+def _gherkin(value) -> str:
+    return " ".join(str(value or "").split())
+
+
+# --- tradeoff ---
+
+TRADEOFF_COLUMNS = ["analysis_id", "criterion", "option_a", "option_b", "verdict", "notes"]
+
+
+def tradeoff_csv(results):
+    row = _CsvRow()
+    yield row(TRADEOFF_COLUMNS)
+    for aid, res in results:
+        for m in res.get("matrix", []):
+            yield row([aid, m.get("criterion"), m.get("option_a"), m.get("option_b"),
+                       m.get("verdict"), m.get("notes", "")])
+
+
+def tradeoff_markdown(results):
+    for aid, res in results:
+        ctx = res.get("context") or {}
+        a, b = ctx.get("option_a", "Option A"), ctx.get("option_b", "Option B")
+        yield f"## Trade-off #{aid}: {_md(a)} vs {_md(b)}\n\n"
+        yield _md_header(["Criterion", a, b, "Verdict", "Notes"])
+        for m in res.get("matrix", []):
+            yield _md_row([m.get("criterion"), m.get("option_a"), m.get("option_b"),
+                           m.get("verdict"), m.get("notes", "")])
+        if res.get("summary"):
+            yield f"\n{res['summary']}\n"
+        yield "\n"
+
+
+# --- test cases ---
+
+TESTCASE_COLUMNS = ["analysis_id", "id", "title", "priority", "type", "given", "when", "then"]
+
+
+def testcases_csv(results):
+    row = _CsvRow()
+    yield row(TESTCASE_COLUMNS)
+    for aid, res in results:
+        for c in res.get("cases", []):
+            yield row([aid] + [c.get(k, "") for k in TESTCASE_COLUMNS[1:]])
+
+
+def testcases_markdown(results):
+    yield _md_header(["Analysis", "ID", "Title", "Priority", "Type", "Given", "When", "Then"])
+    for aid, res in results:
+        for c in res.get("cases", []):
+            yield _md_row([aid] + [c.get(k, "") for k in TESTCASE_COLUMNS[1:]])
+
+
+def testcases_feature(results):
+    """One Gherkin Feature; each stored analysis becomes a Rule block."""
+    yield "Feature: Generated test cases\n"
+    for aid, res in results:
+        yield f"\n  Rule: Analysis {aid} - {_gherkin(res.get('summary')) or 'test cases'}\n"
+        for c in res.get("cases", []):
+            tags = " ".join(f"@{_gherkin(t).replace(' ', '_')}"
+                            for t in (c.get("id"), c.get("priority"), c.get("type")) if t)
+            yield (
+                f"\n    {tags}\n"
+                f"    Scenario: {_gherkin(c.get('title'))}\n"
+                f"      Given {_gherkin(c.get('given'))}\n"
+                f"      When {_gherkin(c.get('when'))}\n"
+                f"      Then {_gherkin(c.get('then'))}\n"
+            )
+
+
+# --- risks ---
+
+RISK_COLUMNS = ["analysis_id", "risk_id", "category", "description", "likelihood", "impact",
+                "score", "mitigation", "owner", "due_by"]
+
+
+def risks_csv(results):
+    row = _CsvRow()
+    yield row(RISK_COLUMNS)
+    for aid, res in results:
+        for r in res.get("risks", []):
+            yield row([aid] + [r.get(k, "") for k in RISK_COLUMNS[1:]])
+
+
+def risks_markdown(results):
+    yield _md_header(["Analysis", "Risk", "Category", "Description", "L", "I", "Score",
+                      "Mitigation", "Owner", "Due"])
+    for aid, res in results:
+        for r in res.get("risks", []):
+            yield _md_row([aid] + [r.get(k, "") for k in RISK_COLUMNS[1:]])
+
+
+# --- design ---
+
+def design_mermaid(results):
+    """Markdown bundle of every option's diagram_mermaid, fenced so it renders on GitHub/GitLab."""
+    for aid, res in results:
+        for opt in res.get("options", []):
+            diagram = (opt.get("diagram_mermaid") or "").strip()
+            if not diagram:
+                continue
+            yield f"## {_md(opt.get('name'))} (analysis {aid})\n\n```mermaid\n{diagram}\n```\n\n"
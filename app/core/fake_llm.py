@@ -0,0 +1,91 @@
+# app/core/fake_llm.py
+"""
+Deterministic stand-in for Gemini, enabled with LLM_BACKEND=fake.
+
+Used by benchmarks and load tools so runs don't depend on quota, network or
+model randomness. The response schema is recovered from the system prompt (the
+run_* prompts embed `Model.model_json_schema()`), and a minimal valid document
+is generated from it. FAKE_LLM_LATENCY_MS adds a fixed sleep per call to
+mimic model latency.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+_TITLE_RE = re.compile(r"""['"]title['"]\s*:\s*['"](\w+)['"]""")
+
+
+def _latency_s() -> float:
+    return float(os.getenv("FAKE_LLM_LATENCY_MS", "0")) / 1000.0
+
+
+def _response_model(system: str):
+    """The top-level schema title is the last 'title' key in a pydantic JSON schema."""
+    from app.core import schemas
+
+    titles = _TITLE_RE.findall(system)
+    for title in reversed(titles):
+        model = getattr(schemas, title, None)
+        if model is not None and hasattr(model, "model_json_schema"):
+            return model
+    return None
+
+
+def _word(seed: str, path: str) -> str:
+    return hashlib.blake2b(f"{seed}:{path}".encode(), digest_size=3).hexdigest()
+
+
+def _resolve(node: dict, defs: dict) -> dict:
+    ref = node.get("$ref")
+    if ref:
+        return defs[ref.rsplit("/", 1)[-1]]
+    return node
+
+
+def _sample(node: dict, defs: dict, seed: str, path: str):
+    node = _resolve(node, defs)
+    if "enum" in node:
+        return node["enum"][0]
+    if "const" in node:
+        return node["const"]
+    if "anyOf" in node:
+        # Optional[X] -> first non-null branch
+        branches = [b for b in node["anyOf"] if b.get("type") != "null"]
+        return _sample(branches[0], defs, seed, path) if branches else None
+    if "default" in node and node["default"] not in (None, [], {}):
+        return node["default"]
+
+    kind = node.get("type")
+    if kind == "object":
+        props = node.get("properties")
+        if props:
+            return {k: _sample(v, defs, seed, f"{path}.{k}") for k, v in props.items()}
+        extra = node.get("additionalProperties")
+        if not isinstance(extra, dict) or not extra:  # Dict[str, Any] -> `true`
+            extra = {"type": "string"}
+        return {"note": _sample(extra, defs, seed, f"{path}.note")}
+    if kind == "array":
+        return [_sample(node.get("items", {}), defs, seed, f"{path}[{i}]") for i in range(2)]
+    if kind == "integer":
+        return 2
+    if kind == "number":
+        return 0.5
+    if kind == "boolean":
+        return True
+    return f"{path.rsplit('.', 1)[-1] or 'value'} {_word(seed, path)}"
+
+
+def generate(system: str, user: str) -> str:
+    """Return a JSON string shaped like the response model named in `system`."""
+    delay = _latency_s()
+    if delay:
+        time.sleep(delay)
+
+    model = _response_model(system)
+    if model is None:
+        return json.dumps({"summary": "fake response"})
+    schema = model.model_json_schema()
+    doc = _sample(schema, schema.get("$defs", {}), user, "")
+    return json.dumps(doc)
@@ -0,0 +1,227 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key support for POSTs under /api/v1.
+
+A client that retries after a gateway timeout would otherwise re-run the
+whole LLM call, even though the first attempt often finished. With an
+`Idempotency-Key` header, the first request owns the key while it runs, and
+its response is kept for IDEMPOTENCY_TTL_S. A retry with the same key and the
+same body then:
+
+- waits up to IDEMPOTENCY_WAIT_S for the running call and gets its response,
+  or 409 IDEMPOTENCY_IN_PROGRESS (with Retry-After) if it is still running;
+- once the call has finished, gets the stored response immediately, marked
+  `Idempotent-Replayed: true`.
+
+Keys are scoped to tenant, method and path. Reusing a key with a different
+body is 422 IDEMPOTENCY_KEY_REUSED. JSON bodies are fingerprinted by hash.
+Streamed uploads are not read here, so they are fingerprinted by content
+type, length and query string. 5xx, 429 and streamed responses are not
+stored: the key is released so a retry runs again.
+
+Entries live in this worker's memory (an LRU bounded by
+IDEMPOTENCY_MAX_ENTRIES and pruned by TTL), like the response cache. A retry
+routed to another worker runs again; IDEMPOTENCY_TTL_S=0 turns this off.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, g, jsonify, request
+
+HEADER = "Idempotency-Key"
+MAX_KEY_CHARS = 255
+# not replayed: recomputed per response (Content-Length) or per request (trace / request timing)
+_SKIP_HEADERS = {"content-length", "date", "x-trace-id", "server-timing"}
+
+
+class KeyReused(Exception):
+    pass
+
+
+class InProgress(Exception):
+    def __init__(self):
+        super().__init__("A request with this Idempotency-Key is still in progress")
+
+
+class Entry:
+    __slots__ = ("fingerprint", "created", "done", "status", "headers", "body")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.created = time.monotonic()
+        self.done = threading.Event()
+        self.status = None   # set once the owner's response is stored
+        self.headers = None
+        self.body = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body or b"") + sum(len(k) + len(v) for k, v in self.headers or ())
+
+
+class IdempotencyStore:
+    """Thread-safe, TTL-pruned LRU of keys -> in-flight or completed responses."""
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: OrderedDict[tuple, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"owned": 0, "replayed": 0, "waited": 0, "in_progress": 0, "reused": 0, "released": 0}
+
+    def begin(self, key: tuple, fingerprint: str, wait_s: float):
+        """("owner", entry) for the first request, ("replay", entry) once a response is stored."""
+        deadline = time.monotonic() + wait_s
+        waited = False
+        while True:
+            with self._lock:
+                self._prune()
+                e = self._data.get(key)
+                if e is None:
+                    e = self._data[key] = Entry(fingerprint)
+                    self.counts["owned"] += 1
+                    return "owner", e
+                if e.fingerprint != fingerprint:
+                    self.counts["reused"] += 1
+                    raise KeyReused(key[-1])
+                if e.status is not None:
+                    self._data.move_to_end(key)
+                    self.counts["replayed"] += 1
+                    self.counts["waited"] += waited
+                    return "replay", e
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not e.done.wait(remaining):
+                with self._lock:
+                    self.counts["in_progress"] += 1
+                raise InProgress()
+            waited = True  # finished or released; look again
+
+    def complete(self, key: tuple, e: Entry, status: int, headers: list, body: bytes):
+        with self._lock:
+            e.status, e.headers, e.body = status, headers, body
+            self._evict()
+        e.done.set()
+
+    def release(self, key: tuple, e: Entry):
+        """Forget an in-flight key whose request failed, so a retry runs again."""
+        with self._lock:
+            if self._data.get(key) is e:
+                del self._data[key]
+                self.counts["released"] += 1
+        e.done.set()
+
+    def _prune(self):
+        # insertion order is creation order, so expired entries are at the front
+        cutoff = time.monotonic() - self.ttl
+        while self._data:
+            key, e = next(iter(self._data.items()))
+            if e.created > cutoff or e.status is None:
+                break
+            del self._data[key]
+
+    def _evict(self):
+        # oldest completed entries first; in-flight keys are never evicted
+        excess = len(self._data) - self.max_entries
+        if excess > 0:
+            for key in [k for k, e in self._data.items() if e.status is not None][:excess]:
+                del self._data[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "in_flight": sum(1 for e in self._data.values() if e.status is None),
+                "bytes": sum(e.size for e in self._data.values()),
+                "ttl_s": self.ttl,
+                "max_entries": self.max_entries,
+                **self.counts,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore(
+                    ttl=float(os.getenv("IDEMPOTENCY_TTL_S", "3600")),
+                    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+                )
+    return _store
+
+
+def _fingerprint() -> str:
+    if request.is_json:
+        body = request.get_data(cache=True)
+        return hashlib.sha256(body).hexdigest()
+    # streamed uploads (review/upload) are spooled by the view; don't read them here
+    return f"{request.content_type}:{request.content_length}:{request.query_string.decode()}"
+
+
+def _error(status: int, code: str, message: str):
+    return jsonify({"error": {"code": code, "message": message}}), status
+
+
+def _replay(e: Entry):
+    resp = Response(e.body, status=e.status, headers=e.headers)
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+def _begin():
+    if request.method != "POST" or not request.path.startswith("/api/v1/"):
+        return None
+    key = request.headers.get(HEADER)
+    if key is None or get_store().ttl <= 0:
+        return None
+    if not key.strip() or len(key) > MAX_KEY_CHARS:
+        return _error(400, "BAD_REQUEST", f"{HEADER} must be 1-{MAX_KEY_CHARS} characters")
+
+    tenant = getattr(g.get("tenant"), "name", "default")
+    scope = (tenant, request.method, request.path, key)
+    try:
+        role, e = get_store().begin(scope, _fingerprint(), float(os.getenv("IDEMPOTENCY_WAIT_S", "30")))
+    except KeyReused:
+        return _error(422, "IDEMPOTENCY_KEY_REUSED", f"{HEADER} was already used with a different request")
+    except InProgress as exc:
+        resp, status = _error(409, "IDEMPOTENCY_IN_PROGRESS", str(exc))
+        resp.headers["Retry-After"] = "1"
+        return resp, status
+    if role == "replay":
+        return _replay(e)
+    g.idempotency = (scope, e)
+    return None
+
+
+def _finish(resp):
+    pending = g.pop("idempotency", None)
+    if pending is None:
+        return resp
+    scope, e = pending
+    if resp.status_code >= 500 or resp.status_code == 429 or resp.is_streamed or resp.direct_passthrough:
+        get_store().release(scope, e)
+        return resp
+    headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in _SKIP_HEADERS]
+    get_store().complete(scope, e, resp.status_code, headers, resp.get_data())
+    return resp
+
+
+def _teardown(_exc):
+    # the view raised before after_request ran; let a retry run again
+    pending = g.pop("idempotency", None)
+    if pending is not None:
+        get_store().release(*pending)
+
+
+def init_app(app):
+    """Register the hooks; after auth (tenant scoping), the body-size caps and request logging."""
+    app.before_request(_begin)
+    app.after_request(_finish)
+    app.teardown_request(_teardown)
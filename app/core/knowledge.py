@@ -0,0 +1,203 @@
+# app/core/knowledge.py
+"""
+Bundled reference-architecture catalogue with local retrieval.
+
+app/knowledge/catalogue.json ships reference architectures (components with
+aliases, pros/cons, a mermaid sketch) and tech options per category. It can be
+overridden with KNOWLEDGE_PATH. The file is loaded and BM25-indexed once per
+process at app start-up.
+
+For each techstack / design request, for_techstack() / for_design() find the
+top KNOWLEDGE_TOP_K entries for the request text. Only those compact snippets go into the prompt,
+not the whole catalogue. For techstack, reference_comparison.matched / missing
+are computed locally against the best-scoring reference: a component matches
+when one of its aliases appears in the architecture and is not negated
+("no CDN"). So the lists are
+deterministic, and the model only writes improvements. KNOWLEDGE_TOP_K=0
+turns retrieval off. Hits scoring below KNOWLEDGE_MIN_SCORE are dropped, so
+an unrelated request gets no references.
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+KNOWLEDGE_PATH = os.getenv(
+    "KNOWLEDGE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "knowledge", "catalogue.json"),
+)
+TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", "2.0"))
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_STOP = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their this to "
+    "we with our will can should using use used via per each all any not no".split()
+)
+
+
+def tokenize(text: str) -> list:
+    words = (w.rstrip(".") for w in _WORD.findall(text.lower()))
+    # crude plural folding is enough for architecture vocabulary (services -> service)
+    return [w[:-1] if len(w) > 4 and w.endswith("s") and not w.endswith("ss") else w
+            for w in words if w and w not in _STOP]
+
+
+class BM25:
+    """Okapi BM25 over short documents; postings in plain dicts."""
+
+    def __init__(self, docs, k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.lengths = [len(d) for d in docs]
+        self.avg = sum(self.lengths) / len(docs) if docs else 0.0
+        self.postings = {}  # term -> {doc index: term frequency}
+        for i, doc in enumerate(docs):
+            for term, tf in Counter(doc).items():
+                self.postings.setdefault(term, {})[i] = tf
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def scores(self, query) -> dict:
+        out = {}
+        for term in set(query):
+            for i, tf in self.postings.get(term, {}).items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg)
+                out[i] = out.get(i, 0.0) + self.idf[term] * tf * (self.k1 + 1) / norm
+        return out
+
+    def top(self, query, k: int, min_score: float = 0.0) -> list:
+        ranked = sorted(self.scores(query).items(), key=lambda kv: (-kv[1], kv[0]))
+        return [(i, s) for i, s in ranked[:k] if s >= min_score]
+
+
+# "no CDN", "without a read replica", "not using Kafka yet"
+_NEGATED = re.compile(r"(?:\bno|\bwithout|\bnot|\black|\blacks|\bmissing)\s+(?:[\w/-]+\s+){0,2}$")
+
+
+def _mentions(pattern: re.Pattern, text: str) -> bool:
+    return any(not _NEGATED.search(text[max(0, m.start() - 40):m.start()]) for m in pattern.finditer(text))
+
+
+def _alias_re(aliases) -> re.Pattern:
+    alts = sorted((re.escape(a.lower()) for a in aliases), key=len, reverse=True)
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(alts) + r")(?![a-z0-9])")
+
+
+class Catalogue:
+    def __init__(self, data: dict):
+        self.references = data.get("references", [])
+        self.tech_options = data.get("tech_options", [])
+        self._aliases = {
+            ref["id"]: [(c["name"], _alias_re(c.get("aliases") or [c["name"]])) for c in ref.get("components", [])]
+            for ref in self.references
+        }
+        self._refs = BM25([tokenize(self._ref_text(r)) for r in self.references])
+        self._tech = BM25([tokenize(self._tech_text(t)) for t in self.tech_options])
+
+    @classmethod
+    def load(cls, path: str) -> "Catalogue":
+        if not os.path.exists(path):
+            return cls({})
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _ref_text(ref: dict) -> str:
+        parts = [ref.get("name", ""), ref.get("when_to_use", "")]
+        parts += ref.get("domains", []) * 2  # the domain is the strongest signal
+        parts += ref.get("quality_goals", [])
+        for c in ref.get("components", []):
+            parts.append(c["name"])
+            parts += c.get("aliases", [])
+        return " ".join(parts)
+
+    @staticmethod
+    def _tech_text(t: dict) -> str:
+        return " ".join([t["category"], t.get("when", ""), *t.get("options", []), *t.get("quality_goals", [])])
+
+    def search_references(self, text: str, k: int = TOP_K, min_score: float = MIN_SCORE) -> list:
+        return [(self.references[i], s) for i, s in self._refs.top(tokenize(text), k, min_score)]
+
+    def search_tech(self, text: str, k: int = TOP_K, min_score: float = MIN_SCORE) -> list:
+        return [(self.tech_options[i], s) for i, s in self._tech.top(tokenize(text), k, min_score)]
+
+    def compare(self, ref: dict, architecture: str) -> dict:
+        """Local matched / missing components of `ref` in an architecture description."""
+        text = architecture.lower()
+        matched, missing = [], []
+        for name, pattern in self._aliases.get(ref["id"], []):
+            (matched if _mentions(pattern, text) else missing).append(name)
+        return {"matched": matched, "missing": missing}
+
+
+def reference_snippet(ref: dict) -> dict:
+    return {
+        "name": ref["name"],
+        "when_to_use": ref.get("when_to_use", ""),
+        "key_components": [c["name"] for c in ref.get("components", [])],
+        "pros": ref.get("pros", []),
+        "cons": ref.get("cons", []),
+    }
+
+
+def tech_snippet(t: dict) -> dict:
+    return {"category": t["category"], "options": t.get("options", []), "when": t.get("when", "")}
+
+
+_catalogue = None
+_lock = threading.Lock()
+
+
+def get_catalogue() -> Catalogue:
+    global _catalogue
+    if _catalogue is None:
+        with _lock:
+            if _catalogue is None:
+                _catalogue = Catalogue.load(KNOWLEDGE_PATH)
+    return _catalogue
+
+
+def _query(*parts) -> str:
+    out = []
+    for p in parts:
+        if isinstance(p, (list, tuple)):
+            out += [str(x) for x in p]
+        elif p:
+            out.append(str(p))
+    return " ".join(out)
+
+
+def for_techstack(req):
+    """(prompt context dict, reference_comparison with matched/missing) or (None, None)."""
+    if TOP_K <= 0:
+        return None, None
+    cat = get_catalogue()
+    query = _query(req.domain, req.quality_goals, req.architecture)
+    refs = cat.search_references(query)
+    tech = cat.search_tech(query)
+    if not refs and not tech:
+        return None, None
+    context = {}
+    comparison = None
+    if refs:
+        best = refs[0][0]
+        comparison = cat.compare(best, req.architecture)
+        context["reference_architectures"] = [reference_snippet(r) for r, _ in refs]
+        context["reference_comparison"] = dict(comparison, reference=best["name"])
+    if tech:
+        context["tech_options"] = [tech_snippet(t) for t, _ in tech]
+    return context, comparison
+
+
+def for_design(req):
+    """(prompt context dict, {name: reference}) for the retrieved patterns, or (None, {})."""
+    if TOP_K <= 0:
+        return None, {}
+    query = _query(req.problem, req.quality_goals, req.constraints, req.preferred_stack)
+    refs = get_catalogue().search_references(query)
+    if not refs:
+        return None, {}
+    return ({"reference_patterns": [reference_snippet(r) for r, _ in refs]},
+            {r["name"].lower(): r for r, _ in refs})
@@ -0,0 +1,91 @@
+# app/core/limits.py
+"""
+Request body size caps, enforced before anything buffers the body.
+
+Each blueprint (or single endpoint) gets its own cap, overridable via env:
+
+    MAX_BODY_BYTES=262144           # default for every /api route
+    REVIEW_MAX_BODY_BYTES=2097152   # JSON /api/v1/review/
+    REVIEW_UPLOAD_MAX_BYTES=...     # raw-text /api/v1/review/upload (streamed to disk)
+
+A declared Content-Length over the cap is rejected with 413 straight away;
+chunked bodies are cut off by Werkzeug once they cross the cap while being read.
+0 disables the cap for that route.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import jsonify, request
+
+KIB = 1024
+MIB = 1024 * KIB
+
+DEFAULT_MAX_BODY = 256 * KIB
+
+# endpoint or blueprint name -> (env var, default bytes); endpoints win over blueprints
+BODY_LIMITS = {
+    "review.handle_review_upload": ("REVIEW_UPLOAD_MAX_BYTES", 16 * MIB),
+    "review": ("REVIEW_MAX_BODY_BYTES", 2 * MIB),
+    "risk": ("RISK_MAX_BODY_BYTES", 1 * MIB),
+    "techstack": ("TECHSTACK_MAX_BODY_BYTES", 1 * MIB),
+}
+
+UPLOAD_CHUNK_BYTES = 64 * KIB
+
+
+class DocumentTooLarge(Exception):
+    """The document would need more LLM calls than REVIEW_MAX_CHUNKS allows."""
+
+
+def limit_for(endpoint: str | None, blueprint: str | None) -> int | None:
+    for key in (endpoint, blueprint):
+        if key in BODY_LIMITS:
+            env, default = BODY_LIMITS[key]
+            limit = int(os.getenv(env, default))
+            break
+    else:
+        limit = int(os.getenv("MAX_BODY_BYTES", DEFAULT_MAX_BODY))
+    return limit or None
+
+
+def too_large(limit: int | None):
+    message = f"Request body exceeds {limit} bytes" if limit else "Request body too large"
+    return jsonify({"error": {"code": "PAYLOAD_TOO_LARGE", "message": message}}), 413
+
+
+def enforce_body_limit():
+    """before_request hook; must run before any hook that reads the body."""
+    if not request.path.startswith("/api/"):
+        return
+    limit = limit_for(request.endpoint, request.blueprint)
+    # applies to every later read of the body, including chunked uploads
+    request.max_content_length = limit
+    if limit and request.content_length is not None and request.content_length > limit:
+        return too_large(limit)
+
+
+def spool_body(stream, limit: int | None):
+    """
+    Copy the request stream to a temp file in fixed-size chunks.
+    Returns (binary file rewound to 0, size in bytes, sha256 hex).
+    The caller closes the file, which deletes it.
+    """
+    f = tempfile.TemporaryFile()
+    digest, size = hashlib.sha256(), 0
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if limit and size > limit:
+                from werkzeug.exceptions import RequestEntityTooLarge
+                raise RequestEntityTooLarge()
+            digest.update(chunk)
+            f.write(chunk)
+    except BaseException:
+        f.close()
+        raise
+    f.seek(0)
+    return f, size, digest.hexdigest()
@@ -1,27 +1,66 @@
+import contextvars
 import os
 import json
 import uuid
+import re
+import threading
 import datetime as dt
-from tenacity import retry, stop_after_attempt, wait_exponential
-import google.generativeai as genai
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 
+from app.core import admission, knowledge, prompts, tracing
+from app.core.tenants import TenantLimited
 
 from app.core.schemas import (
     TradeoffRequest, TradeoffResponse, TradeoffRow,
+    NwayTradeoffRequest, NwayTradeoffResponse, OptionScoreResponse, NwaySummary, NwayCell, NwayRank,
     ReviewRequest, ReviewResponse, RiskItem,
     RiskRequest, RiskResponse, RiskRow,
     TestCaseRequest, TestCaseResponse, TestCase,
     DesignSuggestRequest, DesignSuggestResponse, DesignOption, # <-- Added missing Design imports here
-    TechStackRequest, TechStackResponse, TechSuggestion, 
+    TechStackRequest, TechStackResponse, TechSuggestion,
     PerfFinding, ReferenceComparison
 )
 from typing import List, Dict, Any, Optional, Union # Ensuring all types are imported
 
 # --- Configure Gemini ---
-# NOTE: Ensure GOOGLE_API_KEY environment variable is set
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# NOTE: Ensure GOOGLE_API_KEY environment variable is set.
+# The SDK is heavy (~0.7s to import), so it is loaded and configured on first use
+# instead of at import time; workers that never call the LLM never pay for it.
 MODEL_NAME = "gemini-2.5-flash"
 
+_genai = None
+_genai_lock = threading.Lock()
+
+# token usage of the last _gemini call on this thread (read by prompt stats)
+_usage = threading.local()
+
+# compacted history of a stateful session (app.core.sessions.Conversation), set
+# for the duration of a session turn; shard threads see it through tracing.bind
+_conversation = contextvars.ContextVar("conversation", default=None)
+
+
+def _get_genai():
+    """Import and configure google.generativeai once, on first use."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+# one retry for flaky output / transient errors; a shed or rate-limited call
+# surfaces as 429 instead of queueing again
+_RETRY = dict(
+    stop=stop_after_attempt(2),
+    wait=wait_exponential(multiplier=0.5, max=3),
+    retry=retry_if_not_exception_type(TenantLimited),
+    before_sleep=tracing.retry_event,
+)
+
 
 # ==========================
 # Helper functions
@@ -29,8 +68,16 @@ MODEL_NAME = "gemini-2.5-flash"
 
 def _extract_json(text: str) -> str:
     """Extract the largest JSON object from text (Gemini sometimes adds markdown)."""
-    s, e = text.find("{"), text.rfind("}")
-    return text[s:e + 1] if (s >= 0 and e > s) else text
+    with tracing.span("llm.extract_json", **{"llm.output_chars": len(text)}):
+        s, e = text.find("{"), text.rfind("}")
+        return text[s:e + 1] if (s >= 0 and e > s) else text
+
+
+def _with_context(req, context) -> str:
+    """User message: the request, plus retrieved catalogue snippets when there are any."""
+    if not context:
+        return req.model_dump_json()
+    return json.dumps({**req.model_dump(mode="json"), **context}, separators=(",", ":"))
 
 
 def _now() -> str:
@@ -38,11 +85,51 @@ def _now() -> str:
     return dt.datetime.now(dt.UTC).isoformat()
 
 
+def _trace_id() -> str:
+    """The request's trace id when there is one, so results, logs and spans line up."""
+    from flask import g, has_request_context
+    tid = g.get("trace_id") if has_request_context() else None
+    return tid or str(uuid.uuid4())
+
+
+def _pop_usage():
+    tokens = getattr(_usage, "tokens", None)
+    _usage.tokens = None
+    return tokens
+
+
 def _gemini(messages: list[str]) -> str:
     """Send system + user prompts to Gemini and return clean JSON string."""
     system, user_json = messages
+    conv = _conversation.get()
+    if conv is not None:
+        user_json = conv.wrap(user_json)
+        conv.sent(len(system) + len(user_json))
+    backend = os.getenv("LLM_BACKEND", "gemini").lower()
+    # one LLM slot per call, weighted-fair across lanes (app.core.admission)
+    with admission.slot() as (lane, queued_s):
+        # one CLIENT span per attempt; tenacity retries each get their own
+        with tracing.span("llm.generate", tracing.KIND_CLIENT, **{
+            "gen_ai.system": backend, "gen_ai.request.model": MODEL_NAME,
+            "llm.prompt_chars": len(system) + len(user_json),
+            "admission.lane": lane or "", "admission.queue_ms": round(queued_s * 1000, 2),
+        }) as span:
+            text = _generate(backend, system, user_json)
+            if span is not None:
+                span.set("llm.output_chars", len(text))
+                span.set("gen_ai.usage.total_tokens", getattr(_usage, "tokens", None))
+            return text
+
+
+def _generate(backend: str, system: str, user_json: str) -> str:
+    if backend == "fake":
+        # deterministic offline backend for benchmarks / replay (app.core.fake_llm)
+        from app.core import fake_llm
+        return fake_llm.generate(system, user_json)
+
     prompt = f"{system}\n\nUser input:\n{user_json}"
 
+    genai = _get_genai()
     model = genai.GenerativeModel(MODEL_NAME)
     response = model.generate_content(
         prompt,
@@ -51,6 +138,9 @@ def _gemini(messages: list[str]) -> str:
         ),
     )
 
+    meta = getattr(response, "usage_metadata", None)
+    _usage.tokens = getattr(meta, "total_token_count", None)
+
     text = (response.text or "").strip()
     try:
         json.loads(text)
@@ -65,60 +155,270 @@ def _gemini(messages: list[str]) -> str:
 # Core API Logic - PS-01: Trade-off Analysis
 # ==========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=3))
+@retry(**_RETRY)
 def run_tradeoff(req: TradeoffRequest) -> TradeoffResponse:
-    trace_id = str(uuid.uuid4())
-    schema_hint = TradeoffResponse.model_json_schema()
-
-    system = (
-        "You are a senior software architect. "
-        "Perform a clear, concise design trade-off analysis. "
-        "Highlight only the most critical benefits, drawbacks, and recommendations "
-        "without repeating information or giving lengthy explanations. "
-        f"Return VALID JSON strictly matching this schema: {schema_hint}"
+    trace_id = _trace_id()
+    tpl = prompts.select("tradeoff")
+    system = tpl.render(TradeoffResponse)
+
+    with prompts.track(tpl) as call:
+        user = req.model_dump_json()
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = json.loads(_extract_json(raw))
+
+        # Pydantic will validate structure, but we ensure essential fields are set
+        data["trace_id"] = trace_id
+        data["generated_at"] = _now()
+
+        # Ensure nested objects are lists if the LLM was sparse
+        data["matrix"] = data.get("matrix", []) or []
+
+        data["version"] = tpl.id  # prompt version that produced this result
+        return TradeoffResponse(**data)
+
+
+# N-way: one scoring call per (option, criteria chunk), all in parallel, then a
+# local ranking and a single summary call; latency is ~2 calls regardless of N.
+NWAY_CRITERIA_CHUNK = int(os.getenv("NWAY_CRITERIA_CHUNK", "8"))
+NWAY_CONCURRENCY = int(os.getenv("NWAY_CONCURRENCY", "16"))
+
+
+@retry(**_RETRY)
+def _score_option(tpl, system, req: NwayTradeoffRequest, option: str, criteria: list) -> dict:
+    """criterion -> (score 1..5, rationale) for one option over one chunk of criteria."""
+    with prompts.track(tpl) as call:
+        user = json.dumps({
+            "option": option,
+            "alternatives": [o for o in req.options if o != option],
+            "criteria": criteria,
+            "constraints": req.constraints,
+            "context": req.context,
+        }, separators=(",", ":"))
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = OptionScoreResponse(**json.loads(_extract_json(raw)))
+
+    # match criteria case-insensitively; unmatched scores fill the remaining criteria in order
+    by_name = {c.strip().lower(): c for c in criteria}
+    out, unmatched = {}, []
+    for s in data.scores:
+        c = by_name.get(s.criterion.strip().lower())
+        if c is not None and c not in out:
+            out[c] = (min(max(s.score, 1), 5), s.rationale)
+        else:
+            unmatched.append(s)
+    for c, s in zip([c for c in criteria if c not in out], unmatched):
+        out[c] = (min(max(s.score, 1), 5), s.rationale)
+    return out
+
+
+@retry(**_RETRY)
+def _summarise_nway(req: NwayTradeoffRequest, ranking: list, pareto: list) -> NwaySummary:
+    tpl = prompts.select("tradeoff_summary")
+    system = tpl.render(NwaySummary)
+    with prompts.track(tpl) as call:
+        user = json.dumps({
+            "criteria": req.criteria,
+            "constraints": req.constraints,
+            "context": req.context,
+            "ranking": [r.model_dump() for r in ranking],
+            "pareto_front": pareto,
+        }, separators=(",", ":"))
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        return NwaySummary(**json.loads(_extract_json(raw)))
+
+
+def run_tradeoff_nway(req: NwayTradeoffRequest) -> NwayTradeoffResponse:
+    import numpy as np
+    from app.core.tradeoff_rank import normalised_weights, rank_options
+
+    trace_id = _trace_id()
+    tpl = prompts.select("tradeoff_score")
+    system = tpl.render(OptionScoreResponse)
+    options = list(dict.fromkeys(req.options))    # de-duplicated, order kept
+    criteria = list(dict.fromkeys(req.criteria))
+    chunks = [criteria[i:i + NWAY_CRITERIA_CHUNK] for i in range(0, len(criteria), NWAY_CRITERIA_CHUNK)]
+    tasks = [(o, chunk) for o in options for chunk in chunks]
+
+    cells, errors = {}, []
+    with ThreadPoolExecutor(max_workers=min(NWAY_CONCURRENCY, len(tasks))) as pool:
+        futures = {
+            pool.submit(tracing.bind(_score_option), tpl, system, req, o, chunk): o
+            for o, chunk in tasks
+        }
+        for fut in as_completed(futures):
+            try:
+                for criterion, cell in fut.result().items():
+                    cells[(futures[fut], criterion)] = cell
+            except Exception as e:  # a missing chunk scores 0 rather than failing the comparison
+                errors.append(e)
+    if not cells:
+        raise errors[0] if errors else ValueError("no option could be scored")
+
+    col = {c: j for j, c in enumerate(criteria)}
+    row = {o: i for i, o in enumerate(options)}
+    scores = np.zeros((len(options), len(criteria)), dtype=np.float64)
+    for (o, c), (score, _) in cells.items():
+        scores[row[o], col[c]] = score
+    w = normalised_weights(criteria, req.weights)
+    weighted, order, pareto = rank_options(scores, w)
+
+    ranking = [
+        NwayRank(option=options[i], rank=r, weighted_score=round(float(weighted[i]), 3), pareto=bool(pareto[i]))
+        for r, i in enumerate(order, start=1)
+    ]
+    front = [r.option for r in ranking if r.pareto]
+    try:
+        summary = _summarise_nway(req, ranking, front)
+    except Exception:
+        # the scores are the expensive part; don't lose them to a failed summary
+        best = ranking[0]
+        summary = NwaySummary(
+            summary=f"{best.option} ranks first with a weighted score of {best.weighted_score} of 5.",
+            recommendation={"winner": best.option, "rationale": "Highest weighted score", "caveats": ""},
+        )
+
+    matrix = [
+        NwayCell(option=o, criterion=c, score=int(scores[row[o], col[c]]),
+                 rationale=cells.get((o, c), (0, "not scored"))[1])
+        for o in options for c in criteria
+    ]
+    return NwayTradeoffResponse(
+        version=tpl.id,
+        trace_id=trace_id,
+        generated_at=_now(),
+        options=options,
+        criteria=criteria,
+        weights={c: round(float(x), 4) for c, x in zip(criteria, w)},
+        matrix=matrix,
+        ranking=ranking,
+        pareto_front=front,
+        summary=summary.summary,
+        recommendation=summary.recommendation,
     )
 
-    user = req.model_dump_json()
-    raw = _gemini([system, user]) # Use the raw output from _gemini
-    data = json.loads(_extract_json(raw))
-
-    # Pydantic will validate structure, but we ensure essential fields are set
-    data["trace_id"] = trace_id
-    data["generated_at"] = _now()
-    
-    # Ensure nested objects are lists if the LLM was sparse
-    data["matrix"] = data.get("matrix", []) or []
-
-    return TradeoffResponse(**data)
-
 
 # ==========================
 # Core API Logic - PS-02: Design Review
 # ==========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=3))
-def run_review(req: ReviewRequest) -> ReviewResponse:
-    trace_id = str(uuid.uuid4())
-    schema_hint = ReviewResponse.model_json_schema()
-
-    system = (
-        "You are a senior design reviewer. "
-        "Provide a concise and insightful design review summary. "
-        "Highlight only the 2–3 most important risks and 3–4 key action items. "
-        "Be factual, to-the-point, and avoid unnecessary elaboration. "
-        f"Return VALID JSON strictly matching this schema: {schema_hint}"
-    )
-
-    user = req.model_dump_json()
-    raw = _gemini([system, user])
-    data = json.loads(_extract_json(raw))
-
-    # Ensure structure validity
-    data["risks"] = data.get("risks", []) or []
-    data["action_items"] = data.get("action_items", []) or []
+# Documents longer than REVIEW_CHUNK_CHARS are reviewed in parts (split at paragraph
+# boundaries), REVIEW_CHUNK_CONCURRENCY parts at a time, and the findings merged locally.
+REVIEW_CHUNK_CHARS = int(os.getenv("REVIEW_CHUNK_CHARS", "40000"))
+REVIEW_CHUNK_CONCURRENCY = int(os.getenv("REVIEW_CHUNK_CONCURRENCY", "8"))
+REVIEW_MAX_CHUNKS = int(os.getenv("REVIEW_MAX_CHUNKS", "200"))
+
+
+@retry(**_RETRY)
+def _review_part(tpl, system, req: ReviewRequest) -> dict:
+    """One LLM call over (a part of) the document. Returns the validated-shape dict."""
+    with prompts.track(tpl) as call:
+        user = req.model_dump_json()
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = json.loads(_extract_json(raw))
+
+        # Ensure structure validity
+        data["risks"] = [RiskItem(**r) for r in data.get("risks", []) or []]
+        data["action_items"] = [str(a) for a in data.get("action_items", []) or []]
+        data["summary"] = data.get("summary", "")
+        return data
+
+
+def _cut_point(buf: str, size: int) -> int:
+    for sep in ("\n\n", "\n", ". ", " "):
+        i = buf.rfind(sep, size // 2, size)
+        if i > 0:
+            return i + len(sep)
+    return size
+
+
+def _split_document(pieces, size: int):
+    """Re-chunk an iterable of text pieces (a str, or file reads) into <= size parts."""
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        while len(buf) > size:
+            cut = _cut_point(buf, size)
+            yield buf[:cut]
+            buf = buf[cut:]
+    if buf.strip():
+        yield buf
+
+
+def _review_chunked(tpl, system, req: ReviewRequest, parts) -> dict:
+    """
+    Review parts concurrently. `parts` is consumed lazily, so at most
+    REVIEW_CHUNK_CONCURRENCY parts (plus one read-ahead) are in memory at once.
+    """
+    from app.core.limits import DocumentTooLarge
+
+    results, errors, pending = {}, [], {}
+
+    def collect(done):
+        for fut in done:
+            i = pending.pop(fut)
+            try:
+                results[i] = fut.result()
+            except Exception as e:  # one bad part shouldn't sink the review
+                errors.append(e)
+
+    with ThreadPoolExecutor(max_workers=REVIEW_CHUNK_CONCURRENCY) as pool:
+        for i, part in enumerate(parts):
+            if i >= REVIEW_MAX_CHUNKS:
+                collect(wait(pending).done)
+                raise DocumentTooLarge(
+                    f"Document needs more than {REVIEW_MAX_CHUNKS} parts of {REVIEW_CHUNK_CHARS} characters"
+                )
+            if len(pending) >= REVIEW_CHUNK_CONCURRENCY:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            pending[pool.submit(tracing.bind(_review_part), tpl, system, req.model_copy(update={"document": part}))] = i
+        collect(wait(pending).done)
+    if not results:
+        if errors:
+            raise errors[0]
+        raise ValueError("Document is empty")
+
+    risks, seen_risks, actions, seen_actions, summaries = [], set(), [], set(), []
+    for i in sorted(results):  # document order, so output is stable run to run
+        data = results[i]
+        if data["summary"]:
+            summaries.append(f"Part {i + 1}: {data['summary']}")
+        for r in data["risks"]:
+            key = (" ".join(r.area.lower().split()), r.severity)
+            if key not in seen_risks:
+                seen_risks.add(key)
+                risks.append(r)
+        for a in data["action_items"]:
+            key = " ".join(a.lower().split())
+            if key not in seen_actions:
+                seen_actions.add(key)
+                actions.append(a)
+    failed = f", {len(errors)} failed" if errors else ""
+    head = f"Reviewed in {len(results) + len(errors)} parts{failed}."
+    return {"summary": "\n".join([head, *summaries]), "risks": risks, "action_items": actions}
+
+
+def run_review(req: ReviewRequest, parts=None) -> ReviewResponse:
+    """
+    Review a design document. Long documents (or an explicit iterable of text
+    `parts`, e.g. reads from an uploaded file) go through the chunked path.
+    """
+    trace_id = _trace_id()
+    tpl = prompts.select("review")
+    system = tpl.render(ReviewResponse)
+
+    if parts is None and len(req.document) <= REVIEW_CHUNK_CHARS:
+        data = _review_part(tpl, system, req)
+    else:
+        pieces = [req.document] if parts is None else parts
+        data = _review_chunked(tpl, system, req, _split_document(pieces, REVIEW_CHUNK_CHARS))
 
     data["trace_id"] = trace_id
     data["generated_at"] = _now()
+    data["version"] = tpl.id
     return ReviewResponse(**data)
 
 
@@ -126,142 +426,262 @@ def run_review(req: ReviewRequest) -> ReviewResponse:
 # Core API Logic - PS-03: Design Risk Analysis
 # ==========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=3))
+@retry(**_RETRY)
 def run_risk(req: RiskRequest) -> RiskResponse:
-    trace_id = str(uuid.uuid4())
-    schema_hint = RiskResponse.model_json_schema()
-
-    system = (
-        "You are a risk management expert. "
-        "Identify only the most significant risks (up to 3–5). "
-        "Keep descriptions short, precise, and avoid redundancy. "
-        "Quantify likelihood (1-3) and impact (1-4). "
-        "Compute score as likelihood * impact. "
-        f"Return VALID JSON strictly following this schema: {schema_hint}"
-    )
-
-    user = req.model_dump_json()
-    raw = _gemini([system, user])
-    data = json.loads(_extract_json(raw))
-
-    # Calculate score and assign IDs, then sort
-    for r in data.get("risks", []):
-        likelihood = int(r.get("likelihood", 1))
-        impact = int(r.get("impact", 1))
-        r["score"] = likelihood * impact
-        r.setdefault("risk_id", f"R-{uuid.uuid4().hex[:6]}")
-    data["risks"] = sorted(data.get("risks", []), key=lambda x: x["score"], reverse=True)
-
-    data["trace_id"] = trace_id
-    data["generated_at"] = _now()
-    return RiskResponse(**data)
+    trace_id = _trace_id()
+    tpl = prompts.select("risk")
+    system = tpl.render(RiskResponse)
+
+    with prompts.track(tpl) as call:
+        user = req.model_dump_json()
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = json.loads(_extract_json(raw))
+
+        # Calculate score and assign IDs, then sort
+        for r in data.get("risks", []):
+            likelihood = int(r.get("likelihood", 1))
+            impact = int(r.get("impact", 1))
+            r["score"] = likelihood * impact
+            r.setdefault("risk_id", f"R-{uuid.uuid4().hex[:6]}")
+        data["risks"] = sorted(data.get("risks", []), key=lambda x: x["score"], reverse=True)
+
+        data["trace_id"] = trace_id
+        data["generated_at"] = _now()
+        data["version"] = tpl.id
+        return RiskResponse(**data)
 
 
 # ==========================
 # Core API Logic - PS-06: Generate Test Cases
 # ==========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=3))
-def run_testcases(req: TestCaseRequest) -> TestCaseResponse:
-    trace_id = str(uuid.uuid4())
-    schema_hint = TestCaseResponse.model_json_schema()
-
-    system = (
-        "You are a senior QA engineer. "
-        "Generate concise, BDD-style test cases (Given/When/Then). "
-        "Focus on key functional scenarios only (limit to the requested count, up to 10). "
-        "Avoid verbose descriptions or trivial cases. "
-        f"Return VALID JSON strictly matching this schema: {schema_hint}"
-    )
-
-    user = req.model_dump_json()
-    raw = _gemini([system, user])
-    data = json.loads(_extract_json(raw))
+TESTCASE_SHARD_SIZE = int(os.getenv("TESTCASE_SHARD_SIZE", "10"))
+TESTCASE_SHARD_CONCURRENCY = int(os.getenv("TESTCASE_SHARD_CONCURRENCY", "16"))
+TESTCASE_TOPUP_ROUNDS = int(os.getenv("TESTCASE_TOPUP_ROUNDS", "2"))
+CASE_TYPES = ("Positive", "Negative", "Edge")
+_OVERSHOOT = 1.15  # ask shards for a few extra cases to absorb cross-shard duplicates
+
+
+@retry(**_RETRY)
+def _generate_cases(tpl, system, req: TestCaseRequest, count: int, focus: Optional[dict] = None,
+                    avoid: Optional[list] = None):
+    """One LLM call for up to TESTCASE_SHARD_SIZE cases. Returns (summary, [TestCase])."""
+    with prompts.track(tpl) as call:
+        payload = req.model_dump(mode="json")
+        payload["count"] = count
+        if focus:
+            payload["focus"] = focus
+        if avoid:
+            payload["avoid_titles"] = avoid
+        user = json.dumps(payload, separators=(",", ":"))
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = json.loads(_extract_json(raw))
+
+        cases = []
+        for c in data.get("cases", []) or []:
+            c.setdefault("id", "TC-000")
+            c.setdefault("priority", "Medium")
+            c.setdefault("type", (focus or {}).get("type", "Positive"))
+            cases.append(TestCase(**c))
+        return data.get("summary", ""), cases
+
+
+def _areas(req: TestCaseRequest) -> list[dict]:
+    """
+    Every type x (general + each non-functional), type-major, capped at
+    ceil(count / shard size) so the number of LLM calls tracks the requested
+    count, not the number of non-functionals.
+    """
+    areas = [
+        {"type": t, **({"non_functional": nf} if nf else {})}
+        for nf in [None, *req.non_functionals]
+        for t in CASE_TYPES
+    ]
+    return areas[: max(1, -(-req.count // TESTCASE_SHARD_SIZE))]
+
+
+def _shard_plan(areas: list[dict], count: int, round_no: int = 1) -> list[tuple[int, int, dict]]:
+    """
+    (count, area index, focus) per shard, <= shard size each. Shards of one
+    area get a distinct "part" in their focus, so no two of them send the same
+    input (a model answering the same input the same way would only repeat itself).
+    """
+    per_area = -(-int(count * _OVERSHOOT) // len(areas))  # ceil
+    sizes = [min(TESTCASE_SHARD_SIZE, per_area - i) for i in range(0, per_area, TESTCASE_SHARD_SIZE)]
+    plan = []
+    for a, area in enumerate(areas):
+        for k, n in enumerate(sizes, start=1):
+            part = f"{k} of {len(sizes)}" if round_no == 1 else f"follow-up {round_no - 1}.{k}"
+            plan.append((n, a, dict(area, part=part) if len(sizes) > 1 or round_no > 1 else area))
+    return plan
+
+
+def _run_shards(tpl, system, req: TestCaseRequest, plan: list, avoid: dict):
+    """Run a shard plan concurrently. Returns (results in plan order, None for failed shards; errors)."""
+    results = [None] * len(plan)
+    errors = []
+    with ThreadPoolExecutor(max_workers=min(TESTCASE_SHARD_CONCURRENCY, len(plan))) as pool:
+        futures = {
+            pool.submit(tracing.bind(_generate_cases), tpl, system, req, n, focus, avoid.get(a)): i
+            for i, (n, a, focus) in enumerate(plan)
+        }
+        for fut in as_completed(futures):
+            try:
+                results[futures[fut]] = fut.result()
+            except Exception as e:  # one bad shard shouldn't sink the batch
+                errors.append(e)
+    return results, errors
+
+
+def _fair_take(groups: list[list], limit: int) -> list:
+    """Trim groups to `limit` items round-robin (every group loses evenly); keeps group order."""
+    take = [0] * len(groups)
+    left = limit
+    while left > 0 and any(t < len(g) for t, g in zip(take, groups)):
+        for i, g in enumerate(groups):
+            if left and take[i] < len(g):
+                take[i] += 1
+                left -= 1
+    return [c for t, g in zip(take, groups) for c in g[:t]]
+
+
+def _case_key(c: TestCase) -> tuple:
+    norm = lambda s: " ".join(re.sub(r"[^a-z0-9 ]+", " ", s.lower()).split())  # noqa: E731
+    return norm(c.given), norm(c.when), norm(c.then)
 
-    for i, c in enumerate(data.get("cases", []), start=1):
-        c.setdefault("id", f"TC-{i:03}")
-        c.setdefault("priority", "Medium")
-        c.setdefault("type", "Positive")
 
-    data["trace_id"] = trace_id
-    data["generated_at"] = _now()
-    return TestCaseResponse(**data)
+def run_testcases(req: TestCaseRequest) -> TestCaseResponse:
+    trace_id = _trace_id()
+    tpl = prompts.select("testcases")
+    system = tpl.render(TestCaseResponse)
+
+    if req.count <= TESTCASE_SHARD_SIZE:
+        summary, cases = _generate_cases(tpl, system, req, req.count)
+    else:
+        # Large counts: fan out by type / non-functional, run shards concurrently, merge locally.
+        # Dedupe can leave fewer than requested; follow-up rounds ask each area for more,
+        # listing the titles it already has.
+        areas = _areas(req)
+        groups = [[] for _ in areas]
+        seen, calls = set(), 0
+        for round_no in range(1, TESTCASE_TOPUP_ROUNDS + 2):
+            missing = req.count - sum(len(g) for g in groups)
+            if missing <= 0:
+                break
+            plan = _shard_plan(areas, missing, round_no)
+            avoid = {a: [c.title for c in g] for a, g in enumerate(groups) if g and round_no > 1}
+            results, errors = _run_shards(tpl, system, req, plan, avoid)
+            calls += len(plan)
+            if round_no == 1 and all(r is None for r in results):
+                raise errors[0]
+
+            # dedupe in plan order (stable run to run), grouped by area
+            for (_, a, _), r in zip(plan, results):
+                for c in (r[1] if r else []):
+                    key = _case_key(c)
+                    if key not in seen:
+                        seen.add(key)
+                        groups[a].append(c)
+        cases = _fair_take(groups, req.count)
+        by_type = {t: sum(1 for c in cases if c.type == t) for t in CASE_TYPES}
+        summary = (
+            f"{len(cases)} test cases ({by_type['Positive']} positive, "
+            f"{by_type['Negative']} negative, {by_type['Edge']} edge) "
+            f"from {calls} shards over {len(areas)} areas."
+        )
+
+    for i, c in enumerate(cases, start=1):
+        c.id = f"TC-{i:03}"
+
+    return TestCaseResponse(
+        version=tpl.id,
+        trace_id=trace_id,
+        generated_at=_now(),
+        summary=summary,
+        cases=cases,
+    )
 
 
 # ==========================
 # Core API Logic - PS-04: Suggest Design
 # ==========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=3))
+@retry(**_RETRY)
 def run_design_suggest(req: DesignSuggestRequest) -> DesignSuggestResponse:
-    trace_id = str(uuid.uuid4())
-    schema_hint = DesignSuggestResponse.model_json_schema()
-
-    system = (
-    "You are a pragmatic software architect. Propose 2–3 concise design options.\n"
-    "Rules:\n"
-    "• VALID JSON ONLY matching the schema exactly.\n"
-    "• Keep each option tight: when_to_use (1 line), 3–5 key_components, pros/cons max 3 each.\n"
-    "• Use a tiny mermaid snippet or null for diagram_mermaid.\n"
-    "• Keep the summary to 1–2 lines.\n"
-    "• End with a single-paragraph recommendation.\n"
-    "• If all options are cloud-specific, include at least one cloud-agnostic alternative (Docker+Postgres+Redis, etc.).\n"
-    f"\nSchema: {schema_hint}"
-)
-
-    user = req.model_dump_json()
-    raw = _gemini([system, user])
-    data = json.loads(_extract_json(raw))
-
-    # Harden output so Pydantic never explodes
-    # Cap list lengths so outputs stay crisp
-    for opt in data.get("options", []) or []:
-        if isinstance(opt.get("key_components"), list):
-            opt["key_components"] = opt["key_components"][:5]
-        if isinstance(opt.get("pros"), list):
-            opt["pros"] = opt["pros"][:3]
-        if isinstance(opt.get("cons"), list):
-            opt["cons"] = opt["cons"][:3]
-
-
-    data["trace_id"] = trace_id
-    data["generated_at"] = _now()
-    data.setdefault("version", "1.0")
-    data.setdefault("summary", "")
-    data.setdefault("recommendation", "")
-
-    return DesignSuggestResponse(**data)
+    trace_id = _trace_id()
+    tpl = prompts.select("design")
+    system = tpl.render(DesignSuggestResponse)
+
+    with tracing.span("knowledge.retrieve", **{"analysis.type": "design"}):
+        context, patterns = knowledge.for_design(req)
+
+    with prompts.track(tpl) as call:
+        user = _with_context(req, context)
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = json.loads(_extract_json(raw))
+
+        # Harden output so Pydantic never explodes
+        # Cap list lengths so outputs stay crisp
+        for opt in data.get("options", []) or []:
+            if isinstance(opt.get("key_components"), list):
+                opt["key_components"] = opt["key_components"][:5]
+            if isinstance(opt.get("pros"), list):
+                opt["pros"] = opt["pros"][:3]
+            if isinstance(opt.get("cons"), list):
+                opt["cons"] = opt["cons"][:3]
+            # options built on a retrieved pattern get its canonical parts when the model left them out
+            ref = patterns.get(str(opt.get("name", "")).lower())
+            if ref is not None:
+                opt.setdefault("when_to_use", ref.get("when_to_use", ""))
+                if not opt.get("key_components"):
+                    opt["key_components"] = [c["name"] for c in ref.get("components", [])][:5]
+                if not opt.get("diagram_mermaid"):
+                    opt["diagram_mermaid"] = ref.get("diagram_mermaid")
+
+
+        data["trace_id"] = trace_id
+        data["generated_at"] = _now()
+        data.setdefault("summary", "")
+        data.setdefault("recommendation", "")
+
+        data["version"] = tpl.id
+        return DesignSuggestResponse(**data)
 
 
 # ==========================
 # Core API Logic - PS-05: Tech Stack Recommendation
 # ==========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=3))
+@retry(**_RETRY)
 def run_techstack(req: TechStackRequest) -> TechStackResponse:
-    trace_id = str(uuid.uuid4())
-    schema_hint = TechStackResponse.model_json_schema()
-
-    system = (
-        "You are a senior software architect. "
-        "Evaluate the given architecture against quality attributes. "
-        "For performance_review, **limit issues and suggestions to 3 items each** and keep them concise (1 sentence maximum). "
-        "Recommend specific tech stacks (frameworks, databases, messaging, DevOps). "
-        "For reference_comparison, **limit matched, missing, and improvements to 3 items each**. "
-        f"Return VALID JSON strictly matching this schema: {schema_hint}"
-    )
-
-    user = req.model_dump_json()
-    raw = _gemini([system, user])
-    data = json.loads(_extract_json(raw))
-
-    # Ensure fallback correctness
-    data["trace_id"] = trace_id
-    data["generated_at"] = _now()
-
-    # Fix nested defaults if LLM messes up
-    data.setdefault("performance_review", [])
-    data.setdefault("tech_recommendations", [])
-    data.setdefault("reference_comparison", {"matched": [], "missing": [], "improvements": []})
-
-    return TechStackResponse(**data)
\ No newline at end of file
+    trace_id = _trace_id()
+    tpl = prompts.select("techstack")
+    system = tpl.render(TechStackResponse)
+
+    with tracing.span("knowledge.retrieve", **{"analysis.type": "techstack"}):
+        context, comparison = knowledge.for_techstack(req)
+
+    with prompts.track(tpl) as call:
+        user = _with_context(req, context)
+        raw = _gemini([system, user])
+        call.observe(system, user, raw, _pop_usage())
+        data = json.loads(_extract_json(raw))
+
+        # Ensure fallback correctness
+        data["trace_id"] = trace_id
+        data["generated_at"] = _now()
+
+        # Fix nested defaults if LLM messes up
+        data.setdefault("performance_review", [])
+        data.setdefault("tech_recommendations", [])
+        data.setdefault("reference_comparison", {"matched": [], "missing": [], "improvements": []})
+        if comparison is not None:
+            # matched / missing come from the catalogue, not the model
+            ref = data["reference_comparison"] if isinstance(data["reference_comparison"], dict) else {}
+            data["reference_comparison"] = dict(comparison, improvements=ref.get("improvements") or [])
+
+        data["version"] = tpl.id
+        return TechStackResponse(**data)
@@ -0,0 +1,403 @@
+# app/core/logstore.py
+"""
+Append-only segment files for request / response / error logs.
+
+LOG_BACKEND=segments replaces the request_logs / response_logs / error_logs
+inserts of the logging middleware with appends to LOG_DIR:
+
+    seg-<first ts ms>-<seq>-<pid>.log.open   active segment of one worker process
+    seg-<first ts ms>-<seq>-<pid>.log        sealed (immutable) segment
+    seg-<first ts ms>-<seq>-<pid>.idx        its sparse index
+
+Each process writes its own segment, so gunicorn workers never contend on a
+lock. A record is a 24-byte header (payload length, crc32, timestamp ms,
+64-bit trace-id hash) followed by the zlib-compressed JSON row, written with
+a single os.write on an O_APPEND descriptor. Segments rotate at
+LOG_SEGMENT_BYTES or LOG_SEGMENT_MAX_AGE_S. Rotation writes the .idx file
+and renames the segment without the .open suffix, so sealed files are
+self-contained. Ship them with rsync, or delete them in .log/.idx pairs.
+LOG_RETENTION_S prunes sealed segments older than that at each rotation.
+
+The index has one entry per LOG_INDEX_EVERY records: file offset, record
+count, first/last timestamp and a 512-bit bloom filter of trace-id hashes.
+trace() reads only the blocks whose bloom may hold the trace. scan() reads
+only the blocks inside a time range, newest first, and stops at its limit. In both cases headers are checked
+through an mmap and only matching payloads are decompressed. The active
+segment's index is kept in memory. Segments left .open by a dead process
+are indexed and sealed by the next process to start.
+
+Rows have the same keys as the SQL tables, so /api/v1/admin/trace returns the
+same shape from either backend. Row ids are "<segment>:<offset>" strings.
+"""
+import datetime as dt
+import hashlib
+import heapq
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+HEADER = struct.Struct("<IIqQ")          # payload length, crc32, ts_ms, trace hash
+BLOCK = struct.Struct("<QIqq8Q")         # offset, count, first_ts, last_ts, bloom (512 bits)
+IDX_MAGIC = b"SDLCIDX1"
+BLOOM_WORDS = 8
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def enabled() -> bool:
+    return os.getenv("LOG_BACKEND", "sql").lower() == "segments"
+
+
+def trace_hash(trace_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(trace_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _bloom_bits(h: int):
+    # three 9-bit slices of the hash -> bit positions in 0..511
+    return (h & 511, (h >> 9) & 511, (h >> 18) & 511)
+
+
+class Block:
+    __slots__ = ("offset", "count", "first_ts", "last_ts", "bloom")
+
+    def __init__(self, offset, count=0, first_ts=0, last_ts=0, bloom=None):
+        self.offset = offset
+        self.count = count
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.bloom = bloom or [0] * BLOOM_WORDS
+
+    def add(self, ts: int, h: int):
+        if not self.count:
+            self.first_ts = ts
+        self.count += 1
+        self.last_ts = max(self.last_ts, ts)
+        for bit in _bloom_bits(h):
+            self.bloom[bit >> 6] |= 1 << (bit & 63)
+
+    def may_contain(self, h: int) -> bool:
+        return all(self.bloom[bit >> 6] >> (bit & 63) & 1 for bit in _bloom_bits(h))
+
+    def overlaps(self, since, until) -> bool:
+        return (since is None or self.last_ts >= since) and (until is None or self.first_ts <= until)
+
+
+def _read_index(path: str) -> list:
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(IDX_MAGIC):
+        raise ValueError(f"{path}: not a segment index")
+    return [
+        Block(off, n, first, last, list(bloom))
+        for off, n, first, last, *bloom in BLOCK.iter_unpack(data[len(IDX_MAGIC):])
+    ]
+
+
+def _write_index(path: str, blocks: list):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(IDX_MAGIC)
+        for b in blocks:
+            f.write(BLOCK.pack(b.offset, b.count, b.first_ts, b.last_ts, *b.bloom))
+    os.replace(tmp, path)
+
+
+def _iter_records(buf, offset: int, end: int, count=None):
+    """(offset, ts, hash, crc, payload start, payload length) for records in buf[offset:end]."""
+    n = 0
+    while offset + HEADER.size <= end and (count is None or n < count):
+        length, crc, ts, h = HEADER.unpack_from(buf, offset)
+        start = offset + HEADER.size
+        if start + length > end:
+            break  # torn write at the tail of a crashed segment
+        yield offset, ts, h, crc, start, length
+        offset = start + length
+        n += 1
+
+
+def _build_index(path: str, every: int) -> list:
+    """Index a segment by scanning it (unsealed segments of a dead process)."""
+    blocks = []
+    size = os.path.getsize(path)
+    if not size:
+        return blocks
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        for off, ts, h, *_ in _iter_records(buf, 0, size):
+            if not blocks or blocks[-1].count >= every:
+                blocks.append(Block(off))
+            blocks[-1].add(ts, h)
+    return blocks
+
+
+def _decode(segment: str, offset: int, payload) -> dict:
+    row = json.loads(zlib.decompress(payload))
+    row["id"] = f"{segment}:{offset}"
+    row["created_at"] = dt.datetime.fromtimestamp(row.pop("ts") / 1000, dt.UTC)
+    return row
+
+
+class SegmentStore:
+    def __init__(self, root: str, segment_bytes: int = 64 * 1024 * 1024, max_age_s: float = 3600,
+                 index_every: int = 64, retention_s: float = 0, level: int = 3):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.max_age_s = max_age_s
+        self.index_every = index_every
+        self.retention_s = retention_s
+        self.level = level
+        self.pid = os.getpid()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._fd = None
+        self._name = None     # active segment name, without suffix
+        self._size = 0
+        self._opened = 0.0
+        self._blocks = []     # index of the active segment
+        self._indexes = {}    # sealed segment name -> blocks (immutable, cached)
+        os.makedirs(root, exist_ok=True)
+        self._seal_orphans()
+
+    # --- writing ---
+
+    def append(self, table: str, row: dict, trace_id: str = "") -> str:
+        """Append one row; returns its id ("<segment>:<offset>")."""
+        ts = int(time.time() * 1000)
+        payload = zlib.compress(
+            json.dumps({"t": table, "ts": ts, **row}, default=str, separators=(",", ":")).encode("utf-8"),
+            self.level,
+        )
+        h = trace_hash(trace_id or "")
+        record = HEADER.pack(len(payload), zlib.crc32(payload), ts, h) + payload
+        with self._lock:
+            if self._fd is None or self._should_rotate():
+                self._rotate()
+            offset = self._size
+            os.write(self._fd, record)
+            self._size += len(record)
+            if not self._blocks or self._blocks[-1].count >= self.index_every:
+                self._blocks.append(Block(offset))
+            self._blocks[-1].add(ts, h)
+            return f"{self._name}:{offset}"
+
+    def _should_rotate(self) -> bool:
+        return self._size >= self.segment_bytes or (
+            self.max_age_s and time.monotonic() - self._opened >= self.max_age_s
+        )
+
+    def _rotate(self):
+        if self._fd is not None:
+            self._seal(self._name, self._blocks)
+            os.close(self._fd)
+        self._seq += 1
+        self._name = f"seg-{int(time.time() * 1000):013d}-{self._seq:04d}-{self.pid}"
+        self._fd = os.open(self._path(self._name, ".log.open"), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._size = 0
+        self._opened = time.monotonic()
+        self._blocks = []
+        if self.retention_s:
+            self.prune(self.retention_s)
+
+    def _seal(self, name: str, blocks: list):
+        _write_index(self._path(name, ".idx"), blocks)
+        os.replace(self._path(name, ".log.open"), self._path(name, ".log"))
+        self._indexes[name] = blocks
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                self._seal(self._name, self._blocks)
+                os.close(self._fd)
+                self._fd = None
+
+    def _seal_orphans(self):
+        for fname in os.listdir(self.root):
+            if not fname.endswith(".log.open"):
+                continue
+            name = fname[: -len(".log.open")]
+            pid = int(name.rsplit("-", 1)[1])
+            if pid == self.pid or _alive(pid):
+                continue
+            self._seal(name, _build_index(self._path(name, ".log.open"), self.index_every))
+
+    def prune(self, older_than_s: float) -> int:
+        """Delete sealed segments (and their indexes) whose newest record is older than this."""
+        cutoff = (time.time() - older_than_s) * 1000
+        removed = 0
+        for name in self._sealed():
+            blocks = self._index(name)
+            newest = max((b.last_ts for b in blocks), default=0)
+            if newest < cutoff:
+                for suffix in (".log", ".idx"):
+                    try:
+                        os.remove(self._path(name, suffix))
+                    except FileNotFoundError:
+                        pass
+                self._indexes.pop(name, None)
+                removed += 1
+        return removed
+
+    # --- reading ---
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.root, name + suffix)
+
+    def _sealed(self) -> list:
+        return sorted(f[:-4] for f in os.listdir(self.root) if f.endswith(".log"))
+
+    def _index(self, name: str) -> list:
+        blocks = self._indexes.get(name)
+        if blocks is None:
+            try:
+                blocks = _read_index(self._path(name, ".idx"))
+            except (OSError, ValueError):
+                blocks = _build_index(self._path(name, ".log"), self.index_every)
+            self._indexes[name] = blocks
+        return blocks
+
+    def _segments(self):
+        """(name, path, blocks, readable size) for every segment, oldest first."""
+        with self._lock:
+            active = (self._name, list(self._blocks), self._size) if self._fd is not None else None
+        out = []
+        for name in self._sealed():
+            path = self._path(name, ".log")
+            out.append((name, path, self._index(name), os.path.getsize(path)))
+        if active is not None:
+            name, blocks, size = active
+            out.append((name, self._path(name, ".log.open"), blocks, size))
+        # other live workers' active segments: no in-memory index here, scan them
+        for fname in sorted(os.listdir(self.root)):
+            if fname.endswith(".log.open") and (active is None or fname != active[0] + ".log.open"):
+                path = os.path.join(self.root, fname)
+                out.append((fname[:-9], path, _build_index(path, self.index_every), os.path.getsize(path)))
+        return out
+
+    def _read(self, want_block, want_record):
+        rows = []
+        for name, path, blocks, size in self._segments():
+            blocks = [b for b in blocks if want_block(b)]
+            if not blocks or not size:
+                continue
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:  # sealed or pruned meanwhile
+                continue
+            with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                end = min(size, len(buf))
+                for b in blocks:
+                    for off, ts, h, crc, start, length in _iter_records(buf, b.offset, end, b.count):
+                        if not want_record(ts, h):
+                            continue  # header-only check; the payload is never touched
+                        payload = buf[start:start + length]
+                        if zlib.crc32(payload) == crc:
+                            rows.append(_decode(name, off, payload))
+        return rows
+
+    def trace(self, trace_id: str) -> dict:
+        """Rows of one trace, grouped like /admin/trace: requests, responses, errors."""
+        h = trace_hash(trace_id)
+        rows = self._read(lambda b: b.may_contain(h), lambda ts, rh: rh == h)
+        out = {"requests": [], "responses": [], "errors": []}
+        for row in rows:
+            if row.get("trace_id") == trace_id:  # hash collisions
+                out[row.pop("t") + "s"].append(row)
+        return out
+
+    def scan(self, since=None, until=None, table=None, limit=1000) -> list:
+        """The newest `limit` rows with since <= ts <= until (epoch ms), newest first.
+
+        Segments and blocks are walked newest-first by their last timestamp and the
+        walk stops once nothing older can displace the rows held, so only the tail
+        of the store is decompressed.
+        """
+        if limit <= 0:
+            return []
+        newest = []  # min-heap of (ts, -seen, row): the oldest kept row is at [0]
+        seen = itertools.count()
+
+        def displaces(ts):
+            return len(newest) < limit or ts > newest[0][0]
+
+        segments = sorted(
+            ((max(b.last_ts for b in blocks), name, path, blocks, size)
+             for name, path, blocks, size in self._segments() if blocks and size),
+            key=lambda s: s[:2], reverse=True,
+        )
+        for last_ts, name, path, blocks, size in segments:
+            if not displaces(last_ts):
+                break
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:  # sealed or pruned meanwhile
+                continue
+            with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                end = min(size, len(buf))
+                for b in reversed(blocks):
+                    if not b.overlaps(since, until) or not displaces(b.last_ts):
+                        continue
+                    records = list(_iter_records(buf, b.offset, end, b.count))
+                    for off, ts, _h, crc, start, length in reversed(records):
+                        if (since is not None and ts < since) or (until is not None and ts > until):
+                            continue
+                        if not displaces(ts):
+                            continue  # header-only check; the payload is never touched
+                        payload = buf[start:start + length]
+                        if zlib.crc32(payload) != crc:
+                            continue
+                        row = _decode(name, off, payload)
+                        row["table"] = row.pop("t")
+                        if table and row["table"] != table:
+                            continue
+                        item = (ts, -next(seen), row)
+                        if len(newest) < limit:
+                            heapq.heappush(newest, item)
+                        else:
+                            heapq.heapreplace(newest, item)
+        return [row for _ts, _seen, row in sorted(newest, key=lambda i: i[:2], reverse=True)]
+
+    def stats(self) -> dict:
+        segs = self._segments()
+        return {
+            "dir": self.root,
+            "segments": len(segs),
+            "bytes": sum(s[3] for s in segs),
+            "index_blocks": sum(len(s[2]) for s in segs),
+            "active": self._name,
+        }
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SegmentStore:
+    """This process's store (a forked worker gets its own segment)."""
+    global _store
+    if _store is None or _store.pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store.pid != os.getpid():
+                _store = SegmentStore(
+                    os.getenv("LOG_DIR", "./logs"),
+                    segment_bytes=_env_int("LOG_SEGMENT_BYTES", 64 * 1024 * 1024),
+                    max_age_s=float(os.getenv("LOG_SEGMENT_MAX_AGE_S", "3600")),
+                    index_every=_env_int("LOG_INDEX_EVERY", 64),
+                    retention_s=float(os.getenv("LOG_RETENTION_S", "0")),
+                )
+    return _store
@@ -0,0 +1,164 @@
+# app/core/markdown.py
+"""
+Markdown reports rendered locally from structured results.
+
+render(kind, payload) turns one analysis result (the response model as a
+dict, e.g. CompactResult.payload() or a stored result_json) into a Markdown
+document: plain string building, no LLM call. The analysis endpoints return it
+for `Accept: text/markdown`; export.py covers multi-analysis tables.
+"""
+from app.core.export import _md, _md_header, _md_row
+
+
+def _heading(title: str, res: dict) -> list:
+    out = [f"# {title}\n\n"]
+    if res.get("summary"):
+        out.append(f"{res['summary'].strip()}\n\n")
+    return out
+
+
+def _bullets(items) -> str:
+    return "".join(f"- {i}\n" for i in items if i) + "\n" if items else ""
+
+
+def _footer(res: dict) -> str:
+    meta = [f"{k}: {res[k]}" for k in ("trace_id", "generated_at") if res.get(k)]
+    return f"---\n_{' · '.join(meta)}_\n" if meta else ""
+
+
+def _recommendation(rec) -> str:
+    if not rec:
+        return ""
+    if isinstance(rec, str):
+        return f"## Recommendation\n\n{rec.strip()}\n\n"
+    out = "## Recommendation\n\n"
+    if rec.get("winner"):
+        out += f"**Recommendation:** {rec['winner']}\n\n"
+    out += "".join(f"- **{k.replace('_', ' ').capitalize()}:** {v}\n"
+                   for k, v in rec.items() if k != "winner" and v)
+    return out + "\n"
+
+
+def tradeoff(res: dict) -> str:
+    ctx = res.get("context") or {}
+    a, b = ctx.get("option_a", "Option A"), ctx.get("option_b", "Option B")
+    out = _heading(f"Trade-off: {a} vs {b}", res)
+    out.append("## Trade-off matrix\n\n")
+    out.append(_md_header(["Criterion", a, b, "Verdict", "Notes"]))
+    out += [_md_row([m.get("criterion"), m.get("option_a"), m.get("option_b"), m.get("verdict"), m.get("notes")])
+            for m in res.get("matrix", [])]
+    out += ["\n", _recommendation(res.get("recommendation")), _footer(res)]
+    return "".join(out)
+
+
+def tradeoff_nway(res: dict) -> str:
+    criteria = res.get("criteria", [])
+    out = _heading(f"Trade-off: {', '.join(res.get('options', []))}", res)
+    out.append("## Ranking\n\n")
+    out.append(_md_header(["Rank", "Option", "Weighted score", "Pareto"]))
+    out += [_md_row([r.get("rank"), r.get("option"), r.get("weighted_score"), "yes" if r.get("pareto") else ""])
+            for r in res.get("ranking", [])]
+    scores = {(c.get("option"), c.get("criterion")): c.get("score") for c in res.get("matrix", [])}
+    weights = res.get("weights") or {}
+    out.append("\n## Scores (1–5)\n\n")
+    out.append(_md_header(["Option"] + [f"{c} (×{weights[c]:g})" if c in weights else c for c in criteria]))
+    out += [_md_row([o] + [scores.get((o, c)) or "–" for c in criteria]) for o in res.get("options", [])]
+    out += ["\n", _recommendation(res.get("recommendation")), _footer(res)]
+    return "".join(out)
+
+
+def review(res: dict) -> str:
+    out = _heading("Design review", res)
+    risks = res.get("risks", [])
+    if risks:
+        out.append("## Risks\n\n")
+        out.append(_md_header(["Area", "Severity", "Likelihood", "Impact", "Mitigation"]))
+        out += [_md_row([r.get(k) for k in ("area", "severity", "likelihood", "impact", "mitigation")])
+                for r in risks]
+        out.append("\n")
+    if res.get("action_items"):
+        out.append("## Action items\n\n")
+        out += [f"- [ ] {item}\n" for item in res["action_items"]]
+        out.append("\n")
+    out.append(_footer(res))
+    return "".join(out)
+
+
+def risk(res: dict) -> str:
+    out = _heading("Risk register", res)
+    out.append(_md_header(["Risk", "Category", "Description", "L", "I", "Score", "Mitigation", "Owner", "Due"]))
+    out += [_md_row([r.get(k) for k in ("risk_id", "category", "description", "likelihood", "impact", "score",
+                                        "mitigation", "owner", "due_by")])
+            for r in res.get("risks", [])]
+    out += ["\n", _footer(res)]
+    return "".join(out)
+
+
+def testcases(res: dict) -> str:
+    out = _heading("Test cases", res)
+    for c in res.get("cases", []):
+        out.append(f"### {c.get('id')}: {c.get('title')}\n\n")
+        out.append(f"_{c.get('priority')} priority · {c.get('type')}_\n\n")
+        out.append(f"- **Given** {c.get('given')}\n- **When** {c.get('when')}\n- **Then** {c.get('then')}\n\n")
+    out.append(_footer(res))
+    return "".join(out)
+
+
+def design(res: dict) -> str:
+    out = _heading("Design options", res)
+    for o in res.get("options", []):
+        out.append(f"## {o.get('name')}\n\n")
+        if o.get("when_to_use"):
+            out.append(f"**When to use:** {o['when_to_use']}\n\n")
+        if o.get("key_components"):
+            out.append(f"**Key components:** {', '.join(o['key_components'])}\n\n")
+        if o.get("pros"):
+            out.append("**Pros**\n\n" + _bullets(o["pros"]))
+        if o.get("cons"):
+            out.append("**Cons**\n\n" + _bullets(o["cons"]))
+        diagram = (o.get("diagram_mermaid") or "").strip()
+        if diagram:
+            out.append(f"```mermaid\n{diagram}\n```\n\n")
+    out += [_recommendation(res.get("recommendation")), _footer(res)]
+    return "".join(out)
+
+
+def techstack(res: dict) -> str:
+    out = _heading("Performance & tech stack review", res)
+    findings = res.get("performance_review", [])
+    if findings:
+        out.append("## Performance review\n\n")
+        out.append(_md_header(["Attribute", "Score", "Issues", "Suggestions"]))
+        out += [_md_row([f.get("attribute"), f"{f.get('score')}/10", "\n".join(f.get("issues", [])),
+                         "\n".join(f.get("suggestions", []))])
+                for f in findings]
+        out.append("\n")
+    recs = res.get("tech_recommendations", [])
+    if recs:
+        out.append("## Recommended stack\n\n")
+        out.append(_md_header(["Category", "Options", "Reasoning"]))
+        out += [_md_row([t.get("category"), ", ".join(t.get("options", [])), t.get("reasoning")]) for t in recs]
+        out.append("\n")
+    ref = res.get("reference_comparison") or {}
+    for key, title in (("matched", "Matches the reference architecture"),
+                       ("missing", "Missing from the reference architecture"),
+                       ("improvements", "Improvements")):
+        if ref.get(key):
+            out.append(f"## {title}\n\n" + _bullets(ref[key]))
+    out.append(_footer(res))
+    return "".join(out)
+
+
+RENDERERS = {
+    "tradeoff": tradeoff,
+    "tradeoff_nway": tradeoff_nway,
+    "review": review,
+    "risk": risk,
+    "testcases": testcases,
+    "design": design,
+    "techstack": techstack,
+}
+
+
+def render(kind: str, payload: dict) -> str:
+    return RENDERERS[kind](payload)
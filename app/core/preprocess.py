@@ -0,0 +1,193 @@
+# app/core/preprocess.py
+"""
+Pre-processing of pasted documents before they reach the LLM.
+
+Review documents, risk designs and tech-stack architectures are often wiki
+exports. A Pipeline runs PREPROCESS_STEPS over those fields (see FIELDS) in
+_call_llm, after the cache key is taken from the raw input:
+
+    binaries    data: URIs and long base64 runs -> a short placeholder
+    whitespace  CRLF, NBSP / zero-width characters, trailing spaces, runs of
+                spaces outside code and blank-line runs
+    dedupe      repeated paragraphs (nav bars, disclaimers, footers) are
+                kept once; state lives on the pipeline, so it also spans the
+                chunks of a streamed upload
+    tables      Markdown tables beyond PREPROCESS_TABLE_ROWS rows are cut,
+                with a note saying how many rows were left out
+    code        (opt-in) fenced code blocks beyond PREPROCESS_CODE_LINES are
+                reduced to their head, declaration lines and tail
+
+Fenced code is left alone by whitespace, dedupe and tables. Token figures
+use the same ~4 chars/token estimate as prompt stats. They are reported
+per request as X-Input-Tokens / X-Input-Tokens-Saved headers and on a
+"preprocess" span. PREPROCESS_STEPS= (empty) turns the stage off.
+benchmarks/bench_preprocess.py measures it.
+"""
+import os
+import re
+
+DEFAULT_STEPS = "binaries,whitespace,dedupe,tables"
+
+# analysis kind -> request fields holding pasted documents
+FIELDS = {
+    "review": ("document",),
+    "risk": ("design",),
+    "techstack": ("architecture",),
+}
+
+TABLE_ROWS = int(os.getenv("PREPROCESS_TABLE_ROWS", "30"))
+CODE_LINES = int(os.getenv("PREPROCESS_CODE_LINES", "60"))
+DEDUPE_MIN_CHARS = 40  # shorter paragraphs ("## Notes", "---") may legitimately repeat
+
+_FENCE = re.compile(r"^(```|~~~)[^\n]*\n.*?^\1[ \t]*\r?$\n?", re.M | re.S)
+_DATA_URI = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=\s]{32,}")
+_BASE64 = re.compile(r"(?<![A-Za-z0-9+/])[A-Za-z0-9+/]{200,}={0,2}")
+_INVISIBLE = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+_INNER_SPACES = re.compile(r"(?<=\S)[ \t]{2,}")
+_TRAILING = re.compile(r"[ \t]+$", re.M)
+_BLANK_RUNS = re.compile(r"\n{3,}")
+_DECLARATION = re.compile(
+    r"^\s*(def |class |async def |function |func |fn |interface |type |public |private |protected |"
+    r"export |CREATE |ALTER |@\w)", re.I
+)
+
+
+def _segments(text: str):
+    """(is_code, chunk) pairs; fenced code blocks are their own chunks."""
+    pos = 0
+    for m in _FENCE.finditer(text):
+        if m.start() > pos:
+            yield False, text[pos:m.start()]
+        yield True, m.group(0)
+        pos = m.end()
+    if pos < len(text):
+        yield False, text[pos:]
+
+
+def strip_binaries(text: str) -> str:
+    text = _DATA_URI.sub("[embedded binary removed]", text)
+    return _BASE64.sub(lambda m: f"[base64 blob removed, ~{len(m.group(0)) * 3 // 4} bytes]", text)
+
+
+def normalise_whitespace(text: str) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\u00a0", " ")
+    text = _INVISIBLE.sub("", text)
+    text = _INNER_SPACES.sub(" ", text)  # indentation (leading whitespace) is kept
+    text = _TRAILING.sub("", text)
+    return _BLANK_RUNS.sub("\n\n", text)
+
+
+def cut_tables(text: str, max_rows: int = TABLE_ROWS) -> str:
+    out, table = [], []
+
+    def flush():
+        if len(table) > max_rows + 2:  # header + separator + rows
+            out.extend(table[: max_rows + 2])
+            out.append(f"| … {len(table) - max_rows - 2} more rows omitted |")
+        else:
+            out.extend(table)
+        table.clear()
+
+    for line in text.split("\n"):
+        if line.lstrip().startswith("|"):
+            table.append(line)
+            continue
+        if table:
+            flush()
+        out.append(line)
+    if table:
+        flush()
+    return "\n".join(out)
+
+
+def shorten_code(block: str, max_lines: int = CODE_LINES) -> str:
+    lines = block.rstrip("\n").split("\n")
+    fence, body, close = lines[0], lines[1:-1], lines[-1]
+    if len(body) <= max_lines:
+        return block
+    head, tail = body[:20], body[-5:]
+    middle = [ln for ln in body[20:-5] if _DECLARATION.match(ln)][: max_lines - 25]
+    omitted = len(body) - len(head) - len(middle) - len(tail)
+    return "\n".join([fence, *head, *middle, f"# … {omitted} lines omitted …", *tail, close]) + "\n"
+
+
+class Pipeline:
+    """One document's pre-processing run; keeps dedupe state and per-step savings."""
+
+    def __init__(self, steps=None):
+        spec = os.getenv("PREPROCESS_STEPS", DEFAULT_STEPS) if steps is None else steps
+        self.steps = [s.strip() for s in spec.split(",") if s.strip()] if isinstance(spec, str) else list(spec)
+        self.seen = set()
+        self.chars_before = 0
+        self.chars_after = 0
+        self.saved = {s: 0 for s in self.steps}
+
+    def __bool__(self):
+        return bool(self.steps)
+
+    def _dedupe(self, text: str) -> str:
+        keep = []
+        for para in text.split("\n\n"):
+            key = " ".join(para.split()).lower()
+            if len(key) >= DEDUPE_MIN_CHARS:
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+            keep.append(para)
+        return "\n\n".join(keep)
+
+    def _step(self, name: str, fn, text: str) -> str:
+        out = fn(text)
+        self.saved[name] += len(text) - len(out)
+        return out
+
+    def run(self, text: str) -> str:
+        self.chars_before += len(text)
+        if "binaries" in self.steps:
+            text = self._step("binaries", strip_binaries, text)
+        parts = []
+        for is_code, chunk in _segments(text):
+            if is_code:
+                if "code" in self.steps:
+                    chunk = self._step("code", shorten_code, chunk)
+            else:
+                if "whitespace" in self.steps:
+                    chunk = self._step("whitespace", normalise_whitespace, chunk)
+                if "dedupe" in self.steps:
+                    chunk = self._step("dedupe", self._dedupe, chunk)
+                if "tables" in self.steps:
+                    chunk = self._step("tables", cut_tables, chunk)
+            parts.append(chunk)
+        text = "".join(parts)
+        self.chars_after += len(text)
+        return text
+
+    def stream(self, chunks):
+        """Lazily pre-process the chunks of a streamed document; chunks left empty are dropped."""
+        for chunk in chunks:
+            chunk = self.run(chunk)
+            if chunk.strip():
+                yield chunk
+
+    def stats(self) -> dict:
+        before, after = self.chars_before // 4, self.chars_after // 4  # prompts._estimate_tokens
+        return {
+            "chars_before": self.chars_before,
+            "chars_after": self.chars_after,
+            "tokens_before": before,
+            "tokens_after": after,
+            "tokens_saved": before - after,
+            "chars_saved_by_step": dict(self.saved),
+        }
+
+
+def apply(kind: str, req):
+    """(request with cleaned document fields, Pipeline) — or (req, None) when nothing applies."""
+    fields = FIELDS.get(kind)
+    if not fields:
+        return req, None
+    pipe = Pipeline()
+    if not pipe:
+        return req, None
+    update = {f: pipe.run(getattr(req, f)) for f in fields if getattr(req, f, None)}
+    return req.model_copy(update=update), pipe
@@ -0,0 +1,133 @@
+# app/core/profiler.py
+"""
+On-demand profiling for a running worker.
+
+sample() is a wall-clock stack sampler: every `interval` it reads
+sys._current_frames() for all threads of this process and counts each stack,
+so it sees Pydantic, JSON, SQLAlchemy and time spent blocked on locks or I/O
+alike. Output is collapsed-stack text ("thread;outer;...;leaf count" per
+line), ready for flamegraph.pl, speedscope or inferno. Overhead is one frame
+walk per thread per tick and nothing at all when no capture is running.
+
+Per-request cProfile (X-Profile: 1 plus the admin key) profiles the handling
+thread only; work handed to pool threads (test-case shards, review chunks)
+shows up as time waiting on futures. Results are kept in a small in-memory
+store keyed by trace id.
+
+Both are per process: under gunicorn, a capture sees the worker that served it.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.core.cache import TTLCache
+
+MAX_SECONDS = 60.0
+
+_sampling = threading.Lock()  # one capture per process at a time
+
+_profiles = TTLCache(
+    int(os.getenv("PROFILE_STORE_ENTRIES", "32")), float(os.getenv("PROFILE_STORE_TTL_S", "3600"))
+)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def _stack(frame) -> list:
+    out = []
+    while frame is not None:
+        out.append(_frame_label(frame))
+        frame = frame.f_back
+    out.reverse()  # root first
+    return out
+
+
+def sample(seconds: float, interval: float = 0.01) -> Counter:
+    """Counter of collapsed stacks ("thread;frame;...;frame") over `seconds`."""
+    seconds = min(max(seconds, interval), MAX_SECONDS)
+    if not _sampling.acquire(blocking=False):
+        raise ProfilerBusy("A capture is already running in this worker")
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                thread = names.get(ident, f"thread-{ident}").replace(";", "_").replace(" ", "_")
+                stacks[";".join([thread, *_stack(frame)])] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _sampling.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+
+# --- per-request cProfile ---
+
+def start_request_profile():
+    """A running cProfile.Profile, or None if another profiler is active in this process."""
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:  # 3.12+: only one sys.monitoring profiler at a time
+        return None
+    return prof
+
+
+def finish_request_profile(prof, trace_id: str, label: str):
+    prof.disable()
+    prof.create_stats()
+    _profiles.set(trace_id, {"label": label, "stats": prof.stats, "created": time.time()})
+
+
+def discard_request_profile(prof):
+    """Stop a request profile that never reached finish_request_profile (the request errored)."""
+    prof.disable()
+    prof.clear()
+
+
+def stored_profile(trace_id: str):
+    return _profiles.get(trace_id)
+
+
+def profile_text(entry, sort: str = "cumulative", limit: int = 60) -> str:
+    buf = io.StringIO()
+    buf.write(f"# {entry['label']}\n")
+    st = pstats.Stats(_StatsSource(entry["stats"]), stream=buf)
+    st.strip_dirs().sort_stats(sort).print_stats(limit)
+    return buf.getvalue()
+
+
+def profile_pstats(entry) -> bytes:
+    """marshal-ed stats, the format written by pstats.dump_stats (snakeviz, gprof2dot)."""
+    return marshal.dumps(entry["stats"])
+
+
+class _StatsSource:
+    """Adapter so pstats.Stats can load from an in-memory stats dict."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
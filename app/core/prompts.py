@@ -0,0 +1,224 @@
+# app/core/prompts.py
+"""
+Prompt template registry.
+
+System prompts live in app/prompts/<analysis_type>/<version>.txt (override the
+root with PROMPT_DIR). Files are read and compiled once; `$schema` is
+substituted with the response model's JSON schema the first time a template is
+used, so run_* no longer rebuilds the schema on every call.
+
+Traffic between versions is split with PROMPT_SPLIT, e.g.
+
+    PROMPT_SPLIT="tradeoff=v1:90,v2-short:10;review=v1"
+
+Kinds not listed use their DEFAULT_VERSIONS entry, or "v1". Published
+versions are never edited in place: a prompt change is a new file, so a pinned
+version and its stats always mean the same text. A request can pin a version with X-Prompt-Version.
+Per-version latency, token and validation-failure stats are kept in process
+and exposed at GET /api/v1/admin/prompts.
+"""
+import json
+import os
+import random
+import threading
+import time
+from string import Template
+
+from flask import has_request_context, request
+
+DEFAULT_VERSION = "v1"
+# kinds whose request payloads need a newer prompt (retrieved context, shard parts)
+DEFAULT_VERSIONS = {"design": "v2", "techstack": "v2", "testcases": "v2"}
+PROMPT_DIR = os.getenv(
+    "PROMPT_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts")
+)
+
+
+class PromptTemplate:
+    __slots__ = ("kind", "version", "_template", "_text", "_lock")
+
+    def __init__(self, kind: str, version: str, source: str):
+        self.kind = kind
+        self.version = version
+        self._template = Template(source.strip())
+        self._text = None
+        self._lock = threading.Lock()
+
+    @property
+    def id(self) -> str:
+        return f"{self.kind}/{self.version}"
+
+    def render(self, response_model) -> str:
+        """Rendered system prompt; the schema is substituted once and cached."""
+        if self._text is None:
+            with self._lock:
+                if self._text is None:
+                    schema = json.dumps(response_model.model_json_schema(), separators=(",", ":"))
+                    self._text = self._template.safe_substitute(schema=schema)
+        return self._text
+
+
+class PromptStats:
+    __slots__ = ("calls", "failures", "errors", "latency_ms_total", "latency_ms_max", "tokens_total")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0   # output that did not parse / validate
+        self.errors = 0     # transport / SDK errors
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.tokens_total = 0
+
+    def as_dict(self) -> dict:
+        ok = self.calls - self.failures - self.errors
+        return {
+            "calls": self.calls,
+            "validation_failures": self.failures,
+            "errors": self.errors,
+            "failure_rate": round(self.failures / self.calls, 4) if self.calls else 0.0,
+            "avg_latency_ms": round(self.latency_ms_total / self.calls, 1) if self.calls else 0.0,
+            "max_latency_ms": round(self.latency_ms_max, 1),
+            "avg_tokens": round(self.tokens_total / ok, 1) if ok else 0.0,
+        }
+
+
+class Registry:
+    def __init__(self, root: str, split_spec: str = ""):
+        self.templates = {}   # kind -> {version: PromptTemplate}
+        self.splits = {}      # kind -> ([versions], [weights])
+        self.stats = {}       # template id -> PromptStats
+        self._stats_lock = threading.Lock()
+        self._load(root)
+        self._parse_split(split_spec)
+
+    def _load(self, root: str):
+        if not os.path.isdir(root):
+            return
+        for kind in sorted(os.listdir(root)):
+            kind_dir = os.path.join(root, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for name in sorted(os.listdir(kind_dir)):
+                if not name.endswith(".txt"):
+                    continue
+                version = name[:-4]
+                with open(os.path.join(kind_dir, name), encoding="utf-8") as f:
+                    tpl = PromptTemplate(kind, version, f.read())
+                self.templates.setdefault(kind, {})[version] = tpl
+                self.stats[tpl.id] = PromptStats()
+
+    def _parse_split(self, spec: str):
+        for part in filter(None, (p.strip() for p in spec.split(";"))):
+            kind, _, versions = part.partition("=")
+            names, weights = [], []
+            for item in filter(None, (v.strip() for v in versions.split(","))):
+                name, _, weight = item.partition(":")
+                if name not in self.templates.get(kind.strip(), {}):
+                    raise ValueError(f"PROMPT_SPLIT references unknown prompt {kind}/{name}")
+                names.append(name)
+                weights.append(float(weight or 100))
+            if names:
+                self.splits[kind.strip()] = (names, weights)
+
+    def _default(self, kind: str) -> str:
+        versions = self.templates[kind]
+        for name in (DEFAULT_VERSIONS.get(kind), DEFAULT_VERSION):
+            if name in versions:
+                return name
+        return next(iter(versions))
+
+    def select(self, kind: str) -> PromptTemplate:
+        versions = self.templates.get(kind)
+        if not versions:
+            raise KeyError(f"no prompt templates for {kind!r} under {PROMPT_DIR}")
+        pinned = request.headers.get("X-Prompt-Version") if has_request_context() else None
+        if pinned in versions:
+            return versions[pinned]
+        if kind in self.splits:
+            names, weights = self.splits[kind]
+            return versions[random.choices(names, weights)[0]]
+        return versions[self._default(kind)]
+
+    def record(self, tpl: PromptTemplate, latency_ms: float, tokens: int, outcome: str = "ok"):
+        with self._stats_lock:
+            s = self.stats[tpl.id]
+            s.calls += 1
+            s.latency_ms_total += latency_ms
+            s.latency_ms_max = max(s.latency_ms_max, latency_ms)
+            if outcome == "ok":
+                s.tokens_total += tokens
+            elif outcome == "invalid":
+                s.failures += 1
+            else:
+                s.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                tid: dict(stats.as_dict(), weight=self._weight(tid))
+                for tid, stats in sorted(self.stats.items())
+            }
+
+    def _weight(self, tid: str) -> float:
+        kind, version = tid.split("/", 1)
+        if kind in self.splits:
+            names, weights = self.splits[kind]
+            return weights[names.index(version)] if version in names else 0
+        return 100 if version == self._default(kind) else 0
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry(PROMPT_DIR, os.getenv("PROMPT_SPLIT", ""))
+    return _registry
+
+
+def select(kind: str) -> PromptTemplate:
+    return get_registry().select(kind)
+
+
+def _estimate_tokens(*parts: str) -> int:
+    # ~4 chars per token; good enough to compare prompt versions against each other
+    return sum(len(p) for p in parts if p) // 4
+
+
+class track:
+    """
+    Time one LLM attempt for a template and record it:
+
+        with prompts.track(tpl) as call:
+            raw = _gemini([system, user])
+            call.observe(system, user, raw)
+            ...
+            return Model(**data)   # ValueError/KeyError/TypeError inside = invalid output
+    """
+
+    def __init__(self, tpl: PromptTemplate):
+        self.tpl = tpl
+        self.tokens = 0
+
+    def observe(self, system: str, user: str, raw: str, usage: int | None = None):
+        self.tokens = usage if usage else _estimate_tokens(system, user, raw)
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency_ms = (time.perf_counter() - self._t0) * 1000
+        if exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, (ValueError, KeyError, TypeError)):
+            # json.JSONDecodeError and pydantic.ValidationError are ValueErrors
+            outcome = "invalid"
+        else:
+            outcome = "error"
+        get_registry().record(self.tpl, latency_ms, self.tokens, outcome)
+        return False
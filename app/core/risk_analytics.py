@@ -0,0 +1,193 @@
+# app/core/risk_analytics.py
+"""
+Deterministic, LLM-free analytics over RiskRow registers.
+
+Everything operates on column arrays (NumPy) so a project's whole stored risk
+portfolio can be scored, de-duplicated, ranked and bucketed into a
+likelihood x impact heatmap in milliseconds:
+
+    table = RiskTable.from_rows(rows)       # RiskRow models or plain dicts
+    table = deduped(table, threshold=0.8)   # near-identical descriptions, any category
+    top = table.take(rank(table)[:20])
+    grid = heatmap(table)                   # 3 x 4 counts
+
+project_table() builds (and caches) the table for all stored "risk" analyses
+of a project; the cache is invalidated when a new analysis is stored.
+"""
+import re
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+LIKELIHOOD_LEVELS = 3  # RiskRow.likelihood: 1..3
+IMPACT_LEVELS = 4      # RiskRow.impact: 1..4
+HASH_DIM = 256         # feature-hashing width for description similarity
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could for from has have if in into is it its may of on or "
+    "that the their there this to too was were will with without".split()
+)
+
+
+class RiskTable:
+    """Column-oriented risk register. Numeric columns are arrays, text columns lists."""
+
+    __slots__ = ("risk_id", "category", "description", "mitigation", "owner",
+                 "likelihood", "impact", "score", "analysis_id", "_deduped")
+
+    def __init__(self, risk_id, category, description, mitigation, owner,
+                 likelihood, impact, analysis_id):
+        self.risk_id = risk_id
+        self.category = category
+        self.description = description
+        self.mitigation = mitigation
+        self.owner = owner
+        self.likelihood = np.clip(np.asarray(likelihood, dtype=np.int16), 1, LIKELIHOOD_LEVELS)
+        self.impact = np.clip(np.asarray(impact, dtype=np.int16), 1, IMPACT_LEVELS)
+        self.score = self.likelihood * self.impact
+        self.analysis_id = np.asarray(analysis_id, dtype=np.int64)
+        self._deduped = {}  # threshold -> RiskTable, see deduped()
+
+    def __len__(self):
+        return len(self.risk_id)
+
+    @classmethod
+    def from_rows(cls, rows, analysis_ids=None):
+        cols = {k: [] for k in ("risk_id", "category", "description", "mitigation", "owner",
+                                "likelihood", "impact")}
+        for r in rows:
+            r = r.model_dump() if hasattr(r, "model_dump") else r
+            cols["risk_id"].append(str(r.get("risk_id", "")))
+            # categories / owners repeat across thousands of rows; share one string each
+            cols["category"].append(sys.intern(str(r.get("category", ""))))
+            cols["description"].append(str(r.get("description", "")))
+            cols["mitigation"].append(str(r.get("mitigation", "")))
+            cols["owner"].append(sys.intern(str(r.get("owner", "Unassigned"))))
+            cols["likelihood"].append(_as_int(r.get("likelihood")))
+            cols["impact"].append(_as_int(r.get("impact")))
+        n = len(cols["risk_id"])
+        ids = analysis_ids if analysis_ids is not None else [0] * n
+        return cls(analysis_id=ids, **cols)
+
+    def take(self, idx) -> "RiskTable":
+        idx = np.asarray(idx, dtype=np.int64)
+        pick = lambda col: [col[i] for i in idx]  # noqa: E731
+        return RiskTable(
+            pick(self.risk_id), pick(self.category), pick(self.description),
+            pick(self.mitigation), pick(self.owner),
+            self.likelihood[idx], self.impact[idx], self.analysis_id[idx],
+        )
+
+    def to_rows(self) -> list[dict]:
+        return [
+            {
+                "risk_id": self.risk_id[i],
+                "category": self.category[i],
+                "description": self.description[i],
+                "likelihood": int(self.likelihood[i]),
+                "impact": int(self.impact[i]),
+                "score": int(self.score[i]),
+                "mitigation": self.mitigation[i],
+                "owner": self.owner[i],
+                "analysis_id": int(self.analysis_id[i]),
+            }
+            for i in range(len(self))
+        ]
+
+
+def _as_int(value, default=1) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def rank(table: RiskTable) -> np.ndarray:
+    """Indices by score desc, then impact desc, then newest analysis first."""
+    # np.lexsort sorts by the last key first
+    return np.lexsort((-table.analysis_id, -table.impact, -table.score))
+
+
+def _tokens(text: str):
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS]
+
+
+def _embed(descriptions) -> np.ndarray:
+    """L2-normalised hashed bag-of-words (crc32, so stable across processes)."""
+    mat = np.zeros((len(descriptions), HASH_DIM), dtype=np.float32)
+    for i, text in enumerate(descriptions):
+        for w in _tokens(text):
+            mat[i, zlib.crc32(w.encode()) % HASH_DIM] += 1.0
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def dedupe(table: RiskTable, threshold: float = 0.8, block: int = 1024) -> RiskTable:
+    """
+    Drop every risk whose description is near-identical (cosine >= threshold)
+    to a higher-ranked one, regardless of category. Similarity is computed in
+    row blocks, so memory stays O(block * n) and no per-row Python loop runs.
+    """
+    n = len(table)
+    if n < 2:
+        return table
+    order = rank(table)
+    vecs = _embed([table.description[i] for i in order])
+    dropped = np.zeros(n, dtype=bool)
+    cols = np.arange(n)
+    for start in range(0, n, block):
+        sims = vecs[start:start + block] @ vecs.T
+        rows = np.arange(start, start + sims.shape[0])[:, None]
+        # only look "down" the ranking: j is a duplicate of some better-ranked i < j
+        dropped |= ((sims >= threshold) & (cols[None, :] > rows)).any(axis=0)
+    return table.take(order[~dropped])
+
+
+def deduped(table: RiskTable, threshold: float = 0.8) -> RiskTable:
+    """dedupe() memoised on the table; project tables are cached, so repeat calls are free."""
+    key = round(threshold, 3)
+    hit = table._deduped.get(key)
+    if hit is None:
+        hit = table._deduped[key] = dedupe(table, key)
+    return hit
+
+
+def heatmap(table: RiskTable) -> np.ndarray:
+    """Counts per (likelihood, impact) cell; shape (3, 4), row 0 = likelihood 1."""
+    grid = np.zeros((LIKELIHOOD_LEVELS, IMPACT_LEVELS), dtype=np.int64)
+    np.add.at(grid, (table.likelihood - 1, table.impact - 1), 1)
+    return grid
+
+
+# --- per-project portfolio cache ---
+# project_id -> ((max analysis id, analysis count), RiskTable)
+_portfolio = {}
+_portfolio_lock = threading.Lock()
+
+
+def project_table(db, project_id: int) -> RiskTable:
+    """All risks from stored 'risk' analyses of a project, rebuilt only when new ones arrive."""
+    from sqlalchemy import func
+    from app.models import Analysis
+
+    flt = (Analysis.project_id == project_id, Analysis.analysis_type == "risk")
+    version = tuple(db.query(func.max(Analysis.id), func.count(Analysis.id)).filter(*flt).one())
+    with _portfolio_lock:
+        cached = _portfolio.get(project_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    rows, ids = [], []
+    q = db.query(Analysis.id, Analysis.result_json).filter(*flt).order_by(Analysis.id)
+    for analysis_id, result in q.yield_per(500):
+        for r in (result or {}).get("risks", []):
+            rows.append(r)
+            ids.append(analysis_id)
+    table = RiskTable.from_rows(rows, ids)
+    with _portfolio_lock:
+        _portfolio[project_id] = (version, table)
+    return table
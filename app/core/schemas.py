@@ -1,6 +1,6 @@
 # app/core/schemas.py
-from pydantic import BaseModel
-from typing import List, Literal, Optional, Dict
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 
 # ===== Tradeoff =====
 class TradeoffRow(BaseModel):
@@ -27,6 +27,53 @@ class TradeoffResponse(BaseModel):
     summary: str
     recommendation: Dict[str, str]
 
+# ===== N-way Tradeoff =====
+class NwayTradeoffRequest(BaseModel):
+    options: List[str] = Field(..., min_length=2, max_length=16)
+    criteria: List[str] = Field(..., min_length=1, max_length=40)
+    weights: Dict[str, float] = {}   # criterion -> weight; unlisted criteria weigh 1
+    constraints: List[str] = []
+    context: Optional[str] = None
+
+class OptionScore(BaseModel):
+    criterion: str
+    score: int        # 1 (poor) .. 5 (excellent)
+    rationale: str = ""
+
+class OptionScoreResponse(BaseModel):
+    """One scoring call: a single option against a chunk of the criteria."""
+    option: str
+    scores: List[OptionScore]
+
+class NwaySummary(BaseModel):
+    summary: str
+    recommendation: Dict[str, str]
+
+class NwayCell(BaseModel):
+    option: str
+    criterion: str
+    score: int        # 0 = not scored
+    rationale: str = ""
+
+class NwayRank(BaseModel):
+    option: str
+    rank: int
+    weighted_score: float
+    pareto: bool      # not dominated on every criterion by another option
+
+class NwayTradeoffResponse(BaseModel):
+    version: str = "1.0"
+    generated_at: str
+    trace_id: str
+    options: List[str]
+    criteria: List[str]
+    weights: Dict[str, float]
+    matrix: List[NwayCell]
+    ranking: List[NwayRank]
+    pareto_front: List[str]
+    summary: str
+    recommendation: Dict[str, str]
+
 # ===== Review =====
 class ReviewRequest(BaseModel):
     document: str
@@ -74,7 +121,6 @@ class RiskResponse(BaseModel):
 
 
 # ===== Test Cases =====
-from typing import Any
 
 class TestCase(BaseModel):
     id: str
@@ -92,7 +138,7 @@ class TestCaseRequest(BaseModel):
     function_signature: Optional[str] = None
     non_functionals: List[str] = []           # e.g., ["Performance","Security"]
     constraints: List[str] = []               # e.g., ["2-week deadline"]
-    count: int = 6                             # desired number of cases
+    count: int = Field(6, ge=1, le=500)       # desired number of cases; >10 is generated in shards
 
 class TestCaseResponse(BaseModel):
     version: str = "1.0"
@@ -103,9 +149,6 @@ class TestCaseResponse(BaseModel):
 
 # --- PS-04: Suggest Design ---
 
-from pydantic import BaseModel, Field
-from typing import List, Optional
-
 class DesignSuggestRequest(BaseModel):
     problem: str = Field(..., description="Short description of the problem/domain")
     quality_goals: List[str] = Field(default_factory=list, description="e.g., Scalability, Reliability")
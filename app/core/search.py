@@ -0,0 +1,229 @@
+# app/core/search.py
+"""
+Full-text search over stored analyses.
+
+Each analysis is flattened into four text fields: summary, risks (risk
+descriptions, impact, mitigations), recommendations (recommendations, action
+items, suggestions) and tests (test-case titles). The fields go into a side
+index that record() writes in the same transaction as the analysis row, so the
+index never lags history:
+
+    sqlite    FTS5 virtual table `analysis_search` (porter stemming), ranked with bm25()
+    postgres  `analysis_search` table with a weighted tsvector + GIN index, ranked with ts_rank()
+
+Other dialects (or an SQLite build without FTS5) have no index and search()
+raises SearchUnavailable. Response logs carry the same result JSON as the
+analyses they belong to, so they are covered without being indexed twice.
+
+init_db() creates the index and backfills analyses written before it existed.
+"""
+import logging
+import re
+
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+FIELDS = ("summary", "risks", "recommendations", "tests")
+# bm25 / setweight priority per field; summaries and risks are what people search for
+_SQLITE_WEIGHTS = "4.0, 2.0, 2.0, 1.0, 0.0, 0.0"
+_PG_WEIGHTS = dict(zip(FIELDS, "ABBC"))
+
+SNIPPET_TOKENS = 16
+MARK = ("<mark>", "</mark>")
+
+_available: dict[str, str | None] = {}  # engine url -> "sqlite" | "postgres" | None
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+# --- text extraction ---
+
+def _strings(value):
+    if isinstance(value, str):
+        if value.strip():
+            yield value.strip()
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _strings(v)
+
+
+def extract(payload: dict) -> dict:
+    """Searchable text per field from a stored response payload (any analysis type)."""
+    risks = [
+        " ".join(_strings([r.get(k) for k in ("category", "area", "description", "impact", "mitigation")]))
+        for r in payload.get("risks") or [] if isinstance(r, dict)
+    ]
+    recs = list(_strings(payload.get("recommendation")))
+    recs += _strings(payload.get("action_items"))
+    for o in payload.get("options") or []:
+        if isinstance(o, dict):  # design options; n-way options are plain strings
+            recs += _strings([o.get("name"), o.get("when_to_use")])
+    for t in payload.get("tech_recommendations") or []:
+        recs += _strings([t.get("category"), t.get("options"), t.get("reasoning")])
+    for f in payload.get("performance_review") or []:
+        risks += _strings(f.get("issues"))
+        recs += _strings(f.get("suggestions"))
+    recs += _strings([row.get("notes") for row in payload.get("matrix") or []])
+    tests = [c["title"] for c in payload.get("cases") or [] if c.get("title")]
+    return {
+        "summary": payload.get("summary") or "",
+        "risks": "\n".join(risks),
+        "recommendations": "\n".join(recs),
+        "tests": "\n".join(tests),
+    }
+
+
+# --- index maintenance ---
+
+def _dialect(bind) -> str | None:
+    return _available.get(str(bind.engine.url))
+
+
+def ensure_index(engine):
+    """Create the search index for this engine if the dialect supports one, then backfill."""
+    name = engine.dialect.name
+    key = str(engine.url)
+    try:
+        with engine.begin() as conn:
+            if name == "sqlite":
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS analysis_search USING fts5("
+                    "summary, risks, recommendations, tests, "
+                    "project_id UNINDEXED, analysis_type UNINDEXED, "
+                    "tokenize = 'porter unicode61')"
+                ))
+            elif name == "postgresql":
+                doc = " || ".join(
+                    f"setweight(to_tsvector('english', coalesce({f}, '')), '{w}')" for f, w in _PG_WEIGHTS.items()
+                )
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS analysis_search ("
+                    "analysis_id integer PRIMARY KEY REFERENCES analyses(id), "
+                    "project_id integer NOT NULL, analysis_type varchar(32) NOT NULL, "
+                    "summary text, risks text, recommendations text, tests text, "
+                    f"document tsvector GENERATED ALWAYS AS ({doc}) STORED)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_analysis_search_document ON analysis_search USING GIN (document)"
+                ))
+            else:
+                _available[key] = None
+                return
+    except Exception:
+        # e.g. an SQLite library compiled without FTS5
+        log.warning("full-text search unavailable on %s", name, exc_info=True)
+        _available[key] = None
+        return
+    _available[key] = "sqlite" if name == "sqlite" else "postgres"
+    n = backfill(engine)
+    if n:
+        log.info("indexed %d stored analyses for search", n)
+
+
+def _insert(conn_or_db, dialect: str, analysis_id: int, project_id: int, kind: str, payload: dict):
+    fields = extract(payload)
+    id_col = "rowid" if dialect == "sqlite" else "analysis_id"
+    conn_or_db.execute(
+        text(
+            f"INSERT INTO analysis_search ({id_col}, project_id, analysis_type, {', '.join(FIELDS)}) "
+            f"VALUES (:id, :project_id, :kind, {', '.join(':' + f for f in FIELDS)})"
+        ),
+        {"id": analysis_id, "project_id": project_id, "kind": kind, **fields},
+    )
+
+
+def index(db, row):
+    """Add a flushed Analysis row to the index, inside the caller's transaction."""
+    dialect = _dialect(db.get_bind())
+    if dialect is not None:
+        _insert(db, dialect, row.id, row.project_id, row.analysis_type, row.result_json or {})
+
+
+def backfill(engine, batch: int = 500) -> int:
+    """Index stored analyses that are not in the index yet. Returns rows indexed."""
+    from app.models import Analysis
+
+    dialect = _available.get(str(engine.url))
+    if dialect is None:
+        return 0
+    id_col = "rowid" if dialect == "sqlite" else "analysis_id"
+    done = 0
+    with engine.begin() as conn:
+        missing = conn.execute(text(
+            f"SELECT id FROM analyses WHERE id NOT IN (SELECT {id_col} FROM analysis_search) ORDER BY id"
+        )).scalars().all()
+        for i in range(0, len(missing), batch):
+            rows = conn.execute(
+                Analysis.__table__.select().where(Analysis.id.in_(missing[i:i + batch]))
+            ).mappings()
+            for r in rows:
+                _insert(conn, dialect, r["id"], r["project_id"], r["analysis_type"], r["result_json"] or {})
+                done += 1
+    return done
+
+
+# --- queries ---
+
+_TERM = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def fts5_query(q: str) -> str:
+    """
+    User text -> FTS5 query: every word is a quoted term (all must match), a
+    trailing * keeps prefix search, and "quoted phrases" stay phrases. FTS5
+    operators and column filters in the input are treated as plain words.
+    """
+    parts = []
+    for i, chunk in enumerate(q.split('"')):
+        words = _TERM.findall(chunk)
+        if i % 2 and words:  # inside quotes
+            parts.append('"' + " ".join(w.rstrip("*") for w in words) + '"')
+            continue
+        for w in words:
+            parts.append(f'"{w[:-1]}"*' if w.endswith("*") else f'"{w}"')
+    return " ".join(parts)
+
+
+def search(db, q: str, project_id=None, kind=None, page: int = 1, per_page: int = 20):
+    """(total, hits) for `q`, best match first. Each hit has id, score and snippet."""
+    dialect = _dialect(db.get_bind())
+    if dialect is None:
+        raise SearchUnavailable("Full-text search needs SQLite with FTS5 or PostgreSQL")
+    params = {"project_id": project_id, "kind": kind, "limit": per_page, "offset": (page - 1) * per_page}
+    filters = ""
+    if project_id is not None:
+        filters += " AND s.project_id = :project_id"
+    if kind:
+        filters += " AND s.analysis_type = :kind"
+
+    if dialect == "sqlite":
+        params["q"] = fts5_query(q)
+        if not params["q"]:
+            return 0, []
+        where = f"analysis_search MATCH :q{filters}"
+        total = db.execute(text(f"SELECT count(*) FROM analysis_search s WHERE {where}"), params).scalar()
+        sql = (
+            f"SELECT s.rowid AS id, -bm25(analysis_search, {_SQLITE_WEIGHTS}) AS score, "
+            f"snippet(analysis_search, -1, '{MARK[0]}', '{MARK[1]}', '…', {SNIPPET_TOKENS}) AS snippet "
+            f"FROM analysis_search s WHERE {where} ORDER BY score DESC, s.rowid DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["q"] = q
+        src = "analysis_search s, websearch_to_tsquery('english', :q) query"
+        where = f"s.document @@ query{filters}"
+        total = db.execute(text(f"SELECT count(*) FROM {src} WHERE {where}"), params).scalar()
+        sql = (
+            "SELECT s.analysis_id AS id, ts_rank(s.document, query) AS score, "
+            "ts_headline('english', concat_ws(' … ', s.summary, s.risks, s.recommendations, s.tests), query, "
+            f"'StartSel={MARK[0]}, StopSel={MARK[1]}, MaxWords={SNIPPET_TOKENS * 2}, MinWords={SNIPPET_TOKENS // 2}') "
+            f"AS snippet FROM {src} WHERE {where} ORDER BY score DESC, s.analysis_id DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+    hits = [dict(r) for r in db.execute(text(sql), params).mappings()]
+    return total, hits
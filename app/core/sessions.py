@@ -0,0 +1,286 @@
+# app/core/sessions.py
+"""
+Stateful analysis sessions.
+
+A session keeps, on the server, the inputs of each analysis kind run so far
+and a compacted conversation: one short digest per turn (summary plus
+recommendation, capped at SESSION_DIGEST_CHARS) for the last
+SESSION_HISTORY_TURNS turns. A follow-up turn sends only a delta (changed
+fields). It is merged over the session's last input of that kind, and fields
+shared between kinds (constraints, quality goals, non-functionals) carry over.
+The digests go to the LLM as context in place of the full earlier results a
+stateless client would have to paste back in.
+
+A Gemini ChatSession would re-send (and bill) the whole verbatim history on
+every call, so the compacted history is kept here instead and applies to the
+fake backend too.
+
+Token figures are estimates (~4 chars per token, as for prompt stats):
+prompt_tokens is what the turn actually sent; stateless_tokens is the same
+calls carrying the full earlier results instead of the digests.
+
+The store is per process, like the response cache: run sessions on a single
+worker or with sticky routing. Idle sessions expire after SESSION_TTL_S; the
+least recently used are evicted past SESSION_MAX entries or SESSION_MAX_BYTES
+of retained state.
+"""
+import datetime as dt
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+SHARED_FIELDS = ("constraints", "quality_goals", "non_functionals")
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+class SessionBusy(Exception):
+    pass
+
+
+def _digest(turn: int, kind: str, payload: dict, limit: int) -> str:
+    rec = payload.get("recommendation")
+    if isinstance(rec, dict):
+        rec = "; ".join(f"{k}: {v}" for k, v in rec.items() if v)
+    parts = [payload.get("summary") or "", f"Recommendation: {rec}" if rec else ""]
+    if payload.get("risks"):
+        parts.append(f"{len(payload['risks'])} risks")
+    if payload.get("cases"):
+        parts.append(f"{len(payload['cases'])} test cases")
+    text = " ".join(p for p in parts if p)
+    if len(text) > limit:
+        text = text[: limit - 1].rstrip() + "…"
+    return f"[turn {turn}, {kind}] {text}"
+
+
+class Conversation:
+    """Per-turn LLM context; app.core.llm._gemini calls wrap() and sent() for every call."""
+
+    def __init__(self, digests: list[str], full_chars: int):
+        self.context = "\n".join(digests)
+        self.full_chars = full_chars  # earlier results, verbatim
+        self.chars = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def wrap(self, user: str) -> str:
+        if not self.context:
+            return user
+        return f"{user}\n\nEarlier in this session (most recent last):\n{self.context}"
+
+    def sent(self, chars: int):
+        with self._lock:  # shard / chunk threads share one Conversation
+            self.chars += chars
+            self.calls += 1
+
+    def usage(self) -> dict:
+        prompt = self.chars // 4
+        stateless = (self.chars + self.calls * (self.full_chars - len(self.context))) // 4
+        return {
+            "llm_calls": self.calls,
+            "prompt_tokens": prompt,
+            "stateless_tokens": max(stateless, prompt),
+            "saved_tokens": max(stateless - prompt, 0),
+        }
+
+
+class Session:
+    def __init__(self, tenant: str):
+        self.id = secrets.token_urlsafe(16)
+        self.tenant = tenant
+        self.created_at = dt.datetime.now(dt.UTC).isoformat()
+        self.last_used = time.monotonic()
+        self.inputs: dict[str, dict] = {}   # kind -> last full input
+        self.digests: list[str] = []
+        self.result_chars: list[int] = []   # len of each digested result, for stateless estimates
+        self.turns = 0
+        self.totals = {"prompt_tokens": 0, "stateless_tokens": 0, "saved_tokens": 0,
+                       "request_bytes": 0, "full_request_bytes": 0}
+        self.lock = threading.Lock()
+        self.size = 0
+        self._resize()
+
+    def request_for(self, kind: str, delta: dict) -> dict:
+        """The full input for a turn: last input of `kind`, shared fields, then the delta."""
+        base = dict(self.inputs.get(kind) or {})
+        for field in SHARED_FIELDS:
+            if field in base:
+                continue
+            for other in reversed(list(self.inputs.values())):
+                if field in other:
+                    base[field] = other[field]
+                    break
+        base.update(delta)
+        return base
+
+    def conversation(self) -> Conversation:
+        return Conversation(self.digests, sum(self.result_chars))
+
+    def add_turn(self, kind: str, full_input: dict, payload: dict, result_json_len: int,
+                 usage: dict, request_bytes: int, max_turns: int, digest_chars: int):
+        self.turns += 1
+        self.inputs.pop(kind, None)
+        self.inputs[kind] = full_input  # most recently used kind last
+        self.digests.append(_digest(self.turns, kind, payload, digest_chars))
+        self.result_chars.append(result_json_len)
+        del self.digests[:-max_turns], self.result_chars[:-max_turns]
+        for k in ("prompt_tokens", "stateless_tokens", "saved_tokens"):
+            self.totals[k] += usage[k]
+        self.totals["request_bytes"] += request_bytes
+        self.totals["full_request_bytes"] += len(json.dumps(full_input))
+        self._resize()
+
+    def _resize(self):
+        # retained state only; the per-object overhead is a rough constant
+        self.size = 1024 + sum(len(d) for d in self.digests) + sum(
+            len(json.dumps(v)) for v in self.inputs.values()
+        )
+
+    def info(self) -> dict:
+        return {
+            "session_id": self.id,
+            "created_at": self.created_at,
+            "turns": self.turns,
+            "inputs": self.inputs,
+            "history": self.digests,
+            "totals": self.totals,
+        }
+
+
+class SessionStore:
+    """Thread-safe LRU of sessions with an idle TTL, an entry cap and a byte cap."""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0, max_bytes: int = 64 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, Session] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = {"ttl": 0, "lru": 0, "memory": 0}
+
+    def create(self, tenant: str) -> Session:
+        s = Session(tenant)
+        with self._lock:
+            self._data[s.id] = s
+            self._bytes += s.size
+            self._evict(keep=s.id)
+        return s
+
+    def get(self, session_id: str, tenant: str) -> Session:
+        now = time.monotonic()
+        with self._lock:
+            s = self._data.get(session_id)
+            if s is not None and now - s.last_used > self.ttl:
+                self._drop(session_id)
+                self.evictions["ttl"] += 1
+                s = None
+            if s is None or s.tenant != tenant:
+                raise SessionNotFound(session_id)
+            s.last_used = now
+            self._data.move_to_end(session_id)
+            return s
+
+    def resized(self, s: Session, old_size: int):
+        """Account for a session whose state changed; may evict others."""
+        with self._lock:
+            if s.id in self._data:
+                self._bytes += s.size - old_size
+                self._evict(keep=s.id)
+
+    def delete(self, session_id: str, tenant: str):
+        with self._lock:
+            s = self._data.get(session_id)
+            if s is None or s.tenant != tenant:
+                raise SessionNotFound(session_id)
+            self._drop(session_id)
+
+    def _drop(self, session_id: str):
+        self._bytes -= self._data.pop(session_id).size
+
+    def _evict(self, keep=None):
+        now = time.monotonic()
+        for sid in [sid for sid, s in self._data.items() if now - s.last_used > self.ttl]:
+            self._drop(sid)
+            self.evictions["ttl"] += 1
+        while len(self._data) > self.max_sessions or self._bytes > self.max_bytes:
+            sid = next(iter(self._data))
+            if sid == keep:
+                if len(self._data) == 1:
+                    break  # a lone oversized session stays; it is capped by SESSION_HISTORY_TURNS
+                self._data.move_to_end(sid)
+                sid = next(iter(self._data))
+            reason = "lru" if len(self._data) > self.max_sessions else "memory"
+            self._drop(sid)
+            self.evictions[reason] += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._data),
+            "bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "evictions": dict(self.evictions),
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore(
+                    _env_int("SESSION_MAX", 1000),
+                    float(os.getenv("SESSION_TTL_S", "1800")),
+                    _env_int("SESSION_MAX_BYTES", 64 * 1024 * 1024),
+                )
+    return _store
+
+
+def run_turn(session: Session, kind: str, delta: dict, request_bytes: int, tenant):
+    """
+    Run one turn. Returns (response model, usage dict). Raises pydantic
+    ValidationError for an incomplete input and TenantLimited like any analysis.
+    """
+    from app.core import llm
+    from app.core.analyses import REQUESTS, _call_llm, canonical_input
+
+    if not session.lock.acquire(blocking=False):
+        raise SessionBusy(session.id)
+    try:
+        req = REQUESTS[kind].model_validate(session.request_for(kind, delta))
+        conv = session.conversation()
+        token = llm._conversation.set(conv)
+        try:
+            model = _call_llm(kind, req, tenant)  # no shared cache: the answer depends on the session
+        finally:
+            llm._conversation.reset(token)
+        usage = conv.usage()
+        usage["request_bytes"] = request_bytes
+        usage["full_request_bytes"] = len(json.dumps(canonical_input(req)))
+        old = session.size
+        session.add_turn(
+            kind, canonical_input(req), model.model_dump(mode="json"), len(model.model_dump_json()),
+            usage, request_bytes,
+            max_turns=_env_int("SESSION_HISTORY_TURNS", 6),
+            digest_chars=_env_int("SESSION_DIGEST_CHARS", 600),
+        )
+        get_store().resized(session, old)
+        return model, usage
+    finally:
+        session.lock.release()
+
@@ -0,0 +1,253 @@
+# app/core/tenants.py
+"""
+Multi-tenant API keys.
+
+TENANTS_FILE points at a JSON file mapping API keys to tenants:
+
+    {"tenants": [
+        {"name": "acme", "api_key": "k-123", "project": "acme",
+         "rpm": 120, "max_concurrency": 4, "cache_entries": 512, "cache_ttl_s": 3600},
+        {"name": "globex", "api_key_sha256": "<hex digest>", "project": "globex"},
+        {"name": "nightly-ci", "api_key": "k-456", "lane": "batch"}
+    ]}
+
+The file is loaded once into an in-memory key -> Tenant map. Its mtime is
+checked at most every TENANTS_REFRESH_S seconds (not per request), and the
+map is swapped atomically when it changes. A file that can't be read or
+parsed is logged and the last good map stays in service. Runtime state (cache, rate
+limiter, concurrency slots) survives reloads for tenants that keep their name.
+
+Each tenant owns its response cache, an rpm token bucket and a bounded number
+of concurrent LLM calls, so one heavy tenant can't evict another's cached
+analyses or take all Gemini concurrency. "lane" puts the tenant's LLM calls
+in an admission lane (app/core/admission.py); it defaults to the first lane. Requests authenticated with the
+legacy global API_KEY (or with auth disabled) map to the "default" tenant.
+
+A tenant only sees its own project (named after it unless "project" says
+otherwise) under /api/v1/projects and /api/v1/search. Once TENANTS_FILE is
+set, tenants with "project": null and "default" get the cross-tenant view
+only with X-Admin-Key (ADMIN_API_KEY), like the admin routes; otherwise those
+endpoints answer 403.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from app.core.cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+
+
+class TenantLimited(Exception):
+    """Quota or concurrency limit hit; carries a Retry-After hint in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rpm: int):
+        self.rate = rpm / 60.0
+        self.capacity = float(rpm)
+        self.tokens = float(rpm)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """0 if a token was taken, otherwise seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class Tenant:
+    __slots__ = ("name", "project", "project_id", "rpm", "max_concurrency", "lane",
+                 "cache", "bucket", "slots", "in_flight", "throttled", "_lock")
+
+    def __init__(self, name, project=None, rpm=0, max_concurrency=0, cache_entries=256, cache_ttl_s=3600,
+                 lane=None):
+        self.name = name
+        self.lane = lane
+        self.project = project          # project name; resolved to project_id when DB is on
+        self.project_id = None
+        self.rpm = int(rpm or 0)
+        self.max_concurrency = int(max_concurrency or 0)
+        self.cache = TTLCache(int(cache_entries), float(cache_ttl_s))
+        self.bucket = TokenBucket(self.rpm) if self.rpm > 0 else None
+        self.slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()  # counters; gthread workers update them concurrently
+
+    def check_quota(self):
+        if self.bucket is None:
+            return
+        wait = self.bucket.take()
+        if wait:
+            with self._lock:
+                self.throttled += 1
+            raise TenantLimited(f"Rate limit of {self.rpm}/min exceeded", int(wait) + 1)
+
+    def acquire(self, timeout: float):
+        if self.slots is not None and not self.slots.acquire(timeout=timeout):
+            with self._lock:
+                self.throttled += 1
+            raise TenantLimited(f"Too many concurrent requests (max {self.max_concurrency})", 1)
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self.slots is not None:
+            self.slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "project": self.project,
+            "project_id": self.project_id,
+            "rpm": self.rpm,
+            "max_concurrency": self.max_concurrency,
+            "lane": self.lane,
+            "in_flight": self.in_flight,
+            "throttled": self.throttled,
+            "cache": self.cache.stats(),
+        }
+
+
+def _digest(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class TenantRegistry:
+    def __init__(self, path: str | None):
+        self.path = path
+        self.refresh_s = float(os.getenv("TENANTS_REFRESH_S", "5"))
+        self.default = Tenant(
+            DEFAULT_TENANT,
+            rpm=int(os.getenv("DEFAULT_TENANT_RPM", "0")),
+            max_concurrency=int(os.getenv("DEFAULT_TENANT_CONCURRENCY", "0")),
+            cache_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "256")),
+            cache_ttl_s=float(os.getenv("RESPONSE_CACHE_TTL_S", "3600")),
+        )
+        self._by_digest = {}   # sha256(api key) -> Tenant
+        self._by_name = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._reload()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.path)
+
+    def _reload(self):
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return  # keep serving the last good map
+        if mtime == self._mtime:
+            return
+        try:
+            by_digest, by_name = self._build()
+        except (OSError, ValueError, KeyError) as e:
+            # a half-written or broken file: keep serving the last good map
+            log.error("Ignoring TENANTS_FILE %s: %r", self.path, e)
+            return
+        # swap whole dicts: readers never see a half-built map
+        self._by_digest, self._by_name, self._mtime = by_digest, by_name, mtime
+
+    def _build(self):
+        with open(self.path, encoding="utf-8") as f:
+            spec = json.load(f)
+        by_digest, by_name = {}, {}
+        for t in spec.get("tenants", []):
+            name = t["name"]
+            tenant = self._by_name.get(name)
+            if tenant is None or _limits_changed(tenant, t):
+                tenant = Tenant(
+                    name, t.get("project", name), t.get("rpm", 0), t.get("max_concurrency", 0),
+                    t.get("cache_entries", 256), t.get("cache_ttl_s", 3600), t.get("lane"),
+                )
+            digest = t.get("api_key_sha256") or _digest(t["api_key"])
+            by_digest[digest.lower()] = tenant
+            by_name[name] = tenant
+        return by_digest, by_name
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.refresh_s:
+            return
+        with self._lock:
+            if now - self._checked >= self.refresh_s:
+                self._checked = now
+                self._reload()
+
+    def lookup(self, api_key: str | None):
+        if not api_key or not self.path:
+            return None
+        self._maybe_refresh()
+        # keys are matched by sha256 digest, so raw keys never sit in the map
+        return self._by_digest.get(_digest(api_key))
+
+    def all(self) -> list:
+        return [self.default, *self._by_name.values()]
+
+
+def _limits_changed(tenant: Tenant, spec: dict) -> bool:
+    return (
+        tenant.rpm != int(spec.get("rpm", 0) or 0)
+        or tenant.max_concurrency != int(spec.get("max_concurrency", 0) or 0)
+        or tenant.cache.maxsize != int(spec.get("cache_entries", 256))
+        or tenant.project != spec.get("project", tenant.name)
+        or tenant.lane != spec.get("lane")
+    )
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TenantRegistry:
+    global _registry
+    path = os.getenv("TENANTS_FILE") or None
+    if _registry is None or _registry.path != path:
+        with _registry_lock:
+            if _registry is None or _registry.path != path:
+                _registry = TenantRegistry(path)
+    return _registry
+
+
+def project_id_for(tenant: Tenant, db) -> int | None:
+    """Resolve (get-or-create) the tenant's project row once and remember its id."""
+    if tenant is None or not tenant.project:
+        return None
+    if tenant.project_id is None:
+        from sqlalchemy.exc import IntegrityError
+        from app.models import Project
+
+        project = db.query(Project).filter(Project.name == tenant.project).one_or_none()
+        if project is None:
+            try:
+                project = Project(name=tenant.project)
+                db.add(project)
+                db.commit()
+            except IntegrityError:
+                # another worker created it first (Project.name is unique): use theirs
+                db.rollback()
+                project = db.query(Project).filter(Project.name == tenant.project).one()
+        tenant.project_id = project.id
+    return tenant.project_id
@@ -0,0 +1,372 @@
+# app/core/tracing.py
+"""
+Lightweight OpenTelemetry-compatible tracing (no SDK dependency).
+
+Spans cover the Flask request (SERVER), request validation, every _gemini
+attempt (CLIENT; tenacity retries show up as separate attempts plus a "retry"
+event on the parent), JSON extraction and DB log writes. Context lives in a
+contextvar, so use `bind(fn)` when handing work to a thread pool.
+
+Propagation follows W3C Trace Context: an incoming `traceparent` continues the
+caller's trace; otherwise the trace is rooted at X-Trace-Id (a UUID maps 1:1 to
+the 32-hex trace id, so logs and spans line up). Responses carry
+`traceresponse` with the server span.
+
+Finished spans go to a background batching exporter, picked by TRACE_EXPORTER:
+
+    none    (default) tracing hooks are not installed at all
+    file    append OTLP-JSON export requests, one per line, to TRACE_FILE
+    otlp    POST OTLP-JSON to TRACE_OTLP_ENDPOINT (a collector, or
+            `python -m app.trace_collector` locally)
+    memory  keep the last spans in process (tests, debugging)
+
+TRACE_SAMPLE_RATIO (0..1) samples new root traces; a sampled parent is always honoured.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "sdlc-backend")
+
+# OTLP span kinds / status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "events", "status", "status_message")
+
+    def __init__(self, name, trace_id, parent_id=None, kind=KIND_INTERNAL, sampled=True, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def event(self, name, **attributes):
+        self.events.append((time.time_ns(), name, attributes))
+
+    def fail(self, exc):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+        self.event("exception", **{"exception.type": type(exc).__name__, "exception.message": str(exc)[:500]})
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled:
+                _exporter().add(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def enabled() -> bool:
+    return os.getenv("TRACE_EXPORTER", "none").lower() != "none"
+
+
+def current():
+    return _current.get()
+
+
+def parse_traceparent(value):
+    """(trace_id, parent span id, sampled) or None for a missing/invalid header."""
+    parts = (value or "").strip().lower().split("-")
+    if len(parts) != 4 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(int(parts[3], 16) & 1)
+
+
+def trace_id_for(external_id: str) -> str:
+    """32-hex trace id for an X-Trace-Id: the UUID itself, or a hash of anything else."""
+    try:
+        return uuid.UUID(external_id).hex
+    except ValueError:
+        return hashlib.sha256(external_id.encode("utf-8")).hexdigest()[:32]
+
+
+def _sample() -> bool:
+    return random.random() < float(os.getenv("TRACE_SAMPLE_RATIO", "1"))
+
+
+def start_span(name, kind=KIND_INTERNAL, trace_id=None, parent_id=None, sampled=None, **attributes):
+    """Start a span under the current one (or a new root) and make it current. Returns (span, token)."""
+    parent = _current.get()
+    if trace_id is None:
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id = uuid.uuid4().hex
+    if sampled is None:
+        sampled = _sample()
+    span = Span(name, trace_id, parent_id, kind, sampled, attributes)
+    return span, _current.set(span)
+
+
+def finish_span(span, token, exc=None):
+    if exc is not None:
+        span.fail(exc)
+    span.end()
+    try:
+        _current.reset(token)
+    except (TypeError, ValueError):  # token from another context; just clear it
+        _current.set(None)
+
+
+@contextmanager
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """Child span of the current one; a no-op when tracing is off."""
+    if not enabled():
+        yield None
+        return
+    s, token = start_span(name, kind, **attributes)
+    try:
+        yield s
+    except BaseException as e:
+        finish_span(s, token, e)
+        raise
+    finish_span(s, token)
+
+
+def bind(fn):
+    """Run fn in a copy of the caller's context (pool threads don't inherit contextvars)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def retry_event(retry_state):
+    """tenacity before_sleep hook: note the failed attempt on the current span."""
+    s = _current.get()
+    if s is not None:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        s.event("retry", **{
+            "retry.attempt": retry_state.attempt_number,
+            "retry.function": getattr(retry_state.fn, "__name__", ""),
+            "exception.message": str(exc)[:500] if exc else "",
+        })
+
+
+# --- OTLP-JSON encoding ---
+
+def _value(v) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _attrs(d: dict) -> list:
+    return [{"key": k, "value": _value(v)} for k, v in d.items() if v is not None]
+
+
+def span_to_otlp(s: Span) -> dict:
+    out = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": _attrs(s.attributes),
+        "events": [
+            {"timeUnixNano": str(t), "name": n, "attributes": _attrs(a)} for t, n, a in s.events
+        ],
+        "status": {"code": s.status, **({"message": s.status_message} if s.status_message else {})},
+    }
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+def export_request(spans) -> dict:
+    """An OTLP ExportTraceServiceRequest (JSON mapping) for a batch of spans."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attrs({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": [span_to_otlp(s) for s in spans]}],
+        }]
+    }
+
+
+# --- batching exporter ---
+
+class BatchExporter:
+    """
+    Buffers finished spans and flushes them from a daemon thread every
+    TRACE_EXPORT_INTERVAL_S or as soon as TRACE_BATCH_SIZE are queued. The
+    queue is bounded (TRACE_MAX_QUEUE); when full, new spans are dropped and
+    counted rather than blocking requests.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self.batch_size = int(os.getenv("TRACE_BATCH_SIZE", "256"))
+        self.interval = float(os.getenv("TRACE_EXPORT_INTERVAL_S", "2"))
+        self.file = os.getenv("TRACE_FILE", "traces.otlp.jsonl")
+        self.endpoint = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+        self.queue = deque()
+        self.max_queue = int(os.getenv("TRACE_MAX_QUEUE", "8192"))
+        self.memory = deque(maxlen=int(os.getenv("TRACE_MEMORY_SPANS", "2048")))
+        self.dropped = 0
+        self.exported = 0
+        self.failed = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    def add(self, s: Span):
+        if self.target == "memory":
+            self.memory.append(s)
+            return
+        self._ensure_thread()
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.append(s)
+        if len(self.queue) >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        # (re)start after fork: threads don't survive it, the queue object does
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.queue.clear()
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        while self.queue:
+            batch = []
+            while self.queue and len(batch) < self.batch_size:
+                batch.append(self.queue.popleft())
+            try:
+                self._write(export_request(batch))
+                self.exported += len(batch)
+            except Exception:
+                self.failed += len(batch)
+
+    def _write(self, payload: dict):
+        data = json.dumps(payload, separators=(",", ":"))
+        if self.target == "file":
+            with self._lock, open(self.file, "a", encoding="utf-8") as f:
+                f.write(data + "\n")
+        elif self.target == "otlp":
+            import urllib.request
+            req = urllib.request.Request(
+                self.endpoint, data=data.encode("utf-8"), method="POST",
+                headers={"Content-Type": "application/json"},
+            )
+            urllib.request.urlopen(req, timeout=5).close()
+
+    def stats(self) -> dict:
+        return {
+            "target": self.target,
+            "queued": len(self.queue),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_exporter_instance = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter() -> BatchExporter:
+    global _exporter_instance
+    target = os.getenv("TRACE_EXPORTER", "none").lower()
+    if _exporter_instance is None or _exporter_instance.target != target:
+        with _exporter_lock:
+            if _exporter_instance is None or _exporter_instance.target != target:
+                _exporter_instance = BatchExporter(target)
+    return _exporter_instance
+
+
+def memory_spans(trace_id=None) -> list:
+    spans = list(_exporter().memory)
+    return [s for s in spans if trace_id is None or s.trace_id == trace_id]
+
+
+# --- Flask wiring ---
+
+def init_tracing(app):
+    """Install request hooks; must run before any other before_request hook."""
+    import atexit
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        external = request.headers.get("X-Trace-Id")
+        parent = parse_traceparent(request.headers.get("traceparent"))
+        if parent is not None:
+            trace_id, parent_id, sampled = parent  # the caller already made the sampling decision
+        else:
+            trace_id = trace_id_for(external) if external else uuid.uuid4().hex
+            parent_id, sampled = None, None
+        # X-Trace-Id keeps being what logs are keyed by; without one, it's the trace id as a UUID
+        g.trace_id = external or str(uuid.UUID(trace_id))
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        s, token = start_span(
+            f"{request.method} {rule}", KIND_SERVER, trace_id=trace_id, parent_id=parent_id,
+            sampled=sampled,
+            **{"http.request.method": request.method, "http.route": rule, "url.path": request.path,
+               "app.trace_id": g.trace_id, "client.address": request.remote_addr},
+        )
+        g._span, g._span_token = s, token
+
+    @app.after_request
+    def _tag_response(resp):
+        s = g.get("_span")
+        if s is not None:
+            s.set("http.response.status_code", resp.status_code)
+            if resp.status_code >= 500:
+                s.status = STATUS_ERROR
+            resp.headers["traceresponse"] = s.traceparent
+        return resp
+
+    @app.teardown_request
+    def _end_request_span(exc):
+        s = g.pop("_span", None)
+        if s is not None:
+            finish_span(s, g.pop("_span_token", None), exc)
+
+    atexit.register(lambda: _exporter().flush())
@@ -0,0 +1,33 @@
+# app/core/tradeoff_rank.py
+"""
+Deterministic ranking for N-way trade-offs, over an options x criteria score
+matrix (NumPy), so the LLM only scores cells and never compares options:
+
+    weighted, order, pareto = rank_options(scores, weights)
+
+Unscored cells are 0 and count as the worst possible score.
+"""
+import numpy as np
+
+
+def normalised_weights(criteria, weights: dict) -> np.ndarray:
+    """Per-criterion weights (default 1, negatives clipped to 0), summing to 1."""
+    w = np.array([max(float(weights.get(c, 1.0)), 0.0) for c in criteria], dtype=np.float64)
+    total = w.sum()
+    return w / total if total > 0 else np.full(len(criteria), 1.0 / len(criteria))
+
+
+def pareto_front(scores: np.ndarray) -> np.ndarray:
+    """Boolean mask of options no other option beats-or-ties on every criterion (and beats on one)."""
+    ge = (scores[:, None, :] >= scores[None, :, :]).all(axis=2)  # ge[j, i]: j >= i everywhere
+    gt = (scores[:, None, :] > scores[None, :, :]).any(axis=2)   # gt[j, i]: j > i somewhere
+    return ~(ge & gt).any(axis=0)
+
+
+def rank_options(scores: np.ndarray, w: np.ndarray):
+    """(weighted score per option, option indices best-first, pareto mask)."""
+    weighted = scores @ w
+    pareto = pareto_front(scores)
+    # best weighted score first; ties broken by Pareto membership, then input order
+    order = np.lexsort((np.arange(len(weighted)), ~pareto, -weighted))
+    return weighted, order, pareto
@@ -1,21 +1,93 @@
 # app/db.py
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sdlc.db")
 
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# --- Engine profiles ---
+# DB_PROFILE=auto (default) picks the profile from the URL scheme:
+#   sqlite   -> WAL journal, synchronous=NORMAL, busy_timeout, mmap; no pre-ping
+#   postgres -> sized QueuePool with recycle, fast executemany; pre-ping opt-in
+# DB_PROFILE=default keeps plain SQLAlchemy defaults (the old behaviour).
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def _profile_for(url: str, profile: str | None = None) -> str:
+    profile = (profile or os.getenv("DB_PROFILE", "auto")).lower()
+    if profile != "auto":
+        return profile
+    if url.startswith("sqlite"):
+        return "sqlite"
+    if url.startswith(("postgresql", "postgres")):
+        return "postgres"
+    return "default"
+
+
+def _sqlite_pragmas():
+    return {
+        "journal_mode": "WAL",
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 64 * 1024 * 1024),
+    }
+
+
+def _install_sqlite_pragmas(engine, in_memory: bool):
+    pragmas = _sqlite_pragmas()
+    if in_memory:
+        # WAL needs a real file; an in-memory db silently stays in "memory" mode
+        pragmas.pop("journal_mode")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for key, value in pragmas.items():
+                cur.execute(f"PRAGMA {key}={value}")
+        finally:
+            cur.close()
 
-engine = create_engine(
-    DATABASE_URL,
-    future=True,
-    echo=False,
-    pool_pre_ping=True,
-    connect_args=connect_args
-)
+
+def _engine_kwargs(url: str, profile: str) -> dict:
+    kwargs = {"future": True, "echo": False}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    if profile == "sqlite":
+        # The pragma busy_timeout covers lock waits; the local file never goes stale.
+        kwargs["pool_pre_ping"] = False
+    elif profile == "postgres":
+        kwargs.update(
+            pool_size=_env_int("DB_POOL_SIZE", 10),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", 20),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", 10),
+            # recycle handles idle server-side timeouts; pre-ping costs a round trip per checkout
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+        )
+        if "+psycopg2" in url or url.split(":", 1)[0] in ("postgresql", "postgres"):
+            # psycopg2 batches INSERT..VALUES pages instead of one round trip per row
+            kwargs["executemany_mode"] = "values_plus_batch"
+        # psycopg 3 ("+psycopg") uses SQLAlchemy's insertmanyvalues fast path by default
+    else:
+        kwargs["pool_pre_ping"] = True
+    return kwargs
+
+
+def make_engine(url: str | None = None, profile: str | None = None):
+    url = url or DATABASE_URL
+    profile = _profile_for(url, profile)
+    engine = create_engine(url, **_engine_kwargs(url, profile))
+    if profile == "sqlite" and url.startswith("sqlite"):
+        in_memory = url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+        _install_sqlite_pragmas(engine, in_memory)
+    return engine
+
+
+engine = make_engine(DATABASE_URL)
 
 SessionLocal = scoped_session(
     sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, future=True)
@@ -23,7 +95,20 @@ SessionLocal = scoped_session(
 
 Base = declarative_base()
 
+
+def configure_engine(url: str | None = None, profile: str | None = None):
+    """Rebuild the engine (e.g. for tests or a different DATABASE_URL) and rebind sessions."""
+    global engine
+    SessionLocal.remove()
+    engine.dispose()
+    engine = make_engine(url, profile)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
 def init_db():
     # import models so they register with Base.metadata
     from app import models  # noqa: F401
     Base.metadata.create_all(bind=engine)
+    from app.core import search
+    search.ensure_index(engine)
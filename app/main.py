@@ -1,4 +1,5 @@
 # app/main.py
+# Dev server only. In production run `python -m app.serve` (gunicorn presets).
 import os
 from app import create_app
 
@@ -1,43 +1,89 @@
 # app/middleware.py
 import json
+import os
 import time
 import uuid
 import traceback
 from flask import request, g
 from app.db import SessionLocal
 from app.models import RequestLog, ResponseLog, ErrorLog
+from app.core import tracing
+from app.core.tenants import project_id_for
+
+# only JSON bodies up to this size are buffered for the log; larger, chunked or raw
+# (non-JSON) bodies are recorded as a placeholder
+LOG_BODY_MAX_BYTES = int(os.getenv("LOG_BODY_MAX_BYTES", str(64 * 1024)))
+
+
+# credentials are never written to the request log (admins read it back via /admin/trace)
+REDACTED_HEADERS = {"x-api-key", "x-admin-key", "authorization", "proxy-authorization", "cookie"}
+
+
+def _logged_headers() -> str:
+    return json.dumps({
+        k: ("<redacted>" if k.lower() in REDACTED_HEADERS else v) for k, v in request.headers.items()
+    })
+
+
+def _logged_body() -> str:
+    size = request.content_length
+    if size is None:
+        chunked = "chunked" in request.headers.get("Transfer-Encoding", "").lower()
+        return "<streamed body, not logged>" if chunked else ""
+    if size > LOG_BODY_MAX_BYTES or not request.is_json:
+        # raw uploads are left unread so the handler can stream them
+        return f"<{size} bytes {request.mimetype or 'body'}, not logged>" if size else ""
+    return request.get_data(as_text=True) or ""
+
+
+def _logged_response_body(response) -> str:
+    # streamed responses (exports) would be drained into memory by get_data()
+    if response.is_streamed or response.direct_passthrough:
+        return "<streamed>"
+    return response.get_data(as_text=True) or ""
+
 
 def register_request_response_logging(app):
+    from app.core import logstore
+
+    if logstore.enabled():
+        return _register_segment_logging(app, logstore.get_store)
+
     @app.before_request
     def _start_request_logging():
         g._t0 = time.perf_counter()
         g._db = SessionLocal()
 
-        # honor incoming trace or generate one
-        g.trace_id = request.headers.get("X-Trace-Id") or str(uuid.uuid4())
+        # honor incoming trace (already resolved when tracing is on) or generate one
+        g.trace_id = g.get("trace_id") or request.headers.get("X-Trace-Id") or str(uuid.uuid4())
 
         try:
-            headers = {k: v for k, v in request.headers.items()}
-            body = request.get_data(as_text=True) or ""
+            body = _logged_body()
             req_row = RequestLog(
                 route=request.path,
                 method=request.method,
-                headers_json=json.dumps(headers),
+                headers_json=_logged_headers(),
                 body_json=body,
                 trace_id=g.trace_id,
+                # logs are partitioned by the tenant's project (None for the default tenant)
+                project_id=project_id_for(g.get("tenant"), g._db),
             )
-            g._db.add(req_row)
-            g._db.flush()  # get req_row.id
+            # commit now (not at the end of the request) so SQLite's write lock is
+            # not held for the whole LLM call while other requests wait on it
+            with tracing.span("db.insert", **{"db.sql.table": "request_logs"}):
+                g._db.add(req_row)
+                g._db.commit()
             g._request_row_id = req_row.id
         except Exception:
             # do not break the request if logging fails
+            g._db.rollback()
             g._request_row_id = None
 
     @app.after_request
     def _finish_request_logging(response):
         try:
             latency_ms = int((time.perf_counter() - g._t0) * 1000)
-            body = response.get_data(as_text=True) or ""
+            body = _logged_response_body(response)
             resp_row = ResponseLog(
                 status_code=response.status_code,
                 body_json=body,
@@ -45,8 +91,9 @@ def register_request_response_logging(app):
                 trace_id=g.trace_id,
                 request_id=g.get("_request_row_id"),
             )
-            g._db.add(resp_row)
-            g._db.commit()
+            with tracing.span("db.insert", **{"db.sql.table": "response_logs"}):
+                g._db.add(resp_row)
+                g._db.commit()
         except Exception:
             g._db.rollback()
         finally:
@@ -79,3 +126,65 @@ def register_request_response_logging(app):
                     db.close()
                 finally:
                     SessionLocal.remove()
+
+
+def _project_id(tenant):
+    if tenant is None or not tenant.project:
+        return None
+    if tenant.project_id is None:
+        # resolved once per tenant and process; later requests don't touch the DB
+        with SessionLocal.session_factory() as db:
+            project_id_for(tenant, db)
+    return tenant.project_id
+
+
+def _register_segment_logging(app, get_store):
+    """LOG_BACKEND=segments: same rows as the SQL tables, appended to segment files."""
+
+    @app.before_request
+    def _start_request_logging():
+        g._t0 = time.perf_counter()
+        g.trace_id = g.get("trace_id") or request.headers.get("X-Trace-Id") or str(uuid.uuid4())
+        try:
+            with tracing.span("log.append", **{"log.table": "request"}):
+                g._request_row_id = get_store().append("request", {
+                    "route": request.path,
+                    "method": request.method,
+                    "headers_json": _logged_headers(),
+                    "body_json": _logged_body(),
+                    "trace_id": g.trace_id,
+                    "project_id": _project_id(g.get("tenant")),
+                }, g.trace_id)
+        except Exception:
+            g._request_row_id = None
+
+    @app.after_request
+    def _finish_request_logging(response):
+        try:
+            with tracing.span("log.append", **{"log.table": "response"}):
+                get_store().append("response", {
+                    "status_code": response.status_code,
+                    "body_json": _logged_response_body(response),
+                    "latency_ms": int((time.perf_counter() - g._t0) * 1000),
+                    "trace_id": g.trace_id,
+                    "request_id": g.get("_request_row_id"),
+                }, g.trace_id)
+        except Exception:
+            pass
+        response.headers["X-Trace-Id"] = g.trace_id
+        return response
+
+    @app.teardown_request
+    def _teardown_request(exc):
+        if exc is None:
+            return
+        trace_id = getattr(g, "trace_id", None)
+        try:
+            get_store().append("error", {
+                "trace_id": trace_id,
+                "where": request.endpoint or request.path,
+                "message": str(exc),
+                "stack": traceback.format_exc(),
+            }, trace_id or "")
+        except Exception:
+            pass
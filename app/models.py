@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index, func
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -42,3 +42,21 @@ class ErrorLog(Base):
     message = Column(Text, nullable=False)
     stack = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Analysis(Base):
+    """A structured run_* result. result_json holds the response model as JSON (no Markdown copy)."""
+    __tablename__ = "analyses"
+    __table_args__ = (
+        # read-through lookups: same project + type + input -> latest result
+        Index("ix_analyses_lookup", "project_id", "analysis_type", "input_hash"),
+    )
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    analysis_type = Column(String(32), index=True, nullable=False)
+    input_hash = Column(String(64), nullable=False)
+    input_json = Column(JSON, nullable=False)
+    result_json = Column(JSON, nullable=False)
+    trace_id = Column(String(64), index=True, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    project = relationship("Project", backref="analyses")
@@ -0,0 +1,174 @@
+# app/prewarm.py
+"""
+Pre-compute popular analyses off-peak so business-hours requests are served
+from stored history / the in-memory response cache instead of Gemini.
+
+    python -m app.prewarm                          # mine RequestLog, warm the top 50
+    python -m app.prewarm --top 200 --since-days 30 --min-count 3
+    python -m app.prewarm --dry-run --save-catalogue popular.json
+    python -m app.prewarm --catalogue popular.json --rpm 20 --max-minutes 60
+
+    # cron, 02:30 every night
+    30 2 * * *  cd /srv/sdlc && python -m app.prewarm --rpm 30 --max-minutes 90
+
+The catalogue is mined from POST bodies in request_logs: each body is
+validated with its endpoint's request model and grouped by the same input hash
+the read-through history uses, so whitespace/key-order variants count as one
+question. Entries already in history are skipped (unless --refresh); the rest
+go through the normal run_* functions at --rpm with --concurrency workers and
+are stored in the default project. Workers started with
+PREWARM_CACHE_ENTRIES=N load the newest N of them into memory at boot.
+
+A catalogue file is a JSON list of {"kind": "tradeoff", "input": {...}}.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _kind_for(route: str):
+    from app.core.analyses import REQUESTS
+
+    parts = route.strip("/").split("/")
+    if len(parts) == 3 and parts[:2] == ["api", "v1"] and parts[2] in REQUESTS:
+        return parts[2]
+    return None
+
+
+def mine(db, since=None, min_count=2, top=50) -> list[dict]:
+    """Most frequent valid analysis inputs in request_logs, most popular first."""
+    from app.core.analyses import REQUESTS, canonical_input, input_hash
+    from app.models import RequestLog
+
+    q = db.query(RequestLog.route, RequestLog.body_json).filter(
+        RequestLog.method == "POST", RequestLog.route.like("/api/v1/%")
+    )
+    if since is not None:
+        q = q.filter(RequestLog.created_at >= since)
+
+    counts, samples = Counter(), {}
+    for route, body in q.yield_per(500):
+        kind = _kind_for(route)
+        if kind is None or not body:
+            continue
+        try:
+            req = REQUESTS[kind].model_validate_json(body)
+        except ValueError:  # pydantic ValidationError; includes bodies logged as placeholders
+            continue
+        key = (kind, input_hash(kind, req))
+        counts[key] += 1
+        samples.setdefault(key, canonical_input(req))
+
+    return [
+        {"kind": kind, "input": samples[(kind, digest)], "count": n}
+        for (kind, digest), n in counts.most_common(top)
+        if n >= min_count
+    ]
+
+
+def _missing(app, entries, refresh: bool) -> list:
+    """(kind, request model) pairs that still need an LLM run."""
+    from app.core.analyses import REQUESTS, input_hash, lookup, resolve_project_id
+    from app.db import SessionLocal
+
+    todo = []
+    with app.app_context(), SessionLocal.session_factory() as db:
+        pid = resolve_project_id(db)
+        for e in entries:
+            req = REQUESTS[e["kind"]].model_validate(e["input"])
+            if refresh or lookup(db, pid, e["kind"], input_hash(e["kind"], req)) is None:
+                todo.append((e["kind"], req))
+    return todo
+
+
+def prewarm(app, entries, rpm=30, concurrency=2, refresh=False, max_minutes=None, log=print,
+            lane="batch") -> dict:
+    """Run every not-yet-stored entry through run_analysis, at most `rpm` LLM calls a minute."""
+    from app.core import admission
+    from app.core.analyses import run_analysis
+    from app.core.tenants import Tenant, TokenBucket
+
+    todo = _missing(app, entries, refresh)
+    stats = {"catalogue": len(entries), "stored": len(entries) - len(todo), "ran": 0, "failed": 0, "skipped": 0}
+    # own tenant: no response cache, and the default tenant's limits don't apply
+    tenant = Tenant("prewarm", cache_entries=0)
+    bucket = TokenBucket(rpm) if rpm > 0 else None
+    deadline = time.monotonic() + max_minutes * 60 if max_minutes else None
+    lock = threading.Lock()
+
+    def run(kind, req):
+        admission.set_lane(lane)  # off-peak work yields to interactive traffic
+        with app.app_context():
+            t0 = time.perf_counter()
+            try:
+                _, meta = run_analysis(kind, req, refresh=True, tenant=tenant)
+            except Exception as e:
+                with lock:
+                    stats["failed"] += 1
+                log(f"FAIL {kind}: {e}")
+                return
+            with lock:
+                stats["ran"] += 1
+            log(f"ok   {kind} #{meta['analysis_id']} in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for i, (kind, req) in enumerate(todo):
+            if deadline is not None and time.monotonic() >= deadline:
+                stats["skipped"] = len(todo) - i
+                log(f"window over; {stats['skipped']} left for the next run")
+                break
+            while bucket is not None and (wait := bucket.take()):
+                time.sleep(wait)
+            pool.submit(run, kind, req)
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.prewarm", description="Pre-compute popular analyses")
+    ap.add_argument("--catalogue", help="JSON catalogue file instead of mining request_logs")
+    ap.add_argument("--save-catalogue", help="write the catalogue used to this file")
+    ap.add_argument("--top", type=int, default=50)
+    ap.add_argument("--min-count", type=int, default=2)
+    ap.add_argument("--since-days", type=int, default=14)
+    ap.add_argument("--rpm", type=int, default=30, help="max LLM runs per minute (0 = unlimited)")
+    ap.add_argument("--concurrency", type=int, default=2)
+    ap.add_argument("--max-minutes", type=float, help="stop starting new runs after this long")
+    ap.add_argument("--refresh", action="store_true", help="re-run entries already in history")
+    ap.add_argument("--dry-run", action="store_true", help="print the catalogue and exit")
+    args = ap.parse_args(argv)
+
+    os.environ["ENABLE_DB"] = "true"  # history is where pre-computed answers live
+    from app import create_app
+    from app.db import SessionLocal
+
+    app = create_app()
+    if args.catalogue:
+        with open(args.catalogue, encoding="utf-8") as f:
+            entries = json.load(f)
+    else:
+        since = dt.datetime.now(dt.UTC) - dt.timedelta(days=args.since_days)
+        with SessionLocal.session_factory() as db:
+            entries = mine(db, since=since, min_count=args.min_count, top=args.top)
+
+    if args.save_catalogue:
+        with open(args.save_catalogue, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+    if args.dry_run:
+        for e in entries:
+            print(f"{e.get('count', '-'):>5}  {e['kind']:<10} {json.dumps(e['input'])[:100]}")
+        return 0
+
+    stats = prewarm(app, entries, rpm=args.rpm, concurrency=args.concurrency,
+                    refresh=args.refresh, max_minutes=args.max_minutes)
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
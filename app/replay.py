@@ -0,0 +1,367 @@
+# app/replay.py
+"""
+Replay captured traffic (request_logs) against a running instance and compare
+it with what production answered (response_logs).
+
+    python -m app.replay --target http://localhost:8000                 # original pacing
+    python -m app.replay --target http://staging:8000 --speed 10 --concurrency 64
+    python -m app.replay --spawn --speed 0 --route /api/v1/tradeoff/    # start a fake-LLM target
+    python -m app.replay --target ... --since 2026-10-01 --limit 5000 --json report.json
+
+Rows are streamed in id order from the database configured for this process
+(DATABASE_URL), only up to the newest id at start, so traffic produced by the
+replay itself is never replayed. Each request is sent at its original offset
+from the first one divided by --speed (0 = as fast as --concurrency allows),
+over an asyncio HTTP/1.1 client with keep-alive connections (stdlib only).
+
+The target should run with LLM_BACKEND=fake so runs are deterministic and
+free; --spawn starts one (python -m app.serve) with that set. The report
+has, per route, replay vs original latency percentiles, status mismatches and
+response *shape* diffs: LLM prose differs between the fake and Gemini, so
+bodies are compared by their JSON key paths and value types, ignoring
+trace_id / generated_at / version.
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+# not replayed: hop-by-hop, recomputed, or identity headers
+SKIP_HEADERS = {"host", "content-length", "connection", "transfer-encoding", "keep-alive",
+                "x-trace-id", "traceparent", "x-api-key", "x-admin-key", "x-profile",
+                "authorization", "proxy-authorization", "cookie"}
+VOLATILE_KEYS = {"trace_id", "generated_at", "version"}
+
+
+# --- source ---
+
+def iter_traffic(db, route=None, since=None, limit=None, upto=None):
+    """(RequestLog, original status, original latency ms, original body) in id order, streamed."""
+    from app.models import RequestLog, ResponseLog
+
+    q = (
+        db.query(RequestLog, ResponseLog.status_code, ResponseLog.latency_ms, ResponseLog.body_json)
+        .outerjoin(ResponseLog, ResponseLog.request_id == RequestLog.id)
+        .order_by(RequestLog.id)
+    )
+    if upto is not None:
+        q = q.filter(RequestLog.id <= upto)
+    if route:
+        q = q.filter(RequestLog.route.like(f"{route}%"))
+    if since is not None:
+        q = q.filter(RequestLog.created_at >= since)
+    if limit:
+        q = q.limit(limit)
+    yield from q.yield_per(500)
+
+
+def shape(value, path="$", out=None) -> set:
+    """Set of 'path:type' for a JSON document; list items collapse to [*]."""
+    out = set() if out is None else out
+    if isinstance(value, dict):
+        out.add(f"{path}:object")
+        for k, v in value.items():
+            if k not in VOLATILE_KEYS:
+                shape(v, f"{path}.{k}", out)
+    elif isinstance(value, list):
+        out.add(f"{path}:array")
+        for v in value:
+            shape(v, f"{path}[*]", out)
+    else:
+        out.add(f"{path}:{'number' if isinstance(value, (int, float)) and not isinstance(value, bool) else type(value).__name__}")
+    return out
+
+
+def _json(text):
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return None
+
+
+# --- async HTTP/1.1 client ---
+
+class HttpPool:
+    """Keep-alive connections to one origin, reused across requests."""
+
+    def __init__(self, base: str, timeout: float):
+        u = urlsplit(base)
+        self.host = u.hostname
+        self.port = u.port or (443 if u.scheme == "https" else 80)
+        self.ssl = u.scheme == "https"
+        self.prefix = u.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = []
+
+    async def _conn(self):
+        if self._idle:
+            return self._idle.pop()
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+
+    async def request(self, method: str, path: str, headers: dict, body: bytes):
+        reader, writer = await self._conn()
+        try:
+            status, resp_headers, data = await asyncio.wait_for(
+                self._roundtrip(reader, writer, method, path, headers, body), self.timeout
+            )
+        except BaseException:
+            writer.close()
+            raise
+        if resp_headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, data
+
+    async def _roundtrip(self, reader, writer, method, path, headers, body):
+        lines = [f"{method} {self.prefix}{path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        resp_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            resp_headers[k.strip().lower()] = v.strip()
+
+        if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        elif "content-length" in resp_headers:
+            data = await reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            data = await reader.read()
+            resp_headers["connection"] = "close"
+        return status, resp_headers, data
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+# --- replay ---
+
+class RouteStats:
+    __slots__ = ("latency", "original_latency", "requests", "errors", "status_mismatch",
+                 "shape_mismatch", "examples")
+
+    def __init__(self):
+        self.latency, self.original_latency = [], []
+        self.requests = self.errors = self.status_mismatch = self.shape_mismatch = 0
+        self.examples = []
+
+    def report(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "status_mismatch": self.status_mismatch,
+            "shape_mismatch": self.shape_mismatch,
+            "latency_ms": percentiles(self.latency),
+            "original_latency_ms": percentiles(self.original_latency),
+            "examples": self.examples,
+        }
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    v = sorted(values)
+    pick = lambda p: round(v[min(int(len(v) * p), len(v) - 1)], 1)  # noqa: E731
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(v[-1], 1),
+            "mean": round(sum(v) / len(v), 1)}
+
+
+def _headers(row, api_key, no_cache) -> dict:
+    try:
+        original = json.loads(row.headers_json or "{}")
+    except ValueError:
+        original = {}
+    headers = {k: v for k, v in original.items() if k.lower() not in SKIP_HEADERS}
+    headers["X-Replay-Of"] = row.trace_id
+    if api_key:
+        headers["X-API-Key"] = api_key
+    if no_cache:
+        headers["Cache-Control"] = "no-cache"
+    return headers
+
+
+async def replay(rows, target: str, speed=1.0, concurrency=16, timeout=120.0,
+                 api_key=None, no_cache=False, max_examples=3) -> dict:
+    pool = HttpPool(target, timeout)
+    stats = defaultdict(RouteStats)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    t_first = None
+    started = time.perf_counter()
+
+    async def one(row, status0, latency0, body0):
+        route = stats[f"{row.method} {row.route}"]
+        route.requests += 1
+        if latency0 is not None:
+            route.original_latency.append(latency0)
+        body = (row.body_json or "").encode("utf-8")
+        if body.startswith(b"<") and body.endswith(b"logged>"):
+            body = b""  # placeholder for a body that was too large to log
+        t0 = time.perf_counter()
+        try:
+            status, data = await pool.request(row.method, row.route, _headers(row, api_key, no_cache), body)
+        except Exception as e:
+            route.errors += 1
+            if len(route.examples) < max_examples:
+                route.examples.append({"request_id": row.id, "error": f"{type(e).__name__}: {e}"})
+            return
+        finally:
+            slots.release()
+        route.latency.append((time.perf_counter() - t0) * 1000)
+
+        diff = {}
+        if status0 is not None and status != status0:
+            route.status_mismatch += 1
+            diff["status"] = [status0, status]
+        old, new = _json(body0), _json(data.decode("utf-8", "replace"))
+        if status0 == status and old is not None and new is not None:
+            a, b = shape(old), shape(new)
+            if a != b:
+                route.shape_mismatch += 1
+                diff["missing"] = sorted(a - b)[:10]
+                diff["added"] = sorted(b - a)[:10]
+        if diff and len(route.examples) < max_examples:
+            route.examples.append({"request_id": row.id, **diff})
+
+    for row, status0, latency0, body0 in rows:
+        if speed and row.created_at is not None:
+            if t_first is None:
+                t_first = row.created_at
+            due = (row.created_at - t_first).total_seconds() / speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        task = asyncio.create_task(one(row, status0, latency0, body0))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    pool.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(s.requests for s in stats.values())
+    return {
+        "target": target,
+        "requests": total,
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "routes": {k: s.report() for k, s in sorted(stats.items())},
+    }
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} requests in {report['elapsed_s']} s ({report['rps']} req/s) -> {report['target']}")
+    print(f"{'route':<40} {'n':>6} {'err':>4} {'status≠':>7} {'shape≠':>6} "
+          f"{'p50':>8} {'p99':>8} {'orig p50':>9} {'orig p99':>9}")
+    for route, r in report["routes"].items():
+        lat, orig = r["latency_ms"], r["original_latency_ms"]
+        print(f"{route[:40]:<40} {r['requests']:>6} {r['errors']:>4} {r['status_mismatch']:>7} "
+              f"{r['shape_mismatch']:>6} {lat.get('p50', '-'):>8} {lat.get('p99', '-'):>8} "
+              f"{orig.get('p50', '-'):>9} {orig.get('p99', '-'):>9}")
+        for ex in r["examples"]:
+            print(f"    {json.dumps(ex)[:160]}")
+
+
+# --- spawned target ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_target(latency_ms: int, preset: str):
+    """Start python -m app.serve with the fake LLM; returns (process, base url)."""
+    port = _free_port()
+    env = dict(os.environ, LLM_BACKEND="fake", FAKE_LLM_LATENCY_MS=str(latency_ms),
+               APP_HOST="127.0.0.1", APP_PORT=str(port))
+    proc = subprocess.Popen([sys.executable, "-m", "app.serve", "--preset", preset], env=env)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/health", timeout=1).read()
+            return proc, base
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("spawned target did not become ready")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.replay", description="Replay request_logs against a target")
+    ap.add_argument("--target", help="base URL, e.g. http://localhost:8000")
+    ap.add_argument("--spawn", action="store_true", help="start a local fake-LLM target instead")
+    ap.add_argument("--spawn-preset", default="gthread")
+    ap.add_argument("--fake-latency-ms", type=int, default=int(os.getenv("FAKE_LLM_LATENCY_MS", "0")))
+    ap.add_argument("--speed", type=float, default=1.0, help="time multiplier; 0 = no pacing")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--route", help="only routes starting with this")
+    ap.add_argument("--since", type=dt.datetime.fromisoformat)
+    ap.add_argument("--limit", type=int)
+    ap.add_argument("--api-key", default=os.getenv("REPLAY_API_KEY"), help="X-API-Key to send")
+    ap.add_argument("--no-cache", action="store_true", help="send Cache-Control: no-cache (skip history)")
+    ap.add_argument("--json", help="also write the report here")
+    args = ap.parse_args(argv)
+    if not args.target and not args.spawn:
+        ap.error("--target or --spawn is required")
+
+    from sqlalchemy import func
+    from app.db import SessionLocal
+    from app.models import RequestLog
+
+    with SessionLocal.session_factory() as db:
+        # fixed before anything (including a spawned target) logs new traffic
+        upto = db.query(func.max(RequestLog.id)).scalar()
+    proc = None
+    if args.spawn:
+        proc, args.target = spawn_target(args.fake_latency_ms, args.spawn_preset)
+    try:
+        with SessionLocal.session_factory() as db:
+            rows = iter_traffic(db, args.route, args.since, args.limit, upto)
+            report = asyncio.run(replay(
+                rows, args.target, speed=args.speed, concurrency=args.concurrency,
+                timeout=args.timeout, api_key=args.api_key, no_cache=args.no_cache,
+            ))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
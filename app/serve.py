@@ -0,0 +1,124 @@
+# app/serve.py
+"""
+Production launcher (gunicorn) with presets for an I/O-bound LLM proxy.
+
+    python -m app.serve                       # gthread preset on 0.0.0.0:$APP_PORT
+    python -m app.serve --preset gevent
+    python -m app.serve --preset gthread --workers 4 --threads 64
+    python -m app.serve --print-config        # show the resolved settings and exit
+
+Presets:
+    gthread  few processes, many threads each; requests mostly sit waiting on
+             Gemini, so threads are cheap concurrency. The default.
+    gevent   green threads; highest concurrency per worker, but needs the
+             gevent extra and grpc's gevent integration (done in post_worker_init).
+    sync     one request per process; only useful as a baseline.
+
+Every preset sizes timeouts from LLM latency: each run_* makes up to 2 attempts
+(tenacity) of up to LLM_TIMEOUT_S seconds, so a worker must not be killed
+before that. The app is plain WSGI, so there is no uvicorn/ASGI preset.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+LLM_TIMEOUT_S = int(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_ATTEMPTS = 2  # matches stop_after_attempt(2) on the run_* functions
+
+PRESETS = {
+    "gthread": {"worker_class": "gthread", "threads": 32},
+    "gevent": {"worker_class": "gevent", "worker_connections": 512},
+    "sync": {"worker_class": "sync"},
+}
+
+
+def _default_workers(preset: str) -> int:
+    cpus = multiprocessing.cpu_count()
+    if preset == "sync":
+        return cpus * 2 + 1
+    # threads/greenlets provide the concurrency; processes just use the cores
+    return max(cpus, 2)
+
+
+def build_config(preset="gthread", bind=None, workers=None, threads=None, preload=True) -> dict:
+    if preset not in PRESETS:
+        raise ValueError(f"unknown preset {preset!r}; choose from {', '.join(PRESETS)}")
+    request_budget = LLM_TIMEOUT_S * LLM_ATTEMPTS + 10
+    cfg = {
+        "bind": bind or f"{os.getenv('APP_HOST', '0.0.0.0')}:{os.getenv('APP_PORT', '8000')}",
+        "workers": workers or int(os.getenv("SERVE_WORKERS", "0")) or _default_workers(preset),
+        "timeout": int(os.getenv("SERVE_TIMEOUT", str(request_budget))),
+        # let in-flight LLM calls finish on reload/shutdown
+        "graceful_timeout": int(os.getenv("SERVE_GRACEFUL_TIMEOUT", str(request_budget))),
+        # longer than typical load-balancer idle timeouts (60s) so the LB closes first
+        "keepalive": int(os.getenv("SERVE_KEEPALIVE", "75")),
+        "preload_app": preload,
+        "max_requests": int(os.getenv("SERVE_MAX_REQUESTS", "2000")),
+        "max_requests_jitter": int(os.getenv("SERVE_MAX_REQUESTS_JITTER", "200")),
+        "accesslog": os.getenv("SERVE_ACCESSLOG") or None,
+        "post_fork": post_fork,
+    }
+    cfg.update(PRESETS[preset])
+    if threads and preset == "gthread":
+        cfg["threads"] = threads
+    if preset == "gevent":
+        cfg["post_worker_init"] = _init_grpc_gevent
+    return cfg
+
+
+def post_fork(server, worker):
+    """With preload_app the parent may have opened DB connections; never share them across forks."""
+    db = sys.modules.get("app.db")
+    if db is not None:
+        db.engine.dispose(close=False)
+
+
+def _init_grpc_gevent(worker):
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+    except ImportError:
+        pass
+
+
+def run(cfg: dict):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("gunicorn is not installed: pip install -r requirements-optional.txt")
+
+    class _App(BaseApplication):
+        def load_config(self):
+            for key, value in cfg.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    _App().run()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.serve", description="Run the API under gunicorn")
+    ap.add_argument("--preset", default=os.getenv("SERVE_PRESET", "gthread"), choices=sorted(PRESETS))
+    ap.add_argument("--bind")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--threads", type=int)
+    ap.add_argument("--no-preload", action="store_true", help="import the app in each worker instead")
+    ap.add_argument("--print-config", action="store_true")
+    args = ap.parse_args(argv)
+
+    cfg = build_config(args.preset, args.bind, args.workers, args.threads, not args.no_preload)
+    if args.print_config:
+        for key, value in sorted(cfg.items()):
+            if not callable(value):
+                print(f"{key} = {value}")
+        return
+    run(cfg)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# app/trace_collector.py
+"""
+Local stand-in for an OpenTelemetry collector (OTLP/HTTP, JSON encoding).
+
+    python -m app.trace_collector --port 4318 --out traces.otlp.jsonl
+    TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://localhost:4318/v1/traces python -m app.serve
+
+Every export request is appended to --out (same line format as
+TRACE_EXPORTER=file) and each finished trace root is printed as a waterfall:
+
+    2f1c...  POST /api/v1/tradeoff/            1843.2 ms
+               validate.request                   0.4 ms  @   1.1
+               llm.generate                    1822.0 ms  @   3.0
+               llm.extract_json                   0.1 ms  @1825.3
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _ms(a, b) -> float:
+    return (int(b) - int(a)) / 1e6
+
+
+def waterfall(spans) -> str:
+    """Text waterfall for the spans of one trace, children indented under parents."""
+    by_parent = defaultdict(list)
+    ids = {s["spanId"] for s in spans}
+    for s in spans:
+        parent = s.get("parentSpanId")
+        by_parent[parent if parent in ids else None].append(s)
+    roots = by_parent[None]
+    if not roots:
+        return ""
+    t0 = min(int(s["startTimeUnixNano"]) for s in spans)
+    lines = []
+
+    def walk(s, depth):
+        dur = _ms(s["startTimeUnixNano"], s["endTimeUnixNano"])
+        at = _ms(t0, s["startTimeUnixNano"])
+        err = "  ERROR" if s.get("status", {}).get("code") == 2 else ""
+        lines.append(f"{'  ' * depth}{s['name']:<{40 - 2 * depth}} {dur:9.1f} ms  @{at:7.1f}{err}")
+        for child in sorted(by_parent[s["spanId"]], key=lambda c: int(c["startTimeUnixNano"])):
+            walk(child, depth + 1)
+
+    for root in roots:
+        lines.append(f"trace {root['traceId']}")
+        walk(root, 1)
+    return "\n".join(lines)
+
+
+def make_handler(out_path, quiet=False):
+    pending = defaultdict(list)  # trace id -> spans seen so far
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_error(400, "expected OTLP JSON")
+                return
+            with open(out_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+            for rs in payload.get("resourceSpans", []):
+                for ss in rs.get("scopeSpans", []):
+                    for s in ss.get("spans", []):
+                        pending[s["traceId"]].append(s)
+                        # a span without a parent from this service ends its local trace
+                        if not quiet and s.get("kind") == 2:
+                            print(waterfall(pending.pop(s["traceId"])), flush=True)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.trace_collector", description=__doc__.split("\n")[1])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=4318)
+    ap.add_argument("--out", default="traces.otlp.jsonl")
+    ap.add_argument("--quiet", action="store_true", help="don't print waterfalls")
+    args = ap.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.out, args.quiet))
+    print(f"collecting OTLP/JSON on http://{args.host}:{args.port}/v1/traces -> {args.out}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# benchmarks/bench_cache_memory.py
+"""
+Bytes per cached analysis and cost of a cache hit, per storage form.
+
+The response cache used to hold payload dicts (model_dump output) and
+re-serialise them with jsonify on every hit. It now holds CompactResult, the
+compact JSON bytes of the response. This builds N realistic tradeoff / risk /
+testcase results and measures, with tracemalloc, the retained size of N cached
+entries as:
+
+    model     the pydantic response objects
+    dict      payload dicts (as the old cache and history rows held them)
+    compact   CompactResult (JSON bytes + analysis id)
+
+plus the time to turn one cached entry into a Flask response body.
+
+    python benchmarks/bench_cache_memory.py
+    python benchmarks/bench_cache_memory.py --entries 5000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.cache import CompactResult  # noqa: E402
+from app.core.schemas import (  # noqa: E402
+    RiskResponse, RiskRow, TestCase, TestCaseResponse, TradeoffResponse, TradeoffRow,
+)
+
+CRITERIA = ["Scalability", "Latency", "Operability", "Cost", "Team skills", "Ecosystem",
+            "Consistency", "Security"]
+CATEGORIES = ["Security", "Performance", "Reliability", "Operability", "Compliance"]
+
+
+def _tradeoff(i):
+    return TradeoffResponse(
+        version="tradeoff/v1", trace_id=f"trace-{i}", generated_at="2026-10-19T10:00:00+00:00",
+        context={"option_a": "REST", "option_b": "gRPC"}, criteria=CRITERIA,
+        matrix=[TradeoffRow(criterion=c, option_a=f"REST is simple and well understood ({i})",
+                            option_b=f"gRPC streams and uses HTTP/2 with protobuf ({i})",
+                            verdict="B" if k % 2 else "A", notes="Depends on client mix")
+                for k, c in enumerate(CRITERIA)],
+        summary=f"gRPC wins on latency; REST on reach ({i}).",
+        recommendation={"winner": "B", "rationale": "Internal traffic dominates", "caveats": "Browsers"},
+    )
+
+
+def _risk(i):
+    return RiskResponse(
+        version="risk/v1", trace_id=f"trace-{i}", generated_at="2026-10-19T10:00:00+00:00",
+        summary=f"Register {i}",
+        risks=[RiskRow(risk_id=f"R-{k + 1}", category=CATEGORIES[k % 5],
+                       description=f"Single Postgres primary without automated failover ({i}/{k})",
+                       likelihood=k % 3 + 1, impact=k % 4 + 1, score=(k % 3 + 1) * (k % 4 + 1),
+                       mitigation="Add a streaming replica and test failover quarterly")
+               for k in range(12)],
+    )
+
+
+def _testcases(i):
+    return TestCaseResponse(
+        version="testcases/v1", trace_id=f"trace-{i}", generated_at="2026-10-19T10:00:00+00:00",
+        summary="30 test cases",
+        cases=[TestCase(id=f"TC-{k + 1:03}", title=f"Password reset case {k} ({i})",
+                        given="A registered user exists", when=f"They request reset variant {k}",
+                        then="A single-use link is emailed", priority="High", type="Positive")
+               for k in range(30)],
+    )
+
+
+BUILDERS = {"tradeoff": _tradeoff, "risk": _risk, "testcases": _testcases}
+
+FORMS = {
+    "model": lambda m, i: m,
+    # fresh objects, as a history row (JSON column) hands them back; a plain
+    # model_dump() would share its strings with the model and under-count
+    "dict": lambda m, i: json.loads(m.model_dump_json()),
+    "compact": lambda m, i: CompactResult.from_model(m, i),
+}
+
+
+def retained_bytes(build, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    held = [build(i) for i in range(n)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del held
+    return size / n
+
+
+def hit_us(form: str, model, repeat: int) -> float:
+    """µs to produce the response body from one cached entry."""
+    from flask import Flask, Response, jsonify
+
+    entry = FORMS[form](model, 1)
+    app = Flask(__name__)
+    with app.app_context():
+        if form == "compact":
+            render = lambda: Response(entry.body, mimetype="application/json").get_data()  # noqa: E731
+        elif form == "dict":
+            render = lambda: jsonify(entry).get_data()  # noqa: E731
+        else:
+            render = lambda: jsonify(json.loads(entry.model_dump_json())).get_data()  # noqa: E731
+        render()
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+
+    print(f"{'kind':<10} {'form':<8} {'bytes/entry':>12} {'vs model':>9} {'hit µs':>8}")
+    for kind, builder in BUILDERS.items():
+        base = None
+        for form, convert in FORMS.items():
+            # build the model inside the measured region only for the "model" form
+            if form == "model":
+                size = retained_bytes(builder, args.entries)
+            else:
+                models = [builder(i) for i in range(args.entries)]
+                size = retained_bytes(lambda i: convert(models[i], i), args.entries)
+                del models
+            base = base or size
+            us = hit_us(form, builder(0), args.repeat)
+            print(f"{kind:<10} {form:<8} {size:>12,.0f} {size / base:>8.2f}x {us:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
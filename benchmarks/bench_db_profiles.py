@@ -0,0 +1,103 @@
+# benchmarks/bench_db_profiles.py
+"""
+Concurrent request/response logging writes under each DB engine profile.
+
+Every request through the logging middleware inserts a RequestLog and a
+ResponseLog row. This drives N threads against /health with ENABLE_DB=true and
+reports throughput, latency and how many log rows were lost (the middleware
+swallows "database is locked" and rolls back, so lost rows == lock failures).
+
+    python benchmarks/bench_db_profiles.py
+    python benchmarks/bench_db_profiles.py --threads 16 --requests 200
+    BENCH_PG_URL=postgresql://u:p@localhost/bench python benchmarks/bench_db_profiles.py
+
+Each profile runs in its own interpreter because app.db builds its engine at import.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, statistics, sys, threading, time
+from app import create_app
+from app.db import SessionLocal
+from app.models import ResponseLog
+
+threads, per_thread = int(sys.argv[1]), int(sys.argv[2])
+app = create_app()
+app.config["TESTING"] = True
+lat = []
+lock = threading.Lock()
+
+def worker():
+    client = app.test_client()
+    local = []
+    for _ in range(per_thread):
+        t0 = time.perf_counter()
+        client.get("/health")
+        local.append((time.perf_counter() - t0) * 1000)
+    with lock:
+        lat.extend(local)
+
+ts = [threading.Thread(target=worker) for _ in range(threads)]
+t0 = time.perf_counter()
+for t in ts: t.start()
+for t in ts: t.join()
+elapsed = time.perf_counter() - t0
+
+db = SessionLocal()
+rows = db.query(ResponseLog).count()
+db.close()
+lat.sort()
+print(json.dumps({
+    "rps": len(lat) / elapsed,
+    "p50": statistics.median(lat),
+    "p99": lat[int(len(lat) * 0.99) - 1],
+    "expected": len(lat),
+    "stored": rows,
+}))
+"""
+
+
+def run_profile(profile, url, threads, per_thread):
+    env = dict(os.environ, ENABLE_DB="true", DATABASE_URL=url, DB_PROFILE=profile, API_KEY="")
+    proc = subprocess.run(
+        [sys.executable, "-c", WORKER, str(threads), str(per_thread)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="DB engine profile benchmark")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=100, help="requests per thread")
+    args = ap.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cases.append(("default", f"sqlite:///{tmp}/default.db"))
+        cases.append(("sqlite", f"sqlite:///{tmp}/wal.db"))
+        pg = os.getenv("BENCH_PG_URL")
+        if pg:
+            cases.append(("default", pg))
+            cases.append(("postgres", pg))
+
+        print(f"{args.threads} threads x {args.requests} requests, 2 log rows per request\n")
+        print(f"{'profile':<10} {'backend':<9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'lost rows':>10}")
+        for profile, url in cases:
+            r = run_profile(profile, url, args.threads, args.requests)
+            lost = r["expected"] - r["stored"] if url.startswith("sqlite") else "n/a"
+            backend = url.split(":", 1)[0]
+            print(f"{profile:<10} {backend:<9} {r['rps']:8.0f} {r['p50']:8.2f} {r['p99']:8.2f} {lost!s:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_serve_presets.py
+"""
+Compare `python -m app.serve` presets against a slow fake LLM.
+
+Starts the server per preset with LLM_BACKEND=fake and FAKE_LLM_LATENCY_MS
+(default 1000 ms, roughly a short Gemini call), fires concurrent POSTs at
+/api/v1/tradeoff/ and reports throughput and latency percentiles. With an
+I/O-bound backend, throughput should scale with concurrent slots
+(workers x threads), not with CPU.
+
+    python benchmarks/bench_serve_presets.py
+    python benchmarks/bench_serve_presets.py --presets gthread sync --concurrency 64 --latency-ms 500
+"""
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAYLOAD = json.dumps({"option_a": "REST", "option_b": "gRPC", "criteria": ["Latency"]}).encode()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def _post(base):
+    req = urllib.request.Request(
+        base + "/api/v1/tradeoff/", data=PAYLOAD, headers={"Content-Type": "application/json"}
+    )
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=120) as r:
+        r.read()
+        ok = r.status == 200
+    return (time.perf_counter() - t0) * 1000, ok
+
+
+def bench(preset, args):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ, LLM_BACKEND="fake", FAKE_LLM_LATENCY_MS=str(args.latency_ms),
+        API_KEY="", ENABLE_DB="false", ENABLE_DOCS="0",
+    )
+    cmd = [sys.executable, "-m", "app.serve", "--preset", preset, "--bind", f"127.0.0.1:{port}",
+           "--workers", str(args.workers)]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(base)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda _: _post(base), range(args.requests)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    lat = sorted(ms for ms, _ in results)
+    return {
+        "rps": len(lat) / elapsed,
+        "p50": statistics.median(lat),
+        "p95": lat[int(len(lat) * 0.95) - 1],
+        "errors": sum(1 for _, ok in results if not ok),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="gunicorn preset benchmark with a slow fake LLM")
+    ap.add_argument("--presets", nargs="+", default=["sync", "gthread", "gevent"])
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--requests", type=int, default=128)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--latency-ms", type=int, default=1000)
+    args = ap.parse_args()
+
+    if importlib.util.find_spec("gunicorn") is None:
+        sys.exit("gunicorn is not installed")
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.workers} workers, fake LLM latency {args.latency_ms} ms\n")
+    print(f"{'preset':<8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for preset in args.presets:
+        if preset == "gevent" and importlib.util.find_spec("gevent") is None:
+            print(f"{preset:<8} skipped (gevent not installed)")
+            continue
+        r = bench(preset, args)
+        print(f"{preset:<8} {r['rps']:7.1f} {r['p50']:8.0f} {r['p95']:8.0f} {r['errors']:7d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark: time from interpreter start to the first /health response.
+
+Each run spawns a fresh interpreter with `python -X importtime`, builds the app,
+hits /health through the test client and reports wall time plus the heaviest
+top-level imports, so regressions in import cost show up by module name.
+
+    python benchmarks/bench_startup.py            # 5 runs
+    python benchmarks/bench_startup.py --runs 10 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import time
+t0 = time.perf_counter()
+from app import create_app
+app = create_app()
+res = app.test_client().get("/health")
+assert res.status_code == 200, res.status_code
+print("FIRST_HEALTH_MS=%.2f" % ((time.perf_counter() - t0) * 1000))
+"""
+
+
+def _run_once():
+    env = dict(os.environ, ENABLE_DB="false", ENABLE_DOCS="0", PYTHONDONTWRITEBYTECODE="0")
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+    in_proc_ms = 0.0
+    for line in proc.stdout.splitlines():
+        if line.startswith("FIRST_HEALTH_MS="):
+            in_proc_ms = float(line.split("=", 1)[1])
+    return wall_ms, in_proc_ms, _parse_importtime(proc.stderr)
+
+
+def _parse_importtime(stderr: str):
+    """Return {top-level module: cumulative microseconds} from -X importtime output."""
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):  # nested import, already counted by its parent
+            continue
+        try:
+            out[name.strip()] = int(cumulative)
+        except ValueError:
+            pass  # header row
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    _run_once()  # warm the bytecode cache so we measure imports, not compilation
+    walls, in_procs, last = [], [], {}
+    for _ in range(args.runs):
+        wall, in_proc, last = _run_once()
+        walls.append(wall)
+        in_procs.append(in_proc)
+
+    print(f"runs: {args.runs}")
+    print(f"process start -> first /health : median {statistics.median(walls):8.1f} ms  (min {min(walls):.1f})")
+    print(f"import app -> first /health    : median {statistics.median(in_procs):8.1f} ms  (min {min(in_procs):.1f})")
+    print(f"\nheaviest top-level imports (last run):")
+    for name, us in sorted(last.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    heavy = [m for m in ("google.generativeai", "spectree", "sqlalchemy") if m in last]
+    if heavy:
+        print(f"\nWARNING: heavy modules imported at startup: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import pytest
+
+from app import create_app
+from app import db as app_db
+
+
+@pytest.fixture
+def tmp_db(monkeypatch, tmp_path):
+    """ENABLE_DB=true against a fresh SQLite file; the process-wide engine is restored afterwards."""
+    original = app_db.engine
+    monkeypatch.setenv("ENABLE_DB", "true")
+    engine = app_db.configure_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    yield engine
+    app_db.SessionLocal.remove()
+    app_db.engine.dispose()
+    app_db.engine = original
+    app_db.SessionLocal.configure(bind=original)
+
+
+@pytest.fixture
+def make_app(tmp_db):
+    """Factory for a TESTING app on tmp_db; call it after setting any other env the test needs."""
+    def make():
+        app = create_app()
+        app.config["TESTING"] = True
+        return app
+    return make
+
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    """X-Admin-Key headers for the admin routes (ADMIN_API_KEY set for the test)."""
+    monkeypatch.setenv("ADMIN_API_KEY", "test-admin-key")
+    return {"X-Admin-Key": "test-admin-key"}
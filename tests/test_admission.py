@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app.core.admission import Admission, Overloaded, parse_lanes
+
+
+def test_weighted_fair_order_and_shedding():
+    adm = Admission(1, parse_lanes("interactive=3:8,batch=1:2"), wait_s=5)
+    lanes = adm.lanes
+    adm.acquire(lanes["batch"])  # holds the only slot
+
+    order, threads = [], []
+
+    def call(name):
+        adm.acquire(lanes[name])
+        order.append(name)
+        adm.release(lanes[name], 0.01)
+
+    def start(name):
+        t = threading.Thread(target=call, args=(name,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)  # queue in a known order
+
+    start("batch")
+    start("batch")
+    with pytest.raises(Overloaded) as e:  # batch queue holds 2
+        adm.acquire(lanes["batch"])
+    assert e.value.reason == "queue_full" and e.value.retry_after >= 1
+    for _ in range(6):
+        start("interactive")
+    with pytest.raises(Overloaded) as e:  # interactive is waiting, so new batch work is shed first
+        adm.acquire(lanes["batch"])
+    assert e.value.reason == "priority"
+
+    adm.release(lanes["batch"], 0.01)
+    for t in threads:
+        t.join(5)
+    # 3:1 stride: interactive wins ties, then gets three slots per batch slot
+    assert order == ["interactive", "batch", "interactive", "interactive",
+                     "interactive", "batch", "interactive", "interactive"]
+    stats = adm.stats()["lanes"]
+    assert stats["batch"]["shed"] == {"queue_full": 1, "priority": 1, "timeout": 0}
+    assert stats["interactive"]["admitted"] == 6 and stats["interactive"]["queue_ms"]["max"] > 0
+    assert adm.stats()["free"] == 1
+
+
+def test_lane_from_header_capped_by_tenant(monkeypatch, admin_headers):
+    from app import create_app
+    from app.core import admission, llm, tenants
+
+    monkeypatch.setattr(tenants, "_registry", None)
+    monkeypatch.setattr(admission, "_admission", None)
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    monkeypatch.setattr(llm, "_generate", lambda backend, system, user: json.dumps({
+        "summary": "ok", "risks": [],
+    }))
+
+    assert client.post("/api/v1/risk/", json={"design": "a"}, headers={"X-Priority": "batch"}).status_code == 200
+    assert client.post("/api/v1/risk/", json={"design": "b"}).status_code == 200
+    lanes = client.get("/api/v1/admin/lanes", headers=admin_headers).get_json()["lanes"]
+    assert lanes["batch"]["admitted"] == 1 and lanes["interactive"]["admitted"] == 1
+
+    batch_tenant = tenants.Tenant("ci", lane="batch")
+    assert admission.lane_for_request("interactive", batch_tenant) == "batch"
+    assert admission.lane_for_request(None, batch_tenant) == "batch"
@@ -0,0 +1,46 @@
+import gzip
+import json
+
+from app import db as app_db
+
+
+def test_compressed_results_etags_and_304(monkeypatch, make_app, admin_headers):
+    from app.core import llm, tenants
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = make_app()
+    client = app.test_client()
+
+    risks = [{"risk_id": f"R-{i}", "category": "Ops", "description": "single primary database " * 4,
+              "likelihood": 2, "impact": 3, "score": 6, "mitigation": "add a replica"} for i in range(20)]
+    monkeypatch.setattr(llm, "_gemini", lambda _: json.dumps({"summary": "big", "risks": risks}))
+
+    gz = {"Accept-Encoding": "gzip"}
+    first = client.post("/api/v1/risk/", json={"design": "API -> DB"}, headers=gz)
+    assert first.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in first.headers["Vary"]
+    plain = json.loads(gzip.decompress(first.data))
+    assert len(plain["risks"]) == 20
+
+    # the cache hit sends the same stored compressed bytes under the same validator
+    hit = client.post("/api/v1/risk/", json={"design": "API -> DB"}, headers=gz)
+    assert hit.headers["X-Analysis-Source"] == "cache"
+    assert hit.data == first.data and hit.headers["ETag"] == first.headers["ETag"]
+    identity = client.post("/api/v1/risk/", json={"design": "API -> DB"})
+    assert "Content-Encoding" not in identity.headers and identity.get_json() == plain
+    assert identity.headers["ETag"] != first.headers["ETag"]  # a different representation
+
+    # the response log keeps the plain JSON
+    from app.models import ResponseLog
+    with app_db.SessionLocal.session_factory() as db:
+        logged = db.query(ResponseLog).order_by(ResponseLog.id).first().body_json
+    assert json.loads(logged) == plain
+
+    # conditional GETs on stored analyses and traces
+    aid = first.headers["X-Analysis-Id"]
+    etag = client.get(f"/api/v1/projects/1/analyses/{aid}").headers["ETag"]
+    assert client.get(f"/api/v1/projects/1/analyses/{aid}", headers={"If-None-Match": etag}).status_code == 304
+    zipped = client.get(f"/api/v1/projects/1/analyses/{aid}", headers={"If-None-Match": etag, **gz})
+    assert zipped.status_code == 200 and zipped.headers["ETag"] != etag
+
+    trace = client.get(f"/api/v1/admin/trace/{plain['trace_id']}", headers=admin_headers)
+    again = client.get(f"/api/v1/admin/trace/{plain['trace_id']}", headers={"If-None-Match": trace.headers["ETag"], **admin_headers})
+    assert again.status_code == 304 and again.data == b""
@@ -0,0 +1,13 @@
+from sqlalchemy import text
+from app.db import make_engine
+
+
+def test_sqlite_profile_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "2500")
+    engine = make_engine(f"sqlite:///{tmp_path / 'prof.db'}", profile="sqlite")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 2500
+    assert engine.pool._pre_ping is False
+    engine.dispose()
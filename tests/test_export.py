@@ -0,0 +1,41 @@
+import json
+
+
+def test_export_testcases_streams_feature_and_csv(monkeypatch, make_app):
+    app = make_app()
+    client = app.test_client()
+
+    from app.core import llm
+    def fake_gemini(_):
+        return json.dumps({"summary": "login", "cases": [
+            {"id": "TC-001", "title": "Valid login", "given": "a user", "when": "they log in",
+             "then": "they see the dashboard", "priority": "High", "type": "Positive"},
+            {"id": "TC-002", "title": "Bad password, \"quoted\"", "given": "a user",
+             "when": "they use a wrong password", "then": "an error is shown", "type": "Negative"},
+        ]})
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    pid = client.post("/api/v1/projects/", json={"name": "exports"}).get_json()["id"]
+    res = client.post("/api/v1/testcases/", json={"user_story": "login"}, headers={"X-Project-Id": str(pid)})
+    aid = res.headers["X-Analysis-Id"]
+
+    feature = client.get(f"/api/v1/projects/{pid}/export/testcases?format=feature",
+                         headers={"X-Trace-Id": "export-feature"})
+    assert feature.status_code == 200 and feature.is_streamed
+    text = feature.get_data(as_text=True)
+    assert text.startswith("Feature:")
+    assert "@TC-001 @High @Positive" in text and "      Then they see the dashboard" in text
+
+    csv_text = client.get(f"/api/v1/projects/{pid}/analyses/{aid}/export?format=csv").get_data(as_text=True)
+    lines = csv_text.strip().splitlines()
+    assert lines[0].startswith("analysis_id,id,title") and len(lines) == 3
+    assert '"Bad password, ""quoted"""' in csv_text
+
+    assert client.get(f"/api/v1/projects/{pid}/export/testcases?format=xlsx").status_code == 400
+
+    # the response log must not drain the streamed export into memory
+    from app import db as app_db
+    from app.models import ResponseLog
+    with app_db.SessionLocal.session_factory() as db:
+        logged = db.query(ResponseLog).filter(ResponseLog.trace_id == "export-feature").one()
+    assert logged.body_json == "<streamed>"
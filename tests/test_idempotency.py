@@ -0,0 +1,83 @@
+import json
+import threading
+
+import pytest
+from app import create_app
+from app.core import idempotency
+
+PAYLOAD = {"document": "Orders API on a single Postgres primary.", "quality_goals": ["Availability"]}
+NO_CACHE = {"Cache-Control": "no-cache"}  # make sure a second LLM call would really happen
+
+
+def _client(monkeypatch, gate=None):
+    monkeypatch.setattr(idempotency, "_store", None)
+    from app.core import llm
+    calls = []
+
+    def fake_gemini(messages):
+        calls.append(messages)
+        if gate is not None:
+            gate.wait(5)
+        return json.dumps({"summary": f"call {len(calls)}", "risks": [], "action_items": []})
+
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client(), calls
+
+
+def test_replay_and_key_reuse(monkeypatch, admin_headers):
+    client, calls = _client(monkeypatch)
+    headers = dict(NO_CACHE, **{"Idempotency-Key": "k-1"})
+    first = client.post("/api/v1/review/", json=PAYLOAD, headers=headers)
+    again = client.post("/api/v1/review/", json=PAYLOAD, headers=headers)
+    assert first.status_code == again.status_code == 200
+    assert len(calls) == 1
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
+
+    other = client.post("/api/v1/review/", json=dict(PAYLOAD, document="Something else entirely."), headers=headers)
+    assert other.status_code == 422
+    assert other.get_json()["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+    client.post("/api/v1/review/", json=PAYLOAD, headers=NO_CACHE)  # no key: runs again
+    assert len(calls) == 2
+    stats = client.get("/api/v1/admin/idempotency", headers=admin_headers).get_json()
+    assert stats["owned"] == 1 and stats["replayed"] == 1 and stats["reused"] == 1
+
+
+def test_retry_waits_for_in_flight_call(monkeypatch):
+    gate = threading.Event()
+    client, calls = _client(monkeypatch, gate)
+    headers = dict(NO_CACHE, **{"Idempotency-Key": "k-2"})
+    results = {}
+
+    def post(name):
+        results[name] = client.post("/api/v1/review/", json=PAYLOAD, headers=headers)
+
+    first = threading.Thread(target=post, args=("first",))
+    first.start()
+    while not calls:
+        threading.Event().wait(0.01)
+    retry = threading.Thread(target=post, args=("retry",))
+    retry.start()
+    threading.Event().wait(0.1)
+    gate.set()
+    first.join(5)
+    retry.join(5)
+
+    assert len(calls) == 1
+    assert results["retry"].status_code == 200
+    assert results["retry"].headers["Idempotent-Replayed"] == "true"
+    assert results["retry"].get_json() == results["first"].get_json()
+
+
+def test_in_progress_and_release(monkeypatch):
+    store = idempotency.IdempotencyStore(ttl=60)
+    key = ("default", "POST", "/api/v1/review/", "k-3")
+    role, e = store.begin(key, "fp", wait_s=0)
+    assert role == "owner"
+    with pytest.raises(idempotency.InProgress):
+        store.begin(key, "fp", wait_s=0.01)
+    store.release(key, e)  # the owner failed: the next attempt runs again
+    assert store.begin(key, "fp", wait_s=0)[0] == "owner"
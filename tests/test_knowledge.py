@@ -0,0 +1,47 @@
+import json
+from app import create_app
+from app.core import knowledge
+
+
+def test_bm25_retrieval_and_local_comparison():
+    cat = knowledge.get_catalogue()
+    assert cat.search_references("chat app with presence and push notifications")[0][0]["id"] == "realtime-chat"
+    assert cat.search_references("hello world") == []
+
+    ref = next(r for r in cat.references if r["id"] == "ecommerce-microservices")
+    cmp = cat.compare(ref, "Flask behind nginx; orders in Postgres; Redis for carts; no CDN yet.")
+    assert "Order database" in cmp["matched"] and "Cart and session cache" in cmp["matched"]
+    assert "CDN" in cmp["missing"] and "Event bus" in cmp["missing"]
+
+
+def test_techstack_uses_retrieved_snippets(monkeypatch):
+    from app.core import llm
+    seen, systems = [], []
+
+    def fake_gemini(messages):
+        systems.append(messages[0])
+        seen.append(json.loads(messages[1]))
+        return json.dumps({
+            "summary": "ok", "performance_review": [], "tech_recommendations": [],
+            "reference_comparison": {"matched": ["made up"], "missing": [], "improvements": ["Add a CDN"]},
+        })
+
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+    client = create_app().test_client()
+    res = client.post("/api/v1/techstack/", json={
+        "architecture": "Flask API behind nginx, orders in a single Postgres, Redis cart cache, Stripe payments.",
+        "domain": "e-commerce", "quality_goals": ["Scalability"],
+    })
+    assert res.status_code == 200
+    prompt = seen[0]
+    assert prompt["reference_architectures"][0]["name"] == "E-commerce microservices"
+    assert len(prompt["reference_architectures"]) <= knowledge.TOP_K
+    ref = res.get_json()["reference_comparison"]
+    assert ref["matched"] == prompt["reference_comparison"]["matched"]
+    assert "made up" not in ref["matched"] and "Event bus" in ref["missing"]
+    assert ref["improvements"] == ["Add a CDN"]
+    # the retrieval-aware prompt is a new version; v1 stays as published and can still be pinned
+    assert res.get_json()["version"] == "techstack/v2" and "computed locally" in systems[0]
+    pinned = client.post("/api/v1/techstack/", json={"architecture": "Flask API", "domain": "e-commerce"},
+                         headers={"X-Prompt-Version": "v1"})
+    assert pinned.get_json()["version"] == "techstack/v1" and "computed locally" not in systems[-1]
@@ -0,0 +1,34 @@
+from app import create_app
+
+PAYLOADS = {
+    "tradeoff": ("/api/v1/tradeoff/", {"option_a": "REST", "option_b": "gRPC", "criteria": ["Latency"]},
+                 "# Trade-off:"),
+    "tradeoff_nway": ("/api/v1/tradeoff/nway", {"options": ["A", "B", "C"], "criteria": ["Cost", "Speed"]},
+                      "## Ranking"),
+    "review": ("/api/v1/review/", {"document": "API -> DB", "quality_goals": ["Reliability"]}, "# Design review"),
+    "risk": ("/api/v1/risk/", {"design": "API -> DB"}, "# Risk register"),
+    "testcases": ("/api/v1/testcases/", {"user_story": "login", "count": 3}, "# Test cases"),
+    "design": ("/api/v1/design/", {"problem": "ticketing"}, "# Design options"),
+    "techstack": ("/api/v1/techstack/", {"architecture": "monolith"}, "# Performance & tech stack review"),
+}
+
+
+def test_accept_markdown_renders_every_kind_locally(monkeypatch):
+    from app.core import tenants
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+
+    for kind, (url, body, heading) in PAYLOADS.items():
+        md = client.post(url, json=body, headers={"Accept": "text/markdown"})
+        assert md.status_code == 200, kind
+        assert md.mimetype == "text/markdown" and "Accept" in md.headers["Vary"]
+        assert heading in md.get_data(as_text=True), kind
+
+        # default stays JSON, and is now a cache hit of the same result
+        js = client.post(url, json=body)
+        assert js.mimetype == "application/json" and js.headers["X-Analysis-Source"] == "cache"
+        assert js.get_json()["trace_id"] in md.get_data(as_text=True)
@@ -0,0 +1,53 @@
+import json
+from app import create_app
+from app.core import preprocess
+
+FOOTER = "This page is maintained by the platform team. Ask in #platform for access."
+IMAGE = "![arch](data:image/png;base64," + "iVBORw0KGgo" * 40 + ")"
+CODE = "```python\n" + "".join(f"x_{i} = {i}\n" for i in range(100)) + "```\n"
+
+
+def _document():
+    table = "| id | name |\n|----|------|\n" + "".join(f"| {i} | svc-{i} |\n" for i in range(80))
+    return "\n\n".join([
+        "# Orders service",
+        "The  API   writes to a single Postgres primary.   ",
+        FOOTER, IMAGE, "\n\n\n", table, CODE, FOOTER,
+    ])
+
+
+def test_pipeline_steps():
+    pipe = preprocess.Pipeline("binaries,whitespace,dedupe,tables")
+    out = pipe.run(_document())
+    assert "base64," not in out and "[embedded binary removed]" in out
+    assert "The API writes to a single Postgres primary." in out
+    assert out.count(FOOTER) == 1
+    assert "| 29 | svc-29 |" in out and "| 30 | svc-30 |" not in out
+    assert "50 more rows omitted" in out
+    assert CODE in out  # code is untouched unless the "code" step is on
+    stats = pipe.stats()
+    assert stats["tokens_saved"] > 0
+    assert stats["tokens_after"] == len(out) // 4
+    assert all(v > 0 for v in stats["chars_saved_by_step"].values())
+
+    shortened = preprocess.Pipeline("code").run(CODE)
+    assert "lines omitted" in shortened and "x_99 = 99" in shortened and "x_50 = 50" not in shortened
+
+
+def test_review_prompt_is_preprocessed(monkeypatch):
+    app = create_app()
+    app.config["TESTING"] = True
+    from app.core import llm
+    seen = []
+
+    def fake_gemini(messages):
+        seen.append(json.loads(messages[1])["document"])
+        return json.dumps({"summary": "ok", "risks": [], "action_items": []})
+
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+    client = app.test_client()
+    res = client.post("/api/v1/review/", json={"document": _document(), "quality_goals": ["Security"]})
+    assert res.status_code == 200
+    assert seen[0].count(FOOTER) == 1 and "base64," not in seen[0]
+    assert int(res.headers["X-Input-Tokens-Saved"]) > 0
+    assert int(res.headers["X-Input-Tokens"]) == len(seen[0]) // 4
@@ -0,0 +1,43 @@
+import datetime as dt
+import json
+from app import create_app
+from app import db as app_db
+from app.core import tenants
+
+
+def test_prewarm_mines_logs_and_fills_history(monkeypatch, make_app):
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = make_app()
+
+    from app.core import llm
+    calls = []
+    def fake_gemini(_):
+        calls.append(1)
+        return json.dumps({"summary": "stub", "risks": []})
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    from app.models import RequestLog
+    from app.prewarm import mine, prewarm
+    popular = {"design": "API -> Postgres", "non_functionals": ["Availability"]}
+    with app_db.SessionLocal.session_factory() as db:
+        for body in [json.dumps(popular), json.dumps(popular, indent=2), json.dumps(popular),
+                     json.dumps({"design": "rare"}), "not json"]:
+            db.add(RequestLog(route="/api/v1/risk/", method="POST", body_json=body, trace_id="t"))
+        db.commit()
+        since = dt.datetime.now(dt.UTC) - dt.timedelta(days=1)
+        entries = mine(db, since=since, min_count=2)
+
+    assert [(e["kind"], e["count"]) for e in entries] == [("risk", 3)]
+
+    stats = prewarm(app, entries, rpm=0, log=lambda *_: None)
+    assert stats["ran"] == 1 and len(calls) == 1
+    assert prewarm(app, entries, rpm=0, log=lambda *_: None)["stored"] == 1  # nothing left to do
+
+    # workers booting with PREWARM_CACHE_ENTRIES serve it from memory
+    monkeypatch.setenv("PREWARM_CACHE_ENTRIES", "10")
+    monkeypatch.setattr(tenants, "_registry", None)
+    client = create_app().test_client()
+    res = client.post("/api/v1/risk/", json=popular)
+    assert res.status_code == 200
+    assert res.headers["X-Analysis-Source"] == "cache"
+    assert len(calls) == 1
@@ -0,0 +1,63 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+from app import create_app
+
+
+def _busy(stop):
+    while not stop.is_set():
+        json.dumps({"k": list(range(50))})
+
+
+def test_sampling_profiler_and_request_profile(monkeypatch):
+    monkeypatch.setenv("ADMIN_API_KEY", "adm")
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    admin = {"X-Admin-Key": "adm"}
+
+    assert client.get("/api/v1/admin/profile/sample?seconds=0.1").status_code == 403
+
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        res = client.get("/api/v1/admin/profile/sample?seconds=0.3&interval_ms=5", headers=admin)
+    finally:
+        stop.set()
+        worker.join()
+    assert res.status_code == 200
+    lines = res.get_data(as_text=True).splitlines()
+    busy = [l for l in lines if l.startswith("busy_worker;")]
+    assert busy and any("test_profiler:_busy" in l for l in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+    from app.core import llm
+    monkeypatch.setattr(llm, "_gemini", lambda _: time.sleep(0.01) or json.dumps({"summary": "s", "risks": []}))
+    res = client.post("/api/v1/risk/", json={"design": "x"},
+                      headers={**admin, "X-Profile": "1", "X-Trace-Id": "t-prof"})
+    assert res.status_code == 200
+    profile_id = res.headers.get("X-Profile-Id")
+    if res.headers.get("X-Profile") == "busy":  # another profiler (e.g. coverage) owns the hook
+        return
+    text = client.get(f"/api/v1/admin/profile/{profile_id}", headers=admin).get_data(as_text=True)
+    assert "POST /api/v1/risk/" in text and "function calls" in text
+
+
+def test_request_profile_stopped_when_after_request_fails(monkeypatch):
+    monkeypatch.setenv("ADMIN_API_KEY", "adm")
+    app = create_app()
+    app.config["TESTING"] = True
+
+    @app.after_request
+    def _boom(resp):  # registered last, so it runs before the profiler's hook
+        raise RuntimeError("boom")
+
+    client = app.test_client()
+    with pytest.raises(RuntimeError):
+        client.get("/health", headers={"X-Admin-Key": "adm", "X-Profile": "1"})
+    assert sys.getprofile() is None
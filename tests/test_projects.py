@@ -0,0 +1,37 @@
+import json
+
+
+def test_analysis_history_read_through(monkeypatch, make_app):
+    from app.core import tenants
+    # no in-memory response cache, so the repeat request exercises stored history
+    monkeypatch.setenv("RESPONSE_CACHE_ENTRIES", "0")
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = make_app()
+    client = app.test_client()
+
+    from app.core import llm
+    calls = []
+    def fake_gemini(_):
+        calls.append(1)
+        return json.dumps({
+            "summary": "stub",
+            "risks": [{"risk_id": "R-1", "category": "Ops", "description": "single db",
+                       "likelihood": 2, "impact": 3, "score": 0, "mitigation": "replica"}],
+        })
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    pid = client.post("/api/v1/projects/", json={"name": "shop"}).get_json()["id"]
+    payload = {"design": "API -> Postgres", "non_functionals": ["Availability"]}
+    first = client.post("/api/v1/risk/", json=payload, headers={"X-Project-Id": str(pid)})
+    second = client.post("/api/v1/risk/", json=payload, headers={"X-Project-Id": str(pid)})
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["X-Analysis-Source"] == "llm"
+    assert second.headers["X-Analysis-Source"] == "history"
+    assert second.get_json() == first.get_json()
+    assert len(calls) == 1
+
+    listing = client.get(f"/api/v1/projects/{pid}/analyses?per_page=5").get_json()
+    assert listing["total"] == 1
+    assert listing["items"][0]["analysis_type"] == "risk"
+    assert client.post("/api/v1/risk/", json=payload, headers={"X-Project-Id": "999"}).status_code == 404
@@ -0,0 +1,34 @@
+import json
+from app import create_app
+
+
+def test_prompt_version_pinned_and_tracked(monkeypatch, admin_headers):
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+
+    from app.core import llm
+    seen = []
+    def fake_gemini(messages):
+        seen.append(messages[0])
+        return json.dumps({
+            "context": {}, "criteria": ["Latency"],
+            "matrix": [{"criterion": "Latency", "option_a": "ok", "option_b": "fast", "verdict": "B"}],
+            "summary": "stub", "recommendation": {"winner": "B"},
+        })
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    res = client.post(
+        "/api/v1/tradeoff/",
+        json={"option_a": "REST", "option_b": "gRPC", "criteria": ["Latency"]},
+        headers={"X-Prompt-Version": "v2-short"},
+    )
+    assert res.status_code == 200
+    assert res.get_json()["version"] == "tradeoff/v2-short"
+    assert seen[0].startswith("Senior architect.")
+    assert '"title":"TradeoffResponse"' in seen[0]
+
+    assert client.get("/api/v1/admin/prompts").status_code == 403
+    stats = client.get("/api/v1/admin/prompts", headers=admin_headers).get_json()
+    assert stats["tradeoff/v2-short"]["calls"] >= 1
+    assert stats["tradeoff/v1"]["weight"] == 100
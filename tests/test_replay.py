@@ -0,0 +1,50 @@
+import asyncio
+import json
+import threading
+from werkzeug.serving import make_server
+from app import db as app_db
+from app.core import tenants
+
+
+def test_replay_reports_latency_and_diffs(monkeypatch, make_app):
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setattr(tenants, "_registry", None)
+    app_db.init_db()
+
+    from app.models import RequestLog, ResponseLog
+    body = json.dumps({"option_a": "REST", "option_b": "gRPC", "criteria": ["Latency"]})
+    with app_db.SessionLocal.session_factory() as db:
+        seeded = []
+        for status, resp in [(200, None), (500, '{"error": "boom"}'), (200, '{"summary": "old shape"}')]:
+            req = RequestLog(route="/api/v1/tradeoff/", method="POST", body_json=body,
+                             headers_json=json.dumps({"Content-Type": "application/json"}), trace_id="t")
+            db.add(req)
+            db.flush()
+            seeded.append((req.id, status, resp))
+        db.commit()
+
+    app = make_app()
+    first = app.test_client().post("/api/v1/tradeoff/", data=body, content_type="application/json")
+    with app_db.SessionLocal.session_factory() as db:
+        for rid, status, resp in seeded:
+            db.add(ResponseLog(status_code=status, body_json=resp or first.get_data(as_text=True),
+                               latency_ms=1200, trace_id="t", request_id=rid))
+        db.commit()
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        from app.replay import iter_traffic, replay
+        with app_db.SessionLocal.session_factory() as db:
+            rows = iter_traffic(db, route="/api/v1/tradeoff/", upto=seeded[-1][0])
+            report = asyncio.run(replay(rows, f"http://127.0.0.1:{server.server_port}", speed=0, concurrency=4))
+    finally:
+        server.shutdown()
+
+    r = report["routes"]["POST /api/v1/tradeoff/"]
+    assert report["requests"] == 3 and r["errors"] == 0
+    assert r["status_mismatch"] == 1          # production answered 500 for one of them
+    assert r["shape_mismatch"] == 1           # and an older response shape for another
+    assert r["original_latency_ms"]["p50"] == 1200
+    assert r["latency_ms"]["p50"] < 1200
@@ -0,0 +1,61 @@
+import json
+from app import create_app
+
+
+def _client(monkeypatch):
+    app = create_app()
+    app.config["TESTING"] = True
+    from app.core import llm
+    calls = []
+    def fake_gemini(messages):
+        doc = json.loads(messages[1])["document"]
+        calls.append(doc)
+        return json.dumps({
+            "summary": f"{len(doc)} chars",
+            "risks": [{"area": "Database", "severity": "High", "likelihood": "Medium",
+                       "impact": "outage", "mitigation": "replica"}],
+            "action_items": ["Add a read replica", f"Fix part {len(calls)}"],
+        })
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+    monkeypatch.setattr(llm, "REVIEW_CHUNK_CHARS", 200)
+    return app.test_client(), calls
+
+
+def test_review_body_limit(monkeypatch):
+    monkeypatch.setenv("REVIEW_MAX_BODY_BYTES", "1000")
+    client, calls = _client(monkeypatch)
+    res = client.post("/api/v1/review/", json={"document": "x" * 2000, "quality_goals": ["Security"]})
+    assert res.status_code == 413
+    assert res.get_json()["error"]["code"] == "PAYLOAD_TOO_LARGE"
+    assert calls == []
+
+
+def test_review_upload_is_chunked_and_merged(monkeypatch):
+    monkeypatch.setenv("PREPROCESS_STEPS", "")  # keep the repeated paragraphs; this is about chunking
+    client, calls = _client(monkeypatch)
+    paragraph = "The API writes to a single Postgres instance without backups. " * 2
+    document = "\n\n".join([paragraph] * 10)
+    res = client.post(
+        "/api/v1/review/upload?quality_goals=Availability,Security",
+        data=document.encode("utf-8"),
+        content_type="text/plain",
+    )
+    assert res.status_code == 200
+    body = res.get_json()
+    assert len(calls) > 1
+    assert all(len(part) <= 200 for part in calls)
+    assert "".join(calls) == document
+    assert len(body["risks"]) == 1  # identical findings merged across parts
+    assert body["action_items"][0] == "Add a read replica"
+    assert body["summary"].startswith(f"Reviewed in {len(calls)} parts.")
+    assert res.headers["X-Document-Bytes"] == str(len(document))
+
+    assert client.post("/api/v1/review/upload", data="x").status_code == 400
+
+
+def test_review_upload_with_request_logging(monkeypatch, tmp_db):
+    client, calls = _client(monkeypatch)
+    res = client.post("/api/v1/review/upload?quality_goals=Security", data="small doc",
+                      content_type="text/plain")
+    assert res.status_code == 200
+    assert calls == ["small doc"]
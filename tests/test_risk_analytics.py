@@ -0,0 +1,21 @@
+from app.core import risk_analytics as ra
+
+
+def test_dedupe_rank_and_heatmap():
+    rows = [
+        {"risk_id": "R-1", "category": "Ops", "description": "Single database instance is a point of failure",
+         "likelihood": 2, "impact": 4, "mitigation": "replica"},
+        {"risk_id": "R-2", "category": "Availability", "description": "single database instance is a point of failure!",
+         "likelihood": 1, "impact": 4, "mitigation": "failover"},
+        {"risk_id": "R-3", "category": "Security", "description": "API keys stored in plain text config",
+         "likelihood": 3, "impact": 3, "mitigation": "vault"},
+    ]
+    table = ra.RiskTable.from_rows(rows, analysis_ids=[1, 2, 2])
+    assert table.score.tolist() == [8, 4, 9]
+
+    unique = ra.dedupe(table, threshold=0.8)
+    assert [r["risk_id"] for r in unique.to_rows()] == ["R-3", "R-1"]
+
+    grid = ra.heatmap(table)
+    assert grid.shape == (3, 4)
+    assert grid[1, 3] == 1 and grid[0, 3] == 1 and grid[2, 2] == 1
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+
+
+def test_search_ranks_stored_analyses(monkeypatch, make_app):
+    from app.core import llm, tenants
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = make_app()
+    client = app.test_client()
+
+    def fake_gemini(messages):
+        design = json.loads(messages[-1])["design"]
+        return json.dumps({
+            "summary": f"Register for {design}",
+            "risks": [{"risk_id": "R-1", "category": "Reliability",
+                       "description": f"{design} loses message ordering across partitions",
+                       "likelihood": 2, "impact": 3, "score": 0, "mitigation": "key by aggregate id"}],
+        })
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    assert client.post("/api/v1/risk/", json={"design": "Kafka event bus"}).status_code == 200
+    assert client.post("/api/v1/risk/", json={"design": "Nightly batch export"}).status_code == 200
+
+    res = client.get("/api/v1/search?q=kafka ordering")
+    body = res.get_json()
+    assert res.status_code == 200
+    assert body["total"] == 1
+    hit = body["items"][0]
+    assert hit["analysis_type"] == "risk"
+    assert "<mark>" in hit["snippet"]
+
+    # porter stemming, prefix terms and quoted phrases; FTS5 syntax in the input is inert
+    assert client.get("/api/v1/search?q=partition").get_json()["total"] == 2
+    assert client.get("/api/v1/search?q=\"loses message\"").get_json()["total"] == 2
+    assert client.get("/api/v1/search?q=nigh*").get_json()["total"] == 1
+    assert client.get("/api/v1/search?q=kafka OR NEAR(").status_code == 200
+    assert client.get("/api/v1/search?q=kafka&type=review").get_json()["total"] == 0
+    assert client.get("/api/v1/search").status_code == 400
+
+
+def test_app_without_db_does_not_load_sqlalchemy():
+    code = ("import sys; from app import create_app; create_app(); "
+            "print(any(m.startswith('sqlalchemy') for m in sys.modules))")
+    env = dict(os.environ, ENABLE_DB="false")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
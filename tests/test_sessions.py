@@ -0,0 +1,51 @@
+import json
+from app import create_app
+
+
+def test_session_turns_send_deltas_and_compact_history(monkeypatch, admin_headers):
+    from app.core import llm, sessions, tenants
+    monkeypatch.setattr(tenants, "_registry", None)
+    monkeypatch.setattr(sessions, "_store", sessions.SessionStore(max_sessions=2, ttl=60))
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+
+    prompts = []
+    def fake_generate(backend, system, user):
+        prompts.append(user)
+        return json.dumps({
+            "summary": "Modular monolith first " + "x" * 3000,
+            "options": [{"name": "Modular monolith", "when_to_use": "small team"}],
+            "recommendation": "Start with a modular monolith",
+        })
+    # patched below _gemini, which adds the session context
+    monkeypatch.setattr(llm, "_generate", fake_generate)
+
+    first = client.post("/api/v1/sessions/", json={
+        "kind": "design", "input": {"problem": "Ticketing", "constraints": ["team of 3"]},
+    })
+    assert first.status_code == 201
+    sid = first.get_json()["session_id"]
+    assert first.get_json()["usage"]["saved_tokens"] == 0
+
+    # only the delta is sent; the rest of the input and a digest of turn 1 come from the session
+    nxt = client.post(f"/api/v1/sessions/{sid}/turns", json={"delta": {"quality_goals": ["Latency"]}})
+    body = nxt.get_json()
+    assert nxt.status_code == 200 and body["turn"] == 2
+    sent = json.loads(prompts[-1].split("\n\n", 1)[0])
+    assert sent["problem"] == "Ticketing" and sent["quality_goals"] == ["Latency"]
+    assert "[turn 1, design]" in prompts[-1]
+    assert len(prompts[-1]) < 1500  # the 3 KB summary was compacted
+    assert body["usage"]["saved_tokens"] > 0
+    assert body["usage"]["request_bytes"] < body["usage"]["full_request_bytes"]
+
+    # shared fields carry over to another kind; a missing required field is a 400
+    assert client.post(f"/api/v1/sessions/{sid}/turns", json={"kind": "risk"}).status_code == 400
+    info = client.get(f"/api/v1/sessions/{sid}").get_json()
+    assert info["turns"] == 2 and len(info["history"]) == 2
+
+    # LRU: a third session evicts the least recently used one
+    client.post("/api/v1/sessions/", json={"kind": "design", "input": {"problem": "B"}})
+    client.post("/api/v1/sessions/", json={"kind": "design", "input": {"problem": "C"}})
+    assert client.get(f"/api/v1/sessions/{sid}").status_code == 404
+    assert client.get("/api/v1/admin/sessions", headers=admin_headers).get_json()["evictions"]["lru"] == 1
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+from app import create_app
+from app.core import tenants
+
+
+def test_tenant_keys_cache_and_rate_limit(monkeypatch, tmp_path, admin_headers):
+    spec = {"tenants": [
+        {"name": "acme", "api_key": "k-acme", "project": None, "rpm": 2},
+        {"name": "globex", "api_key": "k-globex", "project": None},
+    ]}
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps(spec))
+    monkeypatch.setenv("TENANTS_FILE", str(path))
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = create_app()
+    client = app.test_client()
+
+    from app.core import llm
+    calls = []
+    def fake_gemini(_):
+        calls.append(1)
+        return json.dumps({"summary": "stub", "risks": []})
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    payload = {"design": "API -> Postgres"}
+    assert client.post("/api/v1/risk/", json=payload, headers={"X-API-Key": "nope"}).status_code == 401
+
+    first = client.post("/api/v1/risk/", json=payload, headers={"X-API-Key": "k-acme"})
+    second = client.post("/api/v1/risk/", json=payload, headers={"X-API-Key": "k-acme"})
+    assert first.status_code == second.status_code == 200
+    assert first.headers["X-Analysis-Source"] == "llm"
+    assert second.headers["X-Analysis-Source"] == "cache"
+    assert second.data == first.data  # cached as the serialised body itself
+    assert len(calls) == 1
+
+    # caches are per tenant
+    other = client.post("/api/v1/risk/", json=payload, headers={"X-API-Key": "k-globex"})
+    assert other.headers["X-Analysis-Source"] == "llm"
+    assert len(calls) == 2
+
+    # acme's 2 rpm are used up; cached answers don't count, fresh runs do
+    client.post("/api/v1/risk/", json={"design": "API -> Redis"}, headers={"X-API-Key": "k-acme"})
+    limited = client.post("/api/v1/risk/", json={"design": "API -> S3"}, headers={"X-API-Key": "k-acme"})
+    assert limited.status_code == 429
+    assert limited.get_json()["error"]["code"] == "RATE_LIMITED"
+    assert int(limited.headers["Retry-After"]) >= 1
+
+    # a tenant key alone can't read other tenants' stats
+    denied = client.get("/api/v1/admin/tenants", headers={"X-API-Key": "k-acme"})
+    assert denied.status_code == 403
+    stats = client.get("/api/v1/admin/tenants", headers={"X-API-Key": "k-acme", **admin_headers}).get_json()
+    assert stats["acme"]["throttled"] == 1
+    assert stats["acme"]["cache"]["hits"] == 1
+
+
+def test_broken_reload_keeps_last_good_map(monkeypatch, tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"tenants": [{"name": "acme", "api_key": "k-acme"}]}))
+    monkeypatch.setenv("TENANTS_REFRESH_S", "0")
+    registry = tenants.TenantRegistry(str(path))
+    acme = registry.lookup("k-acme")
+    assert acme.name == "acme"
+
+    for broken in ('{"tenants": [', json.dumps({"tenants": [{"name": "acme"}]})):
+        path.write_text(broken)
+        os.utime(path, (time.time() + 1, time.time() + 1))
+        assert registry.lookup("k-acme") is acme
+
+    acme.acquire(timeout=1)
+    assert acme.stats()["in_flight"] == 1
+    acme.release()
+    assert acme.stats()["in_flight"] == 0
+
+
+def test_project_id_for_survives_a_concurrent_insert(monkeypatch, tmp_db):
+    from sqlalchemy.orm import Query
+    from app import db as app_db
+    from app.models import Project
+
+    app_db.init_db()
+    with app_db.SessionLocal.session_factory() as other:
+        other.add(Project(name="acme"))
+        other.commit()
+        winner = other.query(Project).filter(Project.name == "acme").one().id
+
+    # this worker looked before the other one committed, so it also tries to insert
+    original, lost = Query.one_or_none, []
+    monkeypatch.setattr(Query, "one_or_none", lambda q: lost.append(1) or None if not lost else original(q))
+    with app_db.SessionLocal.session_factory() as db:
+        assert tenants.project_id_for(tenants.Tenant("acme", project="acme"), db) == winner
+
+
+def test_unbound_tenants_need_admin_key_for_other_projects(monkeypatch, tmp_path, make_app, admin_headers):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"tenants": [
+        {"name": "acme", "api_key": "k-acme", "project": "acme"},
+        {"name": "ops", "api_key": "k-ops", "project": None},
+    ]}))
+    monkeypatch.setenv("TENANTS_FILE", str(path))
+    monkeypatch.setattr(tenants, "_registry", None)
+    client = make_app().test_client()
+
+    acme = {"X-API-Key": "k-acme"}
+    client.get("/api/v1/search?q=x", headers=acme)  # resolves (creates) acme's project
+    pid = tenants.get_registry().lookup("k-acme").project_id
+
+    for headers in ({}, {"X-API-Key": "k-ops"}):  # the default tenant and an unbound one
+        assert client.get(f"/api/v1/projects/{pid}/analyses", headers=headers).status_code == 403
+        assert client.get("/api/v1/search?q=x", headers=headers).status_code == 403
+    assert client.get(f"/api/v1/projects/{pid}/analyses", headers=acme).status_code == 200
+    assert client.get(f"/api/v1/projects/{pid}/analyses", headers=admin_headers).status_code == 200
+    assert client.get("/api/v1/search?q=x", headers=admin_headers).status_code in (200, 501)
@@ -1,3 +1,4 @@
+import hashlib
 import json
 from app import create_app
 
@@ -38,3 +39,90 @@ def test_testcases_200(monkeypatch):
     assert "cases" in body and len(body["cases"]) == 1
     case = body["cases"][0]
     assert all(k in case for k in ("given","when","then"))
+
+
+def test_testcases_large_count_is_sharded_and_deduped(monkeypatch):
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+
+    from app.core import llm
+    calls = []
+    def fake_gemini(messages):
+        req = json.loads(messages[1])
+        focus = req["focus"]
+        calls.append(focus)
+        tag = f"{focus['type']} {focus.get('non_functional', '')}"
+        cases = [{"title": f"{tag} {i}", "given": f"{tag} state {i}", "when": "the user acts",
+                  "then": "the outcome holds", "type": focus["type"]} for i in range(req["count"])]
+        # every shard also returns the same boilerplate case
+        cases.append({"title": "dup", "given": "A user exists.", "when": "They log in",
+                      "then": "they see the dashboard"})
+        return json.dumps({"summary": "shard", "cases": cases})
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    res = client.post("/api/v1/testcases/", json={
+        "user_story": "As a user I can log in", "non_functionals": ["Security"], "count": 40,
+    })
+    assert res.status_code == 200
+    cases = res.get_json()["cases"]
+    assert len(calls) > 1
+    assert {c["type"] for c in calls} == {"Positive", "Negative", "Edge"}
+    assert len(cases) == 40
+    assert [c["id"] for c in cases[:3]] == ["TC-001", "TC-002", "TC-003"]
+    # the boilerplate case every shard returns is kept at most once (trimming may drop it)
+    assert sum(1 for c in cases if c["title"] == "dup") <= 1
+    assert len({c["title"] for c in cases}) == 40
+    # trimming is spread over every area, and the summary counts what was kept
+    kept = {c["title"].rsplit(" ", 1)[0] for c in cases if c["title"] != "dup"}
+    assert kept == {f"{f['type']} {f.get('non_functional', '')}" for f in calls}
+    by_type = {t: sum(1 for c in cases if c["type"] == t) for t in ("Positive", "Negative", "Edge")}
+    assert res.get_json()["summary"].startswith(
+        f"40 test cases ({by_type['Positive']} positive, {by_type['Negative']} negative, {by_type['Edge']} edge)")
+
+    # the number of shards follows the requested count, not the number of non-functionals
+    calls.clear()
+    res = client.post("/api/v1/testcases/", json={
+        "user_story": "As a user I can log in", "non_functionals": [f"NFR {i}" for i in range(10)], "count": 11,
+    })
+    assert res.status_code == 200 and len(res.get_json()["cases"]) == 11
+    assert len(calls) == 2
+
+
+def _per_input_gemini(calls, cap=None):
+    """A model that answers the same input the same way, optionally returning fewer cases than asked."""
+    def fake_gemini(messages):
+        req = json.loads(messages[1])
+        calls.append(req)
+        tag = hashlib.sha256(messages[1].encode()).hexdigest()[:8]
+        n = min(req["count"], cap or req["count"])
+        return json.dumps({"summary": "shard", "cases": [
+            {"title": f"{tag} {i}", "given": f"state {tag} {i}", "when": "the user acts", "then": "it holds",
+             "type": req["focus"]["type"]} for i in range(n)
+        ]})
+    return fake_gemini
+
+
+def test_testcases_large_count_shards_send_distinct_inputs(monkeypatch):
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+
+    from app.core import llm
+    calls = []
+    monkeypatch.setattr(llm, "_gemini", _per_input_gemini(calls))
+    res = client.post("/api/v1/testcases/", json={"user_story": "As a user I can log in", "count": 100})
+    assert res.status_code == 200
+    assert len(res.get_json()["cases"]) == 100
+    assert len({json.dumps(c, sort_keys=True) for c in calls}) == len(calls)
+    assert res.get_json()["version"] == "testcases/v2"
+
+    # shards that come back short are topped up, listing the titles the area already has
+    calls.clear()
+    monkeypatch.setattr(llm, "_gemini", _per_input_gemini(calls, cap=7))
+    res = client.post("/api/v1/testcases/", json={"user_story": "As a user I can log in", "count": 100},
+                      headers={"Cache-Control": "no-cache"})
+    assert res.status_code == 200
+    assert len(res.get_json()["cases"]) == 100
+    followups = [c for c in calls if c["focus"]["part"].startswith("follow-up")]
+    assert followups and all(c["avoid_titles"] for c in followups)
@@ -0,0 +1,40 @@
+import uuid
+from app.core import tenants, tracing
+
+
+def test_spans_and_traceparent_propagation(monkeypatch, make_app):
+    monkeypatch.setenv("TRACE_EXPORTER", "memory")
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setattr(tenants, "_registry", None)
+    app = make_app()
+    client = app.test_client()
+
+    trace_id, parent_id = uuid.uuid4().hex, "00f067aa0ba902b7"
+    res = client.post(
+        "/api/v1/risk/",
+        json={"design": "API -> Postgres"},
+        headers={"traceparent": f"00-{trace_id}-{parent_id}-01"},
+    )
+    assert res.status_code == 200
+    assert res.headers["traceresponse"].startswith(f"00-{trace_id}-")
+
+    spans = {s.name: s for s in tracing.memory_spans(trace_id)}
+    server = spans["POST /api/v1/risk/"]
+    assert server.parent_id == parent_id
+    assert server.attributes["http.response.status_code"] == 200
+    for name in ("validate.request", "llm.generate", "llm.extract_json", "db.insert"):
+        assert spans[name].parent_id is not None
+    assert spans["llm.generate"].kind == tracing.KIND_CLIENT
+    # X-Trace-Id / stored logs use the same id, as a UUID
+    assert res.headers["X-Trace-Id"] == str(uuid.UUID(trace_id))
+    assert res.get_json()["trace_id"] == res.headers["X-Trace-Id"]
+
+    # without traceparent, X-Trace-Id is the trace root
+    root = str(uuid.uuid4())
+    client.post("/api/v1/risk/", json={"design": "API -> Redis"}, headers={"X-Trace-Id": root})
+    (server,) = [s for s in tracing.memory_spans(uuid.UUID(root).hex) if s.kind == tracing.KIND_SERVER]
+    assert server.parent_id is None
+
+    otlp = tracing.export_request([server])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp["traceId"] == uuid.UUID(root).hex and otlp["kind"] == 2
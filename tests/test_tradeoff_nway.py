@@ -0,0 +1,57 @@
+import json
+import threading
+from app import create_app
+
+SCORES = {  # option -> criterion -> score
+    "Postgres": {"Consistency": 5, "Scale-out": 3, "Ops": 4},
+    "MongoDB": {"Consistency": 3, "Scale-out": 4, "Ops": 3},
+    "Cassandra": {"Consistency": 2, "Scale-out": 5, "Ops": 2},
+    "MySQL": {"Consistency": 4, "Scale-out": 3, "Ops": 3},  # dominated by Postgres
+}
+
+
+def test_nway_tradeoff_parallel_scoring_and_ranking(monkeypatch):
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+
+    from app.core import llm
+    monkeypatch.setattr(llm, "NWAY_CRITERIA_CHUNK", 2)
+    calls, lock = [], threading.Lock()
+    active, peak, overlapped = [0], [0], threading.Event()
+    def fake_gemini(messages):
+        user = json.loads(messages[1])
+        with lock:
+            calls.append(user)
+        if "option" in user:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                if active[0] > 1:
+                    overlapped.set()
+            overlapped.wait(2)  # hold this call until a second one is in flight alongside it
+            with lock:
+                active[0] -= 1
+            o = user["option"]
+            return json.dumps({"option": o, "scores": [
+                {"criterion": c, "score": SCORES[o][c], "rationale": f"{o}/{c}"} for c in user["criteria"]
+            ]})
+        return json.dumps({"summary": "Postgres leads", "recommendation": {
+            "winner": user["ranking"][0]["option"], "rationale": "r", "caveats": "c"}})
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+
+    res = client.post("/api/v1/tradeoff/nway", json={
+        "options": list(SCORES),
+        "criteria": ["Consistency", "Scale-out", "Ops"],
+        "weights": {"Consistency": 2},
+    })
+    assert res.status_code == 200
+    body = res.get_json()
+
+    assert len(calls) == 4 * 2 + 1          # options x criteria chunks, plus one summary
+    assert peak[0] > 1                      # scoring calls were in flight together
+    assert [r["option"] for r in body["ranking"]][:1] == ["Postgres"]
+    assert set(body["pareto_front"]) == {"Postgres", "MongoDB", "Cassandra"}
+    assert body["weights"]["Consistency"] == 0.5
+    assert len(body["matrix"]) == 12
+    assert body["recommendation"]["winner"] == "Postgres"